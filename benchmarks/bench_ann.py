@@ -0,0 +1,74 @@
+"""
+Approximate nearest-neighbour search: IVF recall vs. latency against exact search
+
+Builds a synthetic gallery whose embeddings cluster the way face
+embeddings do (a low-rank identity component plus noise), trains the IVF
+index, and for a range of nprobe values reports top-1 recall (agreement
+with the exact EmbeddingGallery scan) and per-query latency. Queries are
+enrolled identities re-captured with noise, one face per call as in the
+video loop. Use it to pick GALLERY_ANN_NLIST / GALLERY_ANN_NPROBE for a
+site's gallery size.
+
+Usage:
+    python -m benchmarks.bench_ann [--identities 50000] [--queries 200] [--nlist 0] [--noise 0.3]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from ml_model.utils.ann import IVFIndex, default_nlist
+from ml_model.utils.gallery import EmbeddingGallery
+from ml_model.utils.landmarks import EMBEDDING_DIM
+
+
+def synthetic_gallery(count, dim, rank=64, seed=0):
+    rng = np.random.default_rng(seed)
+    basis = rng.standard_normal((rank, dim)).astype(np.float32)
+    latent = rng.standard_normal((count, rank)).astype(np.float32)
+    return latent @ basis + 0.5 * np.sqrt(rank) * rng.standard_normal((count, dim)).astype(np.float32)
+
+
+def per_query_ms(fn, queries):
+    t0 = time.perf_counter()
+    results = [fn(q) for q in queries]
+    return results, (time.perf_counter() - t0) * 1000 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--identities', type=int, default=50000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--dim', type=int, default=EMBEDDING_DIM)
+    parser.add_argument('--nlist', type=int, default=0, help="lists (0: sqrt(identities))")
+    parser.add_argument('--noise', type=float, default=0.3, help="query noise relative to an embedding's norm")
+    args = parser.parse_args()
+
+    matrix = synthetic_gallery(args.identities, args.dim)
+    names = [f'person{i}' for i in range(args.identities)]
+    rng = np.random.default_rng(1)
+    picks = rng.choice(args.identities, args.queries, replace=False)
+    scale = np.linalg.norm(matrix[picks], axis=1, keepdims=True) / np.sqrt(args.dim)
+    queries = matrix[picks] + args.noise * scale * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+
+    exact = EmbeddingGallery.from_arrays(names, matrix)
+    t0 = time.perf_counter()
+    index = IVFIndex.from_arrays(names, matrix, nlist=args.nlist or default_nlist(args.identities))
+    build_s = time.perf_counter() - t0
+    sizes = index.list_sizes()
+
+    truth, exact_ms = per_query_ms(lambda q: exact.match(q)[0][0, 0], queries)
+    print(f"{args.identities} identities x {args.dim} dims, {args.queries} queries")
+    print(f"IVF build {build_s:.1f}s: {index.nlist} lists, sizes {sizes.min()}-{sizes.max()} (median {int(np.median(sizes))})")
+    print(f"exact scan        recall 1.000  {exact_ms:7.2f} ms/query")
+    for nprobe in (1, 2, 4, 8, 16, 32, 64):
+        if nprobe > index.nlist:
+            break
+        found, ms = per_query_ms(lambda q: index.match(q, nprobe=nprobe)[0][0, 0], queries)
+        recall = np.mean([a == b for a, b in zip(found, truth)])
+        print(f"IVF nprobe={nprobe:<3d}    recall {recall:.3f}  {ms:7.2f} ms/query  ({exact_ms / ms:4.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Write throughput of the REST API with 1..N worker processes
+
+Each worker is a separate interpreter running the Flask app (as a
+gunicorn worker would) over the same attendance database and embeddings
+directory. Every worker logs --requests attendance records and saves an
+embedding for every tenth one; the run is timed from the moment all
+workers are ready. Reported per worker count: requests per second and
+whether every record made it to disk. Scaling is bounded by the cores of
+the machine and by SQLite's single writer.
+
+Usage:
+    python -m benchmarks.bench_api_workers [--workers 1 2 4] [--requests 500]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from ml_model.utils.attendance_store import AttendanceStore
+from ml_model.utils.gallery_store import GalleryStore
+
+ML_MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ml_model')
+
+WORKER = """
+import os, sys, time
+from app import app
+worker, attendance_file, embeddings_dir, requests, start_file = sys.argv[1:]
+app.config.update(TESTING=True, ATTENDANCE_FILE=attendance_file, EMBEDDINGS_DIR=embeddings_dir)
+client = app.test_client()
+print('ready', flush=True)
+while not os.path.exists(start_file):
+    time.sleep(0.001)
+for i in range(int(requests)):
+    client.post('/api/attendance', json={'name': f'w{worker}-{i}', 'confidence': 0.9})
+    if i % 10 == 0:
+        client.post(f'/api/embeddings/w{worker}-{i}', json={'embedding': [float(i)] * 16})
+"""
+
+
+def run(workers, requests):
+    """(requests per second, records on disk, gallery rows) for `workers` processes"""
+    directory = tempfile.mkdtemp()
+    try:
+        attendance_file = os.path.join(directory, 'attendance.json')
+        embeddings_dir = os.path.join(directory, 'embeddings')
+        start_file = os.path.join(directory, 'start')
+        os.makedirs(embeddings_dir)
+        store = AttendanceStore(os.path.join(directory, 'attendance.db'))
+        processes = [
+            subprocess.Popen([sys.executable, '-c', WORKER, str(w), attendance_file, embeddings_dir,
+                              str(requests), start_file], cwd=ML_MODEL_DIR, stdout=subprocess.PIPE, text=True)
+            for w in range(workers)
+        ]
+        for process in processes:
+            process.stdout.readline()
+        started = time.perf_counter()
+        open(start_file, 'w').close()
+        for process in processes:
+            process.wait()
+        elapsed = time.perf_counter() - started
+        total = workers * (requests + (requests + 9) // 10)
+        return total / elapsed, store.count(), len(GalleryStore(embeddings_dir).read_index()['names'])
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--requests', type=int, default=500, help='Attendance posts per worker')
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.requests} attendance posts per worker")
+    print(f"{'workers':>8} {'req/s':>10} {'records':>10} {'gallery':>8}")
+    for workers in args.workers:
+        rate, records, rows = run(workers, args.requests)
+        expected = workers * args.requests
+        status = '' if records == expected and rows == workers * ((args.requests + 9) // 10) else '  LOST WRITES'
+        print(f"{workers:>8} {rate:>10.0f} {records:>10} {rows:>8}{status}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Microbenchmark: per-landmark Python embedding vs. the vectorised batch path
+
+Builds synthetic MediaPipe-style results and times, per face, the loop that
+used to live in every caller against utils.landmarks.
+
+Usage:
+    python -m benchmarks.bench_embedding [--faces 4] [--repeat 200]
+"""
+
+import argparse
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from ml_model.utils.landmarks import NUM_LANDMARKS, compute_embeddings, embed_results
+
+
+def make_results(n_faces, seed=0):
+    rng = np.random.default_rng(seed)
+    points = rng.uniform([0.2, 0.2, -0.1], [0.8, 0.8, 0.1], size=(n_faces, NUM_LANDMARKS, 3))
+    faces = [
+        SimpleNamespace(landmark=[SimpleNamespace(x=float(x), y=float(y), z=float(z)) for x, y, z in face])
+        for face in points
+    ]
+    return SimpleNamespace(multi_face_landmarks=faces), points.astype(np.float32)
+
+
+def loop_embedding(landmarks):
+    """The per-landmark implementation replaced by utils.landmarks"""
+    raw = []
+    for lm in landmarks:
+        raw.extend([lm.x, lm.y, lm.z])
+    raw = np.array(raw, dtype=np.float32)
+
+    def dist(i1, i2):
+        p1 = landmarks[i1]
+        p2 = landmarks[i2]
+        return np.sqrt((p1.x - p2.x)**2 + (p1.y - p2.y)**2 + (p1.z - p2.z)**2)
+
+    KP = {"leftEye": 33, "rightEye": 263, "nose": 1, "chin": 152, "leftMouth": 61, "rightMouth": 291}
+    derived = np.array([
+        dist(KP["leftEye"], KP["rightEye"]), dist(KP["leftEye"], KP["nose"]),
+        dist(KP["rightEye"], KP["nose"]), dist(KP["nose"], KP["chin"]),
+        dist(KP["leftMouth"], KP["rightMouth"]), dist(KP["leftEye"], KP["chin"]),
+        dist(KP["rightEye"], KP["chin"])
+    ], dtype=np.float32)
+
+    raw_norm = np.linalg.norm(raw)
+    if raw_norm > 0: raw = raw / raw_norm
+    der_norm = np.linalg.norm(derived)
+    if der_norm > 0: derived = derived / der_norm
+    return np.concatenate((raw, derived))
+
+
+def per_face_us(fn, repeat, n_faces):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / (repeat * n_faces) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--faces', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    results, points = make_results(args.faces)
+    loop = per_face_us(lambda: [loop_embedding(f.landmark) for f in results.multi_face_landmarks],
+                       args.repeat, args.faces)
+    from_results = per_face_us(lambda: embed_results(results), args.repeat, args.faces)
+    from_array = per_face_us(lambda: compute_embeddings(points), args.repeat, args.faces)
+
+    print(f"{args.faces} faces x {NUM_LANDMARKS} landmarks, {args.repeat} repeats")
+    print(f"python loop                {loop:9.1f} us/face")
+    print(f"embed_results (from proto) {from_results:9.1f} us/face  ({loop / from_results:.1f}x)")
+    print(f"compute_embeddings (array) {from_array:9.1f} us/face  ({loop / from_array:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
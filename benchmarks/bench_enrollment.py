@@ -0,0 +1,70 @@
+"""
+Enrollment throughput vs. number of worker processes
+
+Runs train_people() over the training images (repeated to --images) with
+1, 2, 4, ... workers and reports images/s and speed-up over one worker.
+--decode-only swaps FaceMesh for image decoding alone, to measure the pool
+itself where mediapipe isn't available.
+
+Usage:
+    python -m benchmarks.bench_enrollment [--images 200] [--max-workers 8] [--decode-only]
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from ml_model.utils.enrollment import embed_image, list_person_images, train_people
+
+ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = ROOT / 'ml_model' / 'data'
+
+
+def decode_only(path):
+    """Stand-in for embed_image: decode and convert the image, no inference"""
+    img = cv2.imread(str(path))
+    rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    return np.full(8, rgb.mean(), dtype=np.float32)
+
+
+def make_people(count):
+    """{person: paths} of `count` images, 10 per person, cycling the training images"""
+    sources = [p for d in sorted(DATA_DIR.iterdir()) if d.is_dir() for p in list_person_images(d)]
+    if not sources:
+        raise SystemExit("No images found in ml_model/data")
+    people = {}
+    for i in range(count):
+        people.setdefault(f'person{i // 10}', []).append(sources[i % len(sources)])
+    return people
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--images', type=int, default=200)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunksize', type=int, default=8)
+    parser.add_argument('--decode-only', action='store_true')
+    args = parser.parse_args()
+
+    embed = decode_only if args.decode_only else embed_image
+    people = make_people(args.images)
+    total = sum(len(paths) for paths in people.values())
+
+    workers = 1
+    baseline = None
+    while workers <= args.max_workers:
+        t0 = time.perf_counter()
+        for _ in train_people(people, workers=workers, chunksize=args.chunksize, embed=embed):
+            pass
+        rate = total / (time.perf_counter() - t0)
+        baseline = baseline or rate
+        print(f"{workers:2d} workers  {rate:8.1f} images/s  ({rate / baseline:.2f}x)")
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Per-frame FaceMesh latency: new graph per frame vs. one long-lived session
+
+Replays frames from a video file (or the images in ml_model/data/) through
+both strategies and reports per-frame latency.
+
+Usage:
+    python -m benchmarks.bench_facemesh_session [--video clip.mp4] [--frames 200]
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from ml_model.utils.face_mesh import FaceMeshSession
+
+ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = ROOT / 'ml_model' / 'data'
+MESH_OPTIONS = dict(
+    static_image_mode=False,
+    refine_landmarks=True,
+    max_num_faces=4,
+    min_detection_confidence=0.5,
+    min_tracking_confidence=0.5
+)
+
+
+def load_frames(video, count, size=(640, 480)):
+    """Return `count` RGB frames from a video or the training images"""
+    frames = []
+    if video:
+        cap = cv2.VideoCapture(video)
+        while len(frames) < count:
+            ok, img = cap.read()
+            if not ok:
+                break
+            frames.append(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+        cap.release()
+    else:
+        for path in sorted(DATA_DIR.glob('*/*')):
+            img = cv2.imread(str(path))
+            if img is not None:
+                frames.append(cv2.cvtColor(cv2.resize(img, size), cv2.COLOR_BGR2RGB))
+    if not frames:
+        raise SystemExit("No frames found")
+    return [frames[i % len(frames)] for i in range(count)]
+
+
+def time_per_frame_graph(frames):
+    """Current behaviour before the session: build a graph for every frame"""
+    import mediapipe as mp
+    timings = []
+    for rgb in frames:
+        t0 = time.perf_counter()
+        with mp.solutions.face_mesh.FaceMesh(**MESH_OPTIONS) as face_mesh:
+            face_mesh.process(rgb)
+        timings.append(time.perf_counter() - t0)
+    return np.array(timings)
+
+
+def time_session(frames):
+    timings = []
+    with FaceMeshSession(**MESH_OPTIONS) as session:
+        for rgb in frames:
+            t0 = time.perf_counter()
+            session.process(rgb)
+            timings.append(time.perf_counter() - t0)
+    return np.array(timings)
+
+
+def report(label, timings):
+    ms = timings * 1000
+    print(f"{label:<22} mean {ms.mean():7.2f} ms  p50 {np.percentile(ms, 50):7.2f} ms  "
+          f"p95 {np.percentile(ms, 95):7.2f} ms  ({1000 / ms.mean():6.1f} fps)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--video', help="video file to replay (default: ml_model/data images)")
+    parser.add_argument('--frames', type=int, default=200)
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    print(f"{len(frames)} frames at {frames[0].shape[1]}x{frames[0].shape[0]}")
+
+    per_frame = time_per_frame_graph(frames)
+    session = time_session(frames)
+    report("graph per frame", per_frame)
+    report("long-lived session", session)
+    print(f"speedup: {per_frame.mean() / session.mean():.1f}x")
+
+
+if __name__ == '__main__':
+    main()
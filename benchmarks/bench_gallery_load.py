@@ -0,0 +1,90 @@
+"""
+Gallery load time: one indented JSON file per person vs. the binary gallery
+
+Writes a synthetic gallery in both formats to a temporary directory and
+times loading it the old way (listdir + json.load per file) and from the
+memory-mapped .npy matrix. The last line compares what the browser client
+downloads: one JSON file per person vs. the single GET /api/gallery body.
+
+Usage:
+    python -m benchmarks.bench_gallery_load [--identities 10000]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from ml_model.utils.gallery import EmbeddingGallery
+from ml_model.utils.gallery_store import GalleryStore, migrate_json_gallery
+from ml_model.utils.gallery_transfer import iter_binary, parse_binary
+from ml_model.utils.landmarks import EMBEDDING_DIM
+
+
+def write_json_gallery(directory, count, dim):
+    rng = np.random.default_rng(0)
+    for i in range(count):
+        with open(os.path.join(directory, f'person{i}_embedding.json'), 'w') as f:
+            json.dump({'name': f'person{i}', 'embedding': rng.standard_normal(dim).tolist()}, f, indent=2)
+
+
+def load_json_gallery(directory):
+    """The per-file loader the binary gallery replaces"""
+    embeddings = {}
+    for filename in os.listdir(directory):
+        if filename.endswith('_embedding.json'):
+            with open(os.path.join(directory, filename), 'r') as f:
+                data = json.load(f)
+            embeddings[filename.replace('_embedding.json', '')] = np.array(data['embedding'], dtype=np.float32)
+    return embeddings
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--identities', type=int, default=10000)
+    parser.add_argument('--dim', type=int, default=EMBEDDING_DIM)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        write_json_gallery(directory, args.identities, args.dim)
+        json_bytes = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+
+        for dtype in ('float32', 'float16'):
+            store = GalleryStore(os.path.join(directory, dtype), dtype=dtype)
+            _, migrate_s = timed(lambda: migrate_json_gallery(directory, store))
+            print(f"migrate to {dtype}: {migrate_s:.2f}s, {os.path.getsize(store.matrix_path) / 1e6:.1f} MB "
+                  f"(JSON: {json_bytes / 1e6:.1f} MB)")
+
+        embeddings, json_s = timed(lambda: load_json_gallery(directory))
+        _, dict_s = timed(lambda: EmbeddingGallery.from_embeddings(embeddings))
+        print(f"JSON files      load {json_s * 1000:9.1f} ms + gallery {dict_s * 1000:7.1f} ms")
+
+        for dtype in ('float32', 'float16'):
+            store = GalleryStore(os.path.join(directory, dtype))
+            (names, matrix), load_s = timed(store.load)
+            _, build_s = timed(lambda: EmbeddingGallery.from_arrays(names, matrix))
+            print(f"{dtype} .npy    load {load_s * 1000:9.1f} ms + gallery {build_s * 1000:7.1f} ms "
+                  f"({json_s / (load_s + build_s):.0f}x)")
+
+        store = GalleryStore(os.path.join(directory, 'float32'))
+        body, body_s = timed(lambda: b''.join(iter_binary(*store.load())))
+        _, parse_s = timed(lambda: parse_binary(body))
+        print(f"browser download: {args.identities + 1} requests, {json_bytes / 1e6:.1f} MB of JSON -> "
+              f"1 request, {len(body) / 1e6:.1f} MB (build {body_s * 1000:.1f} ms, parse {parse_s * 1000:.1f} ms)")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Gallery sync: one POST per person vs. the bulk import/export formats
+
+Times what the server does to receive a gallery of --people identities
+through POST /api/embeddings/<name> (upsert + indented JSON per person)
+and through POST /api/gallery/import (JSON lines or binary, one atomic
+merge), plus the cost of producing each export body.
+
+Usage:
+    python -m benchmarks.bench_gallery_sync [--people 10000] [--single 500]
+"""
+
+import argparse
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from ml_model.utils.gallery_store import GalleryStore
+from ml_model.utils.gallery_transfer import iter_binary, iter_ndjson, parse_binary, parse_ndjson
+from ml_model.utils.landmarks import EMBEDDING_DIM
+
+
+def per_person(directory, names, matrix):
+    """The per-request path of save_embedding()"""
+    store = GalleryStore(directory)
+    for name, row in zip(names, matrix):
+        store.upsert(name, row)
+        with open(os.path.join(directory, f'{name}_embedding.json'), 'w') as f:
+            json.dump({'name': name, 'embedding': row.tolist()}, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--people', type=int, default=10000)
+    parser.add_argument('--single', type=int, default=500,
+                        help="people actually sent one by one (the rest is extrapolated)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    matrix = rng.standard_normal((args.people, EMBEDDING_DIM)).astype(np.float32)
+    names = [f'person{i}' for i in range(args.people)]
+    directory = tempfile.mkdtemp()
+    try:
+        single = min(args.single, args.people)
+        os.makedirs(os.path.join(directory, 'single'))
+        t0 = time.perf_counter()
+        per_person(os.path.join(directory, 'single'), names[:single], matrix[:single])
+        per_person_s = (time.perf_counter() - t0) * args.people / single
+
+        t0 = time.perf_counter()
+        ndjson = ''.join(iter_ndjson(names, matrix)).encode()
+        ndjson_export_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        binary = b''.join(iter_binary(names, matrix))
+        binary_export_s = time.perf_counter() - t0
+
+        results = []
+        for label, body, parse in (('ndjson', ndjson, lambda b: parse_ndjson(io.BytesIO(b))),
+                                   ('binary', binary, parse_binary)):
+            store = GalleryStore(os.path.join(directory, label))
+            store.upsert('existing', matrix[0])
+            t0 = time.perf_counter()
+            parsed_names, parsed, meta = parse(body)
+            store.merge(parsed_names, parsed, meta)
+            results.append((label, len(body), time.perf_counter() - t0))
+
+        print(f"{args.people} people x {EMBEDDING_DIM} dims")
+        print(f"one POST per person (from {single})  {per_person_s:8.2f} s  ({args.people} requests)")
+        for (label, size, import_s), export_s in zip(results, (ndjson_export_s, binary_export_s)):
+            print(f"bulk {label:7s} import {import_s:6.2f} s  export {export_s:6.2f} s  "
+                  f"body {size / 1e6:6.1f} MB  (1 request each way)")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
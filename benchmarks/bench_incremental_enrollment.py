@@ -0,0 +1,105 @@
+"""
+Incremental enrollment: adding one person to a large dataset
+
+Builds a synthetic data directory (--people x --images small files), runs
+a first full enrollment, then adds one person and times the incremental
+re-run: manifest scan, cache reads, extraction and manifest save. Face
+extraction is replaced by a fixed per-image cost (--extract-ms) so the
+numbers don't depend on mediapipe.
+
+Usage:
+    python -m benchmarks.bench_incremental_enrollment [--people 5000] [--images 4] [--extract-ms 50]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from ml_model.utils.enrollment import list_person_images, train_people
+from ml_model.utils.enrollment_manifest import EnrollmentManifest
+from ml_model.utils.landmarks import EMBEDDING_DIM
+
+EXTRACT_SECONDS = 0.05
+
+
+def fake_embed(path):
+    """Stand-in for FaceMesh with a fixed cost"""
+    time.sleep(EXTRACT_SECONDS)
+    data = Path(path).read_bytes()
+    return np.random.default_rng(zlib.crc32(data)).normal(size=EMBEDDING_DIM).astype(np.float32)
+
+
+def instant_embed(path):
+    data = Path(path).read_bytes()
+    return np.random.default_rng(zlib.crc32(data)).normal(size=EMBEDDING_DIM).astype(np.float32)
+
+
+def write_person(data_dir, name, images):
+    person_dir = os.path.join(data_dir, name)
+    os.makedirs(person_dir, exist_ok=True)
+    for i in range(images):
+        with open(os.path.join(person_dir, f'img{i}.jpg'), 'w') as f:
+            f.write(f'{name}-{i}')
+
+
+def enroll(data_dir, out_dir, embed):
+    """The train_embeddings.py flow minus the gallery writes; returns (extracted, updated people)"""
+    people = {d.name: list_person_images(d) for d in sorted(Path(data_dir).iterdir()) if d.is_dir()}
+    manifest = EnrollmentManifest(out_dir, data_dir)
+    entries, todo, affected = manifest.scan(people)
+    to_train = {name: people[name] for name in sorted(affected) if name in people}
+    cache = manifest.load_embeddings(entries, [p for paths in to_train.values() for p in paths])
+    updated = sum(1 for _ in train_people(to_train, cache=cache, embed=embed))
+    manifest.save(entries, {path: cache[path] for path in todo if path in cache})
+    return len(todo), updated
+
+
+def main():
+    global EXTRACT_SECONDS
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--people', type=int, default=5000)
+    parser.add_argument('--images', type=int, default=4)
+    parser.add_argument('--extract-ms', type=float, default=50)
+    args = parser.parse_args()
+    EXTRACT_SECONDS = args.extract_ms / 1000
+
+    directory = tempfile.mkdtemp()
+    try:
+        data_dir = os.path.join(directory, 'data')
+        out_dir = os.path.join(directory, 'embeddings')
+        os.makedirs(out_dir)
+        for p in range(args.people):
+            write_person(data_dir, f'person{p}', args.images)
+        total = args.people * args.images
+
+        # Seed the manifest without paying the simulated extraction cost
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            enroll(data_dir, out_dir, instant_embed)
+        seed_s = time.perf_counter() - t0
+
+        write_person(data_dir, 'newcomer', args.images)
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            extracted, updated = enroll(data_dir, out_dir, fake_embed)
+        incremental_s = time.perf_counter() - t0
+
+        full_estimate = (total + args.images) * EXTRACT_SECONDS
+        print(f"dataset: {args.people} people, {total} images; extraction {args.extract_ms:.0f} ms/image")
+        print(f"first run bookkeeping (extraction excluded)  {seed_s:7.2f} s")
+        print(f"add one person: {extracted} images extracted, {updated} person updated  {incremental_s:7.2f} s")
+        print(f"full rebuild, extraction alone               {full_estimate:7.0f} s")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Many cameras on one box: a processor per camera vs. the shared frame scheduler
+
+Simulates --cameras cameras at --fps each, on a machine where landmark
+detection takes --landmark-ms per frame and at most --cores frames can be
+processed at once (a semaphore stands in for the CPU, so the result
+doesn't depend on the cores of the machine running the benchmark).
+
+"per camera" is today's model: every browser session has its own
+processor that handles each of its frames in order, all competing for the
+cores. "scheduler" is IngestServer with --cores workers: latest frame
+wins per camera and cameras are served round-robin. Reported per camera:
+processed frames per second (min / max over cameras), frames dropped and
+the capture-to-result latency at the end of the run.
+
+Usage:
+    python -m benchmarks.bench_ingest [--cameras 12] [--fps 15] [--cores 4] [--landmark-ms 30] [--seconds 10]
+"""
+
+import argparse
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from ml_model.utils.attendance_store import AttendanceStore
+from ml_model.utils.attendance_writer import AttendanceWriter
+from ml_model.utils.gallery_store import GalleryStore, GalleryWatcher
+from ml_model.utils.ingest import IngestServer
+from ml_model.utils.landmarks import NUM_LANDMARKS
+
+
+class Cpu:
+    """`cores` frames at a time, each costing `seconds`"""
+
+    def __init__(self, cores, seconds):
+        self.slots = threading.Semaphore(cores)
+        self.seconds = seconds
+
+    def landmarks(self, camera=None, frame=None):
+        with self.slots:
+            time.sleep(self.seconds)
+        return np.zeros((0, NUM_LANDMARKS, 3), dtype=np.float32)
+
+
+def camera(fps, seconds):
+    """Paced frames for `seconds`; each frame is its capture time"""
+    interval = 1.0 / fps
+    start = due = time.monotonic()
+    while due - start < seconds:
+        due += interval
+        time.sleep(max(0.0, due - time.monotonic()))
+        yield time.monotonic()
+
+
+def per_camera(args, cpu):
+    processed, latency = {}, {}
+
+    def run(name):
+        frames = queue.Queue()
+        feeder = threading.Thread(target=lambda: [frames.put(f) for f in camera(args.fps, args.seconds)] + [frames.put(None)])
+        feeder.start()
+        count = 0
+        deadline = time.monotonic() + args.seconds
+        while time.monotonic() < deadline:
+            try:
+                captured = frames.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if captured is None:
+                break
+            cpu.landmarks()
+            count += 1
+            latency[name] = (time.monotonic() - captured) * 1000
+        processed[name] = count
+        feeder.join()
+
+    threads = [threading.Thread(target=run, args=(f'cam{i}',)) for i in range(args.cameras)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    fps = [processed[n] / args.seconds for n in processed]
+    return min(fps), max(fps), 0, float(np.mean(list(latency.values())))
+
+
+def scheduled(args, cpu, directory):
+    store = GalleryStore(os.path.join(directory, 'embeddings'))
+    writer = AttendanceWriter(AttendanceStore(os.path.join(directory, 'attendance.db')))
+    sources = {f'cam{i}': camera(args.fps, args.seconds) for i in range(args.cameras)}
+    latency = {}
+
+    def landmarks(name, captured):
+        points = cpu.landmarks()
+        latency[name] = (time.monotonic() - captured) * 1000
+        return points
+
+    server = IngestServer(sources, GalleryWatcher(store), writer, workers=args.cores, landmarks=landmarks)
+    server.start()
+    server.wait_sources()
+    stats = server.stats()['cameras']
+    server.stop()
+    writer.close()
+    fps = [c['processed'] / args.seconds for c in stats.values()]
+    return min(fps), max(fps), sum(c['dropped'] for c in stats.values()), float(np.mean(list(latency.values())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cameras', type=int, default=12)
+    parser.add_argument('--fps', type=float, default=15)
+    parser.add_argument('--cores', type=int, default=4)
+    parser.add_argument('--landmark-ms', type=float, default=30)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    capacity = args.cores * 1000 / args.landmark_ms
+    print(f"{args.cameras} cameras x {args.fps:g} fps = {args.cameras * args.fps:.0f} frames/s offered, "
+          f"capacity {capacity:.0f} frames/s ({capacity / args.cameras:.1f} per camera)")
+    directory = tempfile.mkdtemp()
+    try:
+        cpu = Cpu(args.cores, args.landmark_ms / 1000)
+        for label, run in (('per camera', lambda: per_camera(args, cpu)),
+                           ('scheduler', lambda: scheduled(args, cpu, directory))):
+            low, high, dropped, latency = run()
+            print(f"{label:<11} fps per camera {low:5.1f} - {high:5.1f}, dropped {dropped:6}, latency {latency:8.0f} ms")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
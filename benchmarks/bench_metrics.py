@@ -0,0 +1,56 @@
+"""
+Cost of the per-stage frame instrumentation
+
+Replays what AttendanceVideoProcessor.transform records per frame (a
+StageTimer with one mark per stage, the frame total and the frame/match
+counters) and reports it as a share of a --frame-ms frame. Also times
+rendering the registry for a /metrics scrape.
+
+Usage:
+    python -m benchmarks.bench_metrics [--frames 100000] [--frame-ms 30]
+"""
+
+import argparse
+import time
+
+from ml_model.utils.metrics import (
+    FRAME_SECONDS, FRAME_STAGE_SECONDS, FRAMES, HTTP_REQUEST_SECONDS, MATCHES, RECOGNITIONS, REGISTRY, StageTimer
+)
+
+STAGES = ('decode', 'cvtColor', 'facemesh', 'gallery_poll', 'track', 'embed', 'match', 'log_attendance',
+          'draw', 'encode')
+
+
+def instrument_frame():
+    timer = StageTimer(FRAME_STAGE_SECONDS)
+    for stage in STAGES:
+        timer.mark(stage)
+    MATCHES.inc(2)
+    RECOGNITIONS.inc()
+    timer.finish(FRAME_SECONDS)
+    FRAMES.inc()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=100000)
+    parser.add_argument('--frame-ms', type=float, default=30, help="frame time to compare against")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    for _ in range(args.frames):
+        instrument_frame()
+    per_frame = (time.perf_counter() - started) / args.frames
+    print(f"instrumentation: {per_frame * 1e6:.1f} us per frame ({len(STAGES)} stages), "
+          f"{per_frame * 1000 / args.frame_ms:.3%} of a {args.frame_ms:g} ms frame")
+
+    for route in ('/api/attendance', '/api/gallery', '/health'):
+        for status in (200, 304, 400):
+            HTTP_REQUEST_SECONDS.observe(0.002, method='GET', route=route, status=status)
+    started = time.perf_counter()
+    text = REGISTRY.render()
+    print(f"/metrics render: {(time.perf_counter() - started) * 1000:.2f} ms, {len(text.splitlines())} lines")
+
+
+if __name__ == '__main__':
+    main()
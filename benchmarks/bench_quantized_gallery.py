@@ -0,0 +1,139 @@
+"""
+Quantized gallery: memory, speed and recognition accuracy vs. float32
+
+Accuracy report (default): extracts an embedding from every image in
+ml_model/data, enrolls each person as the average of their images (as
+train_embeddings.py does), then matches every image against float32,
+float16 and int8 galleries, with and without the float32 re-rank.
+Reports, per precision, how many images get a different best match or a
+different recognised/unrecognised decision at the 0.5 threshold than with
+float32, and the largest score difference. Needs mediapipe.
+
+--stored runs it on the enrolled embeddings in web_app/embeddings
+instead (no mediapipe needed): every trained person is an identity, and
+the probes are their stored vectors with landmark-scale noise added plus
+blends of every pair of people, which land near the decision boundary
+where quantization could flip a match.
+
+--synthetic N runs the same comparison on N synthetic identities (no
+mediapipe needed) and adds memory per identity and query latency.
+
+Usage:
+    python -m benchmarks.bench_quantized_gallery [--threshold 0.5]
+    python -m benchmarks.bench_quantized_gallery --stored [--queries 200]
+    python -m benchmarks.bench_quantized_gallery --synthetic 50000 [--queries 200]
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ml_model.utils.gallery import EmbeddingGallery
+from ml_model.utils.gallery_store import open_gallery_store
+
+ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = ROOT / 'ml_model' / 'data'
+EMBEDDINGS_DIR = ROOT / 'web_app' / 'embeddings'
+VARIANTS = (('float32', False), ('float16', False), ('int8', False), ('float16', True), ('int8', True))
+
+
+def data_set():
+    """(names, gallery matrix, probe matrix, probe labels) from ml_model/data"""
+    from ml_model.utils.enrollment import average_embedding, extract_embeddings, list_person_images
+
+    people = {d.name: list_person_images(d) for d in sorted(DATA_DIR.iterdir()) if d.is_dir()}
+    names, rows, probes, labels = [], [], [], []
+    for name, paths in people.items():
+        found = [emb for _, emb in sorted(extract_embeddings(paths)) if emb is not None]
+        print(f"{name}: {len(found)}/{len(paths)} images with a face")
+        if not found:
+            continue
+        names.append(name)
+        rows.append(average_embedding(found))
+        probes.extend(found)
+        labels.extend([name] * len(found))
+    return names, np.stack(rows), np.stack(probes), labels
+
+
+def stored_set(queries, noise=0.3, seed=0):
+    """(names, gallery matrix, probe matrix, probe labels) from the enrolled gallery"""
+    names, matrix = open_gallery_store(str(EMBEDDINGS_DIR)).load(mmap=False)
+    if len(names) < 2:
+        raise SystemExit(f"Need at least two enrolled people in {EMBEDDINGS_DIR}")
+    matrix = np.asarray(matrix, dtype=np.float32)
+    dim = matrix.shape[1]
+    rng = np.random.default_rng(seed)
+    probes, labels = [], []
+    for i, name in enumerate(names):
+        scale = np.linalg.norm(matrix[i]) / np.sqrt(dim)
+        for _ in range(queries):
+            probes.append(matrix[i] + noise * scale * rng.standard_normal(dim).astype(np.float32))
+            labels.append(name)
+    # Blends of two people: the closest calls, where a quantization error could change the winner
+    for i in range(len(names)):
+        for j in range(i + 1, len(names)):
+            for t in np.linspace(0.3, 0.7, queries):
+                probes.append((1 - t) * matrix[i] + t * matrix[j])
+                labels.append(names[i] if t < 0.5 else names[j])
+    return names, matrix, np.stack(probes).astype(np.float32), labels
+
+
+def synthetic_set(count, queries, dim=478 * 3 + 7, rank=64, noise=0.3, seed=0):
+    rng = np.random.default_rng(seed)
+    basis = rng.standard_normal((rank, dim)).astype(np.float32)
+    matrix = rng.standard_normal((count, rank)).astype(np.float32) @ basis
+    matrix += 0.5 * np.sqrt(rank) * rng.standard_normal((count, dim)).astype(np.float32)
+    picks = rng.choice(count, queries, replace=False)
+    scale = np.linalg.norm(matrix[picks], axis=1, keepdims=True) / np.sqrt(dim)
+    probes = matrix[picks] + noise * scale * rng.standard_normal((queries, dim)).astype(np.float32)
+    names = [f'person{i}' for i in range(count)]
+    return names, matrix, probes, [names[i] for i in picks]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--synthetic', type=int, default=0, help="identities (0: use ml_model/data)")
+    parser.add_argument('--stored', action='store_true', help="use the enrolled embeddings in web_app/embeddings")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--threshold', type=float, default=0.5)
+    parser.add_argument('--rerank', type=int, default=16)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        names, matrix, probes, labels = synthetic_set(args.synthetic, args.queries)
+    elif args.stored:
+        names, matrix, probes, labels = stored_set(args.queries)
+    else:
+        try:
+            names, matrix, probes, labels = data_set()
+        except ImportError as e:
+            raise SystemExit(f"Face extraction unavailable ({e}); try --synthetic 50000")
+    rows = dict(zip(names, matrix))
+    exact = lambda wanted: np.stack([rows[n] for n in wanted])
+
+    print(f"{len(names)} identities, {len(probes)} probes, threshold {args.threshold}")
+    reference = None
+    for precision, reranked in VARIANTS:
+        gallery = EmbeddingGallery.from_arrays(names, matrix, precision=precision,
+                                               exact=exact if reranked else None, rerank=args.rerank)
+        t0 = time.perf_counter()
+        results = [gallery.match(probe) for probe in probes]
+        ms = (time.perf_counter() - t0) * 1000 / len(probes)
+        best = np.array([r[0][0, 0] for r in results], dtype=object)
+        score = np.array([r[1][0, 0] for r in results])
+        if reference is None:
+            reference = best, score
+            correct = np.mean(best == np.array(labels, dtype=object))
+            print(f"float32 top-1 correct {correct:.3f}, recognised {np.mean(score >= args.threshold):.3f}")
+        changed = np.sum(best != reference[0])
+        decided = np.sum((score >= args.threshold) != (reference[1] >= args.threshold))
+        label = precision + (' + re-rank' if reranked else '')
+        print(f"{label:18s} {gallery.nbytes / len(names):6.0f} B/identity  {ms:6.2f} ms/query  "
+              f"best match changed {changed:3d}  decision changed {decided:3d}  "
+              f"max |score diff| {np.abs(score - reference[1]).max():.2e}")
+
+
+if __name__ == '__main__':
+    main()
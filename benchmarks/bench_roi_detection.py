@@ -0,0 +1,137 @@
+"""
+Full-frame FaceMesh vs. downscaled detection + full-resolution ROI crops
+
+Composites the training photos onto 720p and 1080p canvases and, for each
+resolution, reports throughput of both paths and the drift between their
+embeddings (cosine similarity and landmark offset in pixels). The
+colour-conversion/resizing stage is timed separately and also runs
+without mediapipe installed.
+
+Usage:
+    python -m benchmarks.bench_roi_detection [--frames 100] [--face-height 0.35]
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from ml_model.utils.face_mesh import FaceMeshSession
+from ml_model.utils.landmarks import compute_embeddings, results_to_array
+from ml_model.utils.roi import RoiFaceMesh
+
+ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = ROOT / 'ml_model' / 'data'
+RESOLUTIONS = {'720p': (1280, 720), '1080p': (1920, 1080)}
+
+
+def make_frames(size, count, face_height, seed=0):
+    """BGR frames of `size` with one training photo pasted at a random spot"""
+    rng = np.random.default_rng(seed)
+    photos = [img for img in (cv2.imread(str(p)) for p in sorted(DATA_DIR.glob('*/*'))) if img is not None]
+    if not photos:
+        raise SystemExit("No images found in ml_model/data")
+    w, h = size
+    frames = []
+    for i in range(count):
+        photo = photos[i % len(photos)]
+        ph = int(h * face_height)
+        pw = int(photo.shape[1] * ph / photo.shape[0])
+        frame = np.full((h, w, 3), 90, dtype=np.uint8)
+        x = int(rng.integers(0, w - pw))
+        y = int(rng.integers(0, h - ph))
+        frame[y:y + ph, x:x + pw] = cv2.resize(photo, (pw, ph), interpolation=cv2.INTER_AREA)
+        frames.append(frame)
+    return frames
+
+
+def time_prep(frames, detect_width=640):
+    """Per-frame cost of the colour conversions each path does before inference"""
+    t0 = time.perf_counter()
+    for img in frames:
+        cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    full = (time.perf_counter() - t0) / len(frames)
+
+    t0 = time.perf_counter()
+    for img in frames:
+        h, w = img.shape[:2]
+        scale = detect_width / w
+        small = cv2.resize(img, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_LINEAR)
+        cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+    roi = (time.perf_counter() - t0) / len(frames)
+    return full, roi
+
+
+def run_full(frames):
+    mesh = FaceMeshSession(static_image_mode=True, max_num_faces=4)
+    out = []
+    t0 = time.perf_counter()
+    for img in frames:
+        out.append(results_to_array(mesh.process(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))))
+    elapsed = time.perf_counter() - t0
+    mesh.close()
+    return out, elapsed
+
+
+def run_roi(frames):
+    roi_mesh = RoiFaceMesh(detect_width=640, max_num_faces=4)
+    out = []
+    t0 = time.perf_counter()
+    for img in frames:
+        out.append(roi_mesh.process(img))
+    elapsed = time.perf_counter() - t0
+    roi_mesh.close()
+    return out, elapsed
+
+
+def drift(full_points, roi_points, size):
+    """Cosine similarity and mean landmark offset (px) over frames where both found one face"""
+    cosines, offsets = [], []
+    w, h = size
+    for a, b in zip(full_points, roi_points):
+        if len(a) != 1 or len(b) != 1:
+            continue
+        ea, eb = compute_embeddings(a)[0], compute_embeddings(b)[0]
+        cosines.append(float(ea @ eb / (np.linalg.norm(ea) * np.linalg.norm(eb))))
+        offsets.append(float(np.mean(np.hypot((a[0, :, 0] - b[0, :, 0]) * w, (a[0, :, 1] - b[0, :, 1]) * h))))
+    return cosines, offsets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--face-height', type=float, default=0.35,
+                        help="Pasted photo height as a fraction of the frame height")
+    args = parser.parse_args()
+
+    try:
+        import mediapipe as mp
+        have_mediapipe = hasattr(mp, 'solutions')
+    except ImportError:
+        have_mediapipe = False
+
+    for label, size in RESOLUTIONS.items():
+        frames = make_frames(size, args.frames, args.face_height)
+        prep_full, prep_roi = time_prep(frames)
+        print(f"[{label}] colour prep: full frame {prep_full * 1000:.2f} ms, "
+              f"downscale + small copy {prep_roi * 1000:.2f} ms")
+        if not have_mediapipe:
+            print(f"[{label}] mediapipe (with mp.solutions) not available; skipping landmark stages")
+            continue
+
+        full_points, full_s = run_full(frames)
+        roi_points, roi_s = run_roi(frames)
+        cosines, offsets = drift(full_points, roi_points, size)
+        print(f"[{label}] full frame   {len(frames) / full_s:6.1f} fps")
+        print(f"[{label}] ROI crops    {len(frames) / roi_s:6.1f} fps ({full_s / roi_s:.2f}x)")
+        if cosines:
+            print(f"[{label}] drift over {len(cosines)} frames: cosine mean {np.mean(cosines):.4f} "
+                  f"min {np.min(cosines):.4f}, landmark offset {np.mean(offsets):.2f} px")
+        else:
+            print(f"[{label}] no frame where both paths found exactly one face")
+
+
+if __name__ == '__main__':
+    main()
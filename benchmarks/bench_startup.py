@@ -0,0 +1,74 @@
+"""
+Startup cost of the API worker and the trainer, from python -X importtime
+
+Imports each entry point in a fresh interpreter with -X importtime and
+reports the total import time (median of --runs), the slowest top-level
+imports, and whether any heavy dependency (streamlit, mediapipe, cv2,
+pandas, av, multiprocessing) was loaded. None should be: they are
+imported on first use. The suite (benchmarks.suite --family startup)
+times the same cold imports, interpreter start included, so --compare
+against a saved baseline flags a startup regression.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 5] [--top 8]
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ('streamlit', 'mediapipe', 'cv2', 'pandas', 'av', 'multiprocessing')
+# Entry point -> (module to import, directory it is run from)
+TARGETS = {
+    'api': ('app', ROOT / 'ml_model'),
+    'helpers': ('ml_model.utils.helpers', ROOT),
+    'trainer': ('train_embeddings', ROOT),
+}
+_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def import_time(module, cwd):
+    """(total ms, {direct import: cumulative ms}, heavy modules loaded) for one fresh import of `module`"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=cwd, capture_output=True, text=True, timeout=120)
+    if result.returncode:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    total, children, pending, loaded = 0.0, {}, {}, set()
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        # Nested imports are listed before their parent, two spaces deeper per level
+        cumulative, depth, name = int(match.group(2)) / 1000, (len(match.group(3)) - 1) // 2, match.group(4)
+        loaded.add(name.split('.')[0])
+        if depth == 1:
+            pending[name] = cumulative
+        elif depth == 0:
+            if name == module.split('.')[0] or name == module:
+                total = max(total, cumulative)
+                children.update(pending)
+            pending = {}
+    return total, children, sorted(loaded & set(HEAVY_MODULES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8)
+    args = parser.parse_args()
+
+    for label, (module, cwd) in TARGETS.items():
+        runs = [import_time(module, cwd) for _ in range(args.runs)]
+        total = statistics.median(r[0] for r in runs)
+        print(f"{label} (import {module}): {total:.1f} ms, heavy modules: {', '.join(runs[0][2]) or 'none'}")
+        slowest = sorted(runs[0][1].items(), key=lambda item: -item[1])[:args.top]
+        for name, ms in slowest:
+            print(f"    {name:<40}{ms:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Recognition work per frame: match every face vs. reuse tracked identities
+
+Simulates a 30 fps stream of faces that jitter in place, with people
+arriving over time, and counts the embeddings matched and the time spent
+in the embed + match + track steps.
+
+Usage:
+    python -m benchmarks.bench_tracker [--faces 4] [--frames 900] [--gallery 1000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from ml_model.utils.gallery import EmbeddingGallery
+from ml_model.utils.landmarks import EMBEDDING_DIM, NUM_LANDMARKS, compute_embeddings
+from ml_model.utils.tracker import FaceTracker
+
+FPS = 30
+
+
+def make_stream(n_faces, n_frames, seed=0):
+    """Per-frame landmark arrays (pixels / 1000) for faces that arrive one by one"""
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(0, 0.1, size=(n_faces, NUM_LANDMARKS, 3)).astype(np.float32)
+    base[:, :, 0] += np.arange(n_faces)[:, None] * 0.2
+    arrivals = np.linspace(0, n_frames // 2, n_faces).astype(int)
+    frames = []
+    for f in range(n_frames):
+        present = base[arrivals <= f]
+        jitter = rng.normal(0, 0.001, size=(len(present), 1, 3)).astype(np.float32)
+        frames.append(present + jitter)
+    return frames
+
+
+def boxes_for(points):
+    xs, ys = points[:, :, 0] * 1000, points[:, :, 1] * 1000
+    return np.stack((xs.min(axis=1), ys.min(axis=1), xs.max(axis=1), ys.max(axis=1)), axis=1)
+
+
+def run_every_frame(frames, gallery):
+    matched = 0
+    for points in frames:
+        if len(points):
+            gallery.match(compute_embeddings(points), k=1)
+            matched += len(points)
+    return matched
+
+
+def run_tracked(frames, gallery):
+    tracker = FaceTracker()
+    matched = 0
+    for f, points in enumerate(frames):
+        now = f / FPS
+        tracks = tracker.update(boxes_for(points))
+        pending = tracker.pending(tracks, now=now)
+        if pending:
+            names, sims = gallery.match(compute_embeddings(points[pending]), k=1)
+            for j, i in enumerate(pending):
+                tracker.assign(tracks[i], names[j, 0], float(sims[j, 0]), now=now)
+            matched += len(pending)
+    return matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--faces', type=int, default=4)
+    parser.add_argument('--frames', type=int, default=900)
+    parser.add_argument('--gallery', type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    gallery = EmbeddingGallery.from_arrays(
+        [f'person{i}' for i in range(args.gallery)],
+        rng.normal(size=(args.gallery, EMBEDDING_DIM)).astype(np.float32)
+    )
+    frames = make_stream(args.faces, args.frames)
+    face_frames = sum(len(p) for p in frames)
+
+    t0 = time.perf_counter()
+    every = run_every_frame(frames, gallery)
+    every_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    tracked = run_tracked(frames, gallery)
+    tracked_s = time.perf_counter() - t0
+
+    print(f"{args.frames} frames ({args.frames / FPS:.0f} s at {FPS} fps), {face_frames} face-frames, "
+          f"gallery {args.gallery}")
+    print(f"match every frame  {every:6d} matches  {every_s / args.frames * 1000:7.3f} ms/frame")
+    print(f"tracked identities {tracked:6d} matches  {tracked_s / args.frames * 1000:7.3f} ms/frame "
+          f"({every_s / tracked_s:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
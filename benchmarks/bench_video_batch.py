@@ -0,0 +1,92 @@
+"""
+Offline video processing: decode cost of frame striding and worker scaling
+
+Writes a synthetic MJPG video and times reading every frame vs. reading
+every --stride-th frame and only grab()bing the rest, then runs the
+batch scanner with a stand-in for FaceMesh that spends --landmark-ms per
+sampled frame (FaceMesh is ~15-30 ms on a laptop core) and reports the
+real-time factor for 1..--workers processes. The stand-in sleeps rather
+than computing, so worker scaling shows overlap even on a single core;
+on a real run it is bounded by the number of cores.
+
+Usage:
+    python -m benchmarks.bench_video_batch [--minutes 2] [--stride 5] [--workers 4] [--landmark-ms 20]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from ml_model.utils.gallery_store import GalleryStore
+from ml_model.utils.landmarks import NUM_LANDMARKS, compute_embeddings
+from ml_model.utils.video_batch import plan_segments, read_frames, scan_segments
+
+FPS = 25
+LANDMARK_SECONDS = 0.02
+
+
+def fake_landmarks(frame):
+    time.sleep(LANDMARK_SECONDS)
+    return np.random.default_rng(int(frame[0, 0, 0]) % 4).random((1, NUM_LANDMARKS, 3)).astype(np.float32)
+
+
+def write_video(path, frames, size=(640, 480)):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), FPS, size)
+    # A gradient with a moving block: compresses like a classroom shot, unlike noise
+    background = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+    background[:] = np.linspace(0, 255, size[0], dtype=np.uint8)[np.newaxis, :, np.newaxis]
+    for i in range(frames):
+        frame = background.copy()
+        x = (i * 4) % (size[0] - 80)
+        frame[200:280, x:x + 80] = (40, 90, 200)
+        writer.write(frame)
+    writer.release()
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+def main():
+    global LANDMARK_SECONDS
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--minutes', type=float, default=2)
+    parser.add_argument('--stride', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--landmark-ms', type=float, default=20)
+    args = parser.parse_args()
+    LANDMARK_SECONDS = args.landmark_ms / 1000
+
+    directory = tempfile.mkdtemp()
+    try:
+        video = os.path.join(directory, 'lecture.avi')
+        frames = int(args.minutes * 60 * FPS)
+        write_video(video, frames)
+        duration = frames / FPS
+        store = GalleryStore(os.path.join(directory, 'embeddings'))
+        people = np.concatenate([np.random.default_rng(i).random((1, NUM_LANDMARKS, 3)) for i in range(4)])
+        store.write([f'person{i}' for i in range(4)], compute_embeddings(people.astype(np.float32)))
+
+        _, all_s = timed(lambda: sum(1 for _ in read_frames(video, 0, frames)))
+        _, stride_s = timed(lambda: sum(1 for _ in read_frames(video, 0, frames, args.stride)))
+        print(f"decode {args.minutes:g} min at {FPS} fps: every frame {all_s:.2f}s ({duration / all_s:.0f}x real time), "
+              f"every {args.stride}th {stride_s:.2f}s ({duration / stride_s:.0f}x)")
+
+        segments = plan_segments([video], args.stride, segment_seconds=10)
+        for workers in sorted({1, 2, args.workers}):
+            _, scan_s = timed(lambda: list(scan_segments(segments, store.directory, workers=workers,
+                                                         stride=args.stride, landmarks=fake_landmarks)))
+            print(f"{workers} worker(s), {args.landmark_ms:g} ms/face: {scan_s:.2f}s ({duration / scan_s:.1f}x real time)")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
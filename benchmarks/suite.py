@@ -0,0 +1,335 @@
+"""
+Benchmark suite: recognition, storage and API hot paths, reported as JSON
+
+Times every registered case on seeded synthetic data (benchmarks/synthetic.py):
+embedding construction from landmarks, gallery matching (10 to 100k
+identities), the per-frame metrics, log_attendance against logs of 1k to
+10M records, each Flask route through the test client, and the cold import of
+the API worker, helpers and the trainer in a fresh interpreter. Each case is calibrated to run for
+about --min-time seconds per repeat; the median per-call time is reported.
+
+--output writes the results as JSON. --compare reads a stored result file
+and flags every case whose median is more than --tolerance slower (exit
+status 1), so a baseline saved on the same machine catches regressions:
+
+    python -m benchmarks.suite --output benchmarks/baseline.json
+    ... change code ...
+    python -m benchmarks.suite --compare benchmarks/baseline.json
+
+Usage:
+    python -m benchmarks.suite [--quick | --large] [--family match] [-k gallery=1000] [--output results.json]
+        [--compare baseline.json] [--tolerance 0.25]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks import synthetic
+from ml_model.utils.attendance_store import AttendanceStore
+from ml_model.utils.gallery import EmbeddingGallery
+from ml_model.utils.gallery_transfer import BINARY_TYPE, iter_binary
+from ml_model.utils.landmarks import compute_embeddings
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Sizes per case family for the default, --quick and --large runs
+SIZES = {
+    'embed': {'quick': [1, 4], 'default': [1, 4, 16], 'large': [1, 4, 16]},
+    'match': {'quick': [10, 1000], 'default': [10, 1000, 10000], 'large': [10, 1000, 10000, 100000]},
+    'log_attendance': {'quick': [1000], 'default': [1000, 100000], 'large': [1000, 100000, 1000000, 10000000]},
+    'metrics': {'quick': [1], 'default': [1], 'large': [1]},
+    'api': {'quick': [1000], 'default': [100000], 'large': [1000000]},
+    'startup': {'quick': [1], 'default': [1], 'large': [1]},
+}
+# Gallery size behind the API routes
+API_GALLERY = 1000
+
+CASES = []
+
+
+class Skip(Exception):
+    """Raised by a case that can't run in this environment"""
+
+
+def case(family):
+    """Register `fn(size, fixtures) -> {label: callable}` for every size of `family`"""
+    def register(fn):
+        CASES.append((family, fn))
+        return fn
+    return register
+
+
+class Fixtures:
+    """Synthetic data shared between cases, built once per run in a temporary directory"""
+
+    def __init__(self):
+        self.directory = tempfile.mkdtemp(prefix='bench-')
+        self._built = {}
+
+    def _once(self, key, build):
+        if key not in self._built:
+            self._built[key] = build()
+        return self._built[key]
+
+    def gallery(self, identities):
+        return self._once(('gallery', identities), lambda: synthetic.write_gallery(
+            os.path.join(self.directory, f'gallery{identities}'), identities))
+
+    def attendance_json(self, records):
+        """Legacy attendance.json path whose .db sibling holds `records` records"""
+        def build():
+            path = os.path.join(self.directory, f'attendance{records}', 'attendance.json')
+            synthetic.fill_attendance_store(path[:-len('.json')] + '.db', records).close()
+            return path
+        return self._once(('attendance', records), build)
+
+    def copy_attendance_json(self, records, label):
+        """A private copy of the attendance log for cases that write to it"""
+        source = self.attendance_json(records)
+        path = os.path.join(self.directory, f'{label}{records}', 'attendance.json')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copy(source[:-len('.json')] + '.db', path[:-len('.json')] + '.db')
+        return path
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+@case('embed')
+def embed_cases(faces, fixtures):
+    points = synthetic.landmark_arrays(faces)
+    return {f'embed/faces={faces}': lambda: compute_embeddings(points)}
+
+
+@case('match')
+def match_cases(identities, fixtures):
+    names, matrix = synthetic.gallery_arrays(identities)
+    gallery = EmbeddingGallery.from_arrays(names, matrix)
+    queries = compute_embeddings(synthetic.landmark_arrays(4))
+    return {f'match/gallery={identities}': lambda: gallery.match(queries, k=1)}
+
+
+@case('log_attendance')
+def log_cases(records, fixtures):
+    try:
+        from ml_model.utils import helpers
+    except ImportError as e:
+        raise Skip(f"utils.helpers is not importable: {e}")
+    path = fixtures.copy_attendance_json(records, 'log')
+    helpers.ATTENDANCE_DB = path[:-len('.json')] + '.db'
+    helpers._last_seen = None
+    helpers.get_last_seen_index()
+    counter = iter(range(10 ** 9))
+    # A new name every call, so every call inserts
+    return {f'log_attendance/history={records}': lambda: helpers.log_attendance(f'visitor{next(counter)}', 0.9)}
+
+
+@case('metrics')
+def metrics_cases(_, fixtures):
+    from benchmarks.bench_metrics import instrument_frame
+    return {'metrics/frame instrumentation': instrument_frame}
+
+
+@case('startup')
+def startup_cases(_, fixtures):
+    from benchmarks.bench_startup import TARGETS
+
+    def cold_import(module, cwd):
+        # A fresh interpreter each call, so nothing is already imported
+        subprocess.run([sys.executable, '-c', f'import {module}'], cwd=cwd, check=True, timeout=120)
+
+    return {f'startup/import {module}': (lambda module=module, cwd=cwd: cold_import(module, cwd))
+            for module, cwd in TARGETS.values()}
+
+
+def _client(attendance_json, embeddings_dir):
+    # app.py imports its siblings as top-level modules, as when run from ml_model/
+    sys.path.insert(0, str(ROOT / 'ml_model'))
+    from app import app
+    app.config['TESTING'] = True
+    app.config['ATTENDANCE_FILE'] = attendance_json
+    app.config['EMBEDDINGS_DIR'] = embeddings_dir
+    return app.test_client()
+
+
+@case('api')
+def api_cases(records, fixtures):
+    attendance_json = fixtures.copy_attendance_json(records, 'api')
+    gallery_dir = os.path.join(fixtures.directory, f'api-gallery{records}')
+    store = synthetic.write_gallery(gallery_dir, API_GALLERY)
+    client = _client(attendance_json, gallery_dir)
+    etag = client.get('/api/gallery').headers['ETag']
+    names, matrix = store.load()
+    body = b''.join(iter_binary(names, matrix, {}))
+    embedding = synthetic.gallery_arrays(1, seed=1)[1][0].tolist()
+    counter = iter(range(10 ** 9))
+    attendance = AttendanceStore(attendance_json[:-len('.json')] + '.db')
+    seeded = iter(range(1, records + 1))
+
+    def record_id():
+        """A seeded record id, or a freshly added one once those run out"""
+        return next(seeded, None) or attendance.add('visitor', 0.9)['id']
+
+    def checked(response, status):
+        assert response.status_code == status, (response.status_code, response.get_data()[:200])
+
+    def enrol_and_remove():
+        name = f'visitor{next(counter)}'
+        checked(client.post(f'/api/embeddings/{name}', json={'embedding': embedding}), 201)
+        checked(client.delete(f'/api/embeddings/{name}'), 200)
+
+    suffix = f'records={records}'
+    # Read-only routes first: the 304 case needs the gallery unchanged since its ETag was taken
+    return {
+        'api/GET /health': lambda: checked(client.get('/health'), 200),
+        f'api/GET /api/attendance?limit=50 {suffix}': lambda: checked(client.get('/api/attendance?limit=50'), 200),
+        f'api/GET /api/attendance?name&limit=50 {suffix}': lambda: checked(
+            client.get(f'/api/attendance?name=person{next(counter) % 500}&exact=1&limit=50'), 200),
+        f'api/GET /api/attendance?date {suffix}': lambda: checked(
+            client.get('/api/attendance?date=2024-01-02&limit=50'), 200),
+        'api/GET /api/cache/stats': lambda: checked(client.get('/api/cache/stats'), 200),
+        f'api/GET /api/embeddings gallery={API_GALLERY}': lambda: checked(client.get('/api/embeddings'), 200),
+        f'api/GET /api/gallery gallery={API_GALLERY}': lambda: checked(client.get('/api/gallery'), 200),
+        f'api/GET /api/gallery (304) gallery={API_GALLERY}': lambda: checked(
+            client.get('/api/gallery', headers={'If-None-Match': etag}), 304),
+        f'api/GET /api/gallery/export?format=binary gallery={API_GALLERY}': lambda: checked(
+            client.get('/api/gallery/export?format=binary'), 200),
+        f'api/POST /api/attendance {suffix}': lambda: checked(client.post(
+            '/api/attendance', json={'name': f'visitor{next(counter)}', 'confidence': 0.9}), 201),
+        f'api/DELETE /api/attendance/<id> {suffix}': lambda: checked(client.delete(f'/api/attendance/{record_id()}'), 200),
+        f'api/POST+DELETE /api/embeddings/<name> gallery={API_GALLERY}': enrol_and_remove,
+        f'api/POST /api/gallery/import gallery={API_GALLERY}': lambda: checked(
+            client.post('/api/gallery/import', data=body, content_type=BINARY_TYPE), 200),
+    }
+
+
+def measure(fn, min_time=0.2, repeat=5):
+    """Median and minimum seconds per call over `repeat` batches of about `min_time` each"""
+    fn()  # warm up (caches, lazy imports)
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / 10 or number >= 10 ** 6:
+            break
+        number *= 10
+    number = max(1, int(number * (min_time / max(elapsed, 1e-9))))
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - started) / number)
+    return {'median_ms': statistics.median(times) * 1000, 'min_ms': min(times) * 1000, 'calls': number * repeat}
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def run(mode='default', keyword=None, families=None, min_time=0.2, repeat=5):
+    """Run every case (of `families`, matching `keyword`) and return {'environment', 'results', 'skipped'}"""
+    fixtures = Fixtures()
+    results, skipped = {}, {}
+    try:
+        for family, build in CASES:
+            if families and family not in families:
+                continue
+            for size in SIZES[family][mode]:
+                try:
+                    cases = build(size, fixtures)
+                except Skip as e:
+                    skipped[f'{family}/{size}'] = str(e)
+                    print(f"  skip {family} ({size}): {e}")
+                    continue
+                for label, fn in cases.items():
+                    if keyword and keyword not in label:
+                        continue
+                    results[label] = measure(fn, min_time, repeat)
+                    print(f"  {label:<68}{results[label]['median_ms']:10.3f} ms")
+    finally:
+        fixtures.close()
+    return {'environment': environment(), 'results': results, 'skipped': skipped}
+
+
+def compare(current, baseline, tolerance=0.25):
+    """[(label, baseline ms, current ms, ratio, status)] for cases in both runs"""
+    rows = []
+    for label, result in current['results'].items():
+        before = baseline['results'].get(label)
+        if before is None:
+            rows.append((label, None, result['median_ms'], None, 'new'))
+            continue
+        ratio = result['median_ms'] / max(before['median_ms'], 1e-9)
+        status = 'REGRESSION' if ratio > 1 + tolerance else 'faster' if ratio < 1 / (1 + tolerance) else 'ok'
+        rows.append((label, before['median_ms'], result['median_ms'], ratio, status))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sizes = parser.add_mutually_exclusive_group()
+    sizes.add_argument('--quick', action='store_true', help="small sizes only")
+    sizes.add_argument('--large', action='store_true', help="add 100k galleries and 1M/10M-record logs")
+    parser.add_argument('--family', action='append', choices=list(SIZES), help="only these case families")
+    parser.add_argument('-k', dest='keyword', default=None, help="only cases whose label contains this")
+    parser.add_argument('--min-time', type=float, default=0.2, help="seconds per timed repeat")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="baseline JSON file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="slowdown ratio counted as a regression")
+    args = parser.parse_args()
+
+    mode = 'quick' if args.quick else 'large' if args.large else 'default'
+    current = run(mode, args.keyword, args.family, args.min_time, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Wrote {len(current['results'])} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        rows = compare(current, baseline, args.tolerance)
+        print(f"\nCompared with {args.compare} (commit {baseline['environment'].get('commit')}, "
+              f"tolerance {args.tolerance:.0%})")
+        for label, before, after, ratio, status in rows:
+            before_text = f"{before:10.3f}" if before is not None else f"{'-':>10}"
+            ratio_text = f"{ratio:6.2f}x" if ratio is not None else f"{'':>7}"
+            print(f"  {label:<68}{before_text} -> {after:10.3f} ms {ratio_text}  {status}")
+        regressions = [row for row in rows if row[4] == 'REGRESSION']
+        if regressions:
+            print(f"{len(regressions)} regression(s)")
+            sys.exit(1)
+        print("No regressions")
+
+
+if __name__ == '__main__':
+    main()
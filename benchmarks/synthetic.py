@@ -0,0 +1,62 @@
+"""
+Synthetic data for the benchmarks: landmarks, galleries and attendance logs
+
+Everything is seeded, so two runs (or a run and a stored baseline) time
+exactly the same data.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from ml_model.utils.attendance_store import AttendanceStore
+from ml_model.utils.gallery_store import GalleryStore
+from ml_model.utils.landmarks import EMBEDDING_DIM, NUM_LANDMARKS
+
+# Rows inserted per transaction when filling an attendance store
+_FILL_CHUNK = 50000
+
+
+def landmark_arrays(faces, seed=0):
+    """(faces, 478, 3) FaceMesh-like points: a jittered face shape in [0, 1]"""
+    rng = np.random.default_rng(seed)
+    shape = np.random.default_rng(12345).random((NUM_LANDMARKS, 3)).astype(np.float32) * [0.3, 0.4, 0.1]
+    offsets = rng.random((faces, 1, 3)).astype(np.float32) * [0.6, 0.5, 0.0]
+    jitter = rng.normal(0, 0.005, (faces, NUM_LANDMARKS, 3)).astype(np.float32)
+    return shape + offsets + jitter
+
+
+def gallery_arrays(identities, dim=EMBEDDING_DIM, seed=0):
+    """(names, (identities, dim) float32 matrix) of random unit embeddings"""
+    rng = np.random.default_rng(seed)
+    matrix = rng.standard_normal((identities, dim), dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    return [f'person{i}' for i in range(identities)], matrix
+
+
+def write_gallery(directory, identities, dim=EMBEDDING_DIM, seed=0):
+    """A GalleryStore in `directory` holding `identities` random people"""
+    store = GalleryStore(directory)
+    store.write(*gallery_arrays(identities, dim, seed))
+    return store
+
+
+def attendance_records(count, people=500, start=datetime(2024, 1, 1), spacing=30):
+    """Yield `count` attendance records, `spacing` seconds apart, cycling through `people` names"""
+    for i in range(count):
+        when = (start + timedelta(seconds=spacing * i)).isoformat()
+        yield {'name': f'person{i % people}', 'confidence': 0.9, 'timestamp': when, 'start_time': when}
+
+
+def fill_attendance_store(path, count, people=500):
+    """An AttendanceStore at `path` with `count` records (10M takes a few minutes)"""
+    store = AttendanceStore(path)
+    chunk = []
+    for record in attendance_records(count, people):
+        chunk.append(record)
+        if len(chunk) == _FILL_CHUNK:
+            store.add_many(chunk)
+            chunk = []
+    if chunk:
+        store.add_many(chunk)
+    return store
@@ -0,0 +1,69 @@
+"""
+Multi-Camera Ingest Server
+
+Headless recognition for many door cameras on one machine. Each source
+(an RTSP/HTTP URL, a local camera index, or a video file played back in
+real time as a stand-in for a camera) is read by its own thread; a fixed
+pool of --workers threads takes the latest frame of each camera in
+round-robin order, so a busy camera can't starve the others and a slow
+pool skips frames instead of falling behind. All cameras share one
+gallery (reloaded when faces are enrolled) and log attendance through the
+same background writer and dedup window as the web app.
+
+Per-camera frame rates and drop counts are printed every --stats-seconds.
+
+Usage:
+    .venv311\Scripts\python.exe ingest_server.py rtsp://cam1/stream rtsp://cam2/stream door3.mp4 [--workers 4]
+        [--name door1 --name door2 ...] [--loop] [--threshold 0.5]
+"""
+
+import argparse
+import time
+
+from ml_model.utils.helpers import get_attendance_writer, watch_gallery
+from ml_model.utils.ingest import IngestServer, open_source
+
+def print_stats(stats):
+    print(f"{'camera':<16}{'in fps':>8}{'fps':>8}{'received':>10}{'processed':>11}{'dropped':>9}{'latency':>10}")
+    for camera, c in stats['cameras'].items():
+        print(f"{camera:<16}{c['input_fps']:>8.1f}{c['fps']:>8.1f}{c['received']:>10}{c['processed']:>11}"
+              f"{c['dropped']:>9}{c['latency_ms']:>8.0f}ms")
+    writer = stats['writer']
+    print(f"recognised {stats['recognised']}, written {writer['written']}, "
+          f"duplicates {writer['duplicates']}, errors {stats['errors']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Recognise faces from many cameras on a shared worker pool")
+    parser.add_argument('sources', nargs='+', help="stream URLs, camera indexes or video files")
+    parser.add_argument('--name', action='append', default=[], help="camera name, once per source in order")
+    parser.add_argument('--workers', type=int, default=4, help="landmark worker threads")
+    parser.add_argument('--threshold', type=float, default=0.5, help="minimum similarity to count as recognised")
+    parser.add_argument('--loop', action='store_true', help="replay video files forever")
+    parser.add_argument('--stats-seconds', type=float, default=10, help="how often to print camera counters")
+    args = parser.parse_args()
+
+    if args.name and len(args.name) != len(args.sources):
+        parser.error("--name must be given once per source")
+    names = args.name or [f'camera{i + 1}' for i in range(len(args.sources))]
+    sources = {name: open_source(spec, loop=args.loop) for name, spec in zip(names, args.sources)}
+
+    watcher = watch_gallery(interval=1.0)
+    print(f"{len(sources)} camera(s), {args.workers} worker(s), {len(watcher.gallery)} enrolled people")
+    server = IngestServer(sources, watcher, get_attendance_writer(), workers=args.workers,
+                          threshold=args.threshold).start()
+    try:
+        printed = time.monotonic()
+        while server.running():
+            time.sleep(0.5)
+            if time.monotonic() - printed >= args.stats_seconds:
+                print_stats(server.stats())
+                printed = time.monotonic()
+        server.drain()
+    except KeyboardInterrupt:
+        print("Stopping...")
+    finally:
+        server.stop()
+        print_stats(server.stats())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Import Attendance Logs into SQLite
+
+Copies the records of a legacy attendance.json file into the SQLite
+attendance store (data/attendance.db by default), keeping record ids.
+Records that are already present are skipped, so it is safe to re-run.
+
+Usage:
+    python migrate_attendance.py [--json data/attendance.json] [--db data/attendance.db]
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from ml_model.utils.attendance_store import AttendanceStore, db_path_for
+
+BASE_DIR = Path(__file__).parent
+ATTENDANCE_FILE = BASE_DIR / 'data' / 'attendance.json'
+
+def main():
+    parser = argparse.ArgumentParser(description="Import attendance.json records into SQLite")
+    parser.add_argument('--json', default=str(ATTENDANCE_FILE), help="legacy attendance.json")
+    parser.add_argument('--db', default=None, help="SQLite database (default: next to --json)")
+    args = parser.parse_args()
+
+    db_path = args.db or db_path_for(args.json)
+    print(f"Source:   {args.json}")
+    print(f"Database: {db_path}")
+
+    store = AttendanceStore(db_path)
+    start = time.perf_counter()
+    imported = store.import_json(args.json)
+    elapsed = time.perf_counter() - start
+
+    print(f"✓ Imported {imported} records in {elapsed:.2f}s ({store.count()} total)")
+
+if __name__ == "__main__":
+    main()
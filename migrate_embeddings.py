@@ -0,0 +1,49 @@
+"""
+Migrate Face Embeddings to the Binary Gallery
+
+Converts the per-person web_app/embeddings/*_embedding.json files into the
+binary gallery (gallery.npy + gallery_index.json) that the recognisers load
+with a memory map. Nothing writes those JSON files any more, so people
+enrolled since the migration exist only in the gallery: an existing gallery
+is only rebuilt from the JSON files with --force.
+
+Usage:
+    python migrate_embeddings.py [--src DIR] [--dest DIR] [--dtype float16] [--force]
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from ml_model.utils.gallery_store import GalleryStore, migrate_json_gallery
+from ml_model.utils.landmarks import EMBEDDING_DIM
+
+BASE_DIR = Path(__file__).parent
+EMBEDDINGS_DIR = BASE_DIR / 'web_app' / 'embeddings'
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert *_embedding.json files into the binary gallery")
+    parser.add_argument('--src', default=str(EMBEDDINGS_DIR), help="directory with *_embedding.json files")
+    parser.add_argument('--dest', default=None, help="gallery directory (default: same as --src)")
+    parser.add_argument('--dtype', default='float32', choices=['float32', 'float16'])
+    parser.add_argument('--dim', type=int, default=EMBEDDING_DIM,
+                        help="keep only embeddings of this length (0 = most common)")
+    parser.add_argument('--force', action='store_true',
+                        help="replace an existing gallery (drops everyone enrolled since the last migration)")
+    args = parser.parse_args()
+
+    store = GalleryStore(args.dest or args.src, dtype=args.dtype)
+    print(f"Source:  {args.src}")
+    print(f"Gallery: {store.matrix_path}")
+    if store.exists() and not args.force:
+        print("ERROR: the gallery already exists; use --force to rebuild it from the JSON files")
+        return
+
+    start = time.perf_counter()
+    names = migrate_json_gallery(args.src, store, dim=args.dim or None)
+    elapsed = time.perf_counter() - start
+
+    print(f"✓ Migrated {len(names)} identities ({args.dtype}) in {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    main()
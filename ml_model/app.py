@@ -1,46 +1,92 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, send_from_directory
 from flask_cors import CORS
 from datetime import datetime
+import hmac
 import os
-import json
+import threading
+import time
 from pathlib import Path
 
+import numpy as np
+
+from utils.ann import sync_ann_index
+from utils.attendance_store import db_path_for, encode_cursor, open_attendance_store
+from utils.gallery_store import open_gallery_store, remove_legacy_json
+from utils.gallery_transfer import (
+    BINARY_TYPE, NDJSON_TYPE, iter_binary, iter_ndjson, parse_binary, parse_ndjson, validate_names
+)
+from utils.query_cache import AttendanceCache
+from utils.timestamps import to_utc, utc_now
+from utils.landmarks import EMBEDDING_DIM
+from utils.metrics import ATTENDANCE_WRITES, CONTENT_TYPE, HTTP_REQUEST_SECONDS, REGISTRY
+from utils.profiling import PROFILE_MODES, list_profiles, max_profile_bytes, read_request, request_profile
+
 app = Flask(__name__)
 CORS(app)
 
-# JSON Storage Configuration
+# Storage Configuration
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, '..', 'data')
 ATTENDANCE_FILE = os.path.join(DATA_DIR, 'attendance.json')
 EMBEDDINGS_DIR = os.path.join(BASE_DIR, '..', 'web_app', 'embeddings')
+PROFILE_DIR = os.path.join(DATA_DIR, 'profiles')
 
-# Ensure directories exist
-os.makedirs(DATA_DIR, exist_ok=True)
-os.makedirs(EMBEDDINGS_DIR, exist_ok=True)
+def ensure_directories():
+    """Create the configured data and embeddings directories.
 
-# Initialize attendance file if it doesn't exist
-if not os.path.exists(ATTENDANCE_FILE):
-    with open(ATTENDANCE_FILE, 'w') as f:
-        json.dump({'records': [], 'next_id': 1}, f, indent=2)
+    Called when the server starts rather than on import; the stores create
+    their own directories on first write, so a WSGI server that imports
+    `app` directly works without it.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(app.config['ATTENDANCE_FILE'])), exist_ok=True)
+    os.makedirs(app.config['EMBEDDINGS_DIR'], exist_ok=True)
 
-def load_attendance_data():
-    """Load attendance data from JSON file"""
-    try:
-        with open(ATTENDANCE_FILE, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Error loading attendance data: {e}")
-        return {'records': [], 'next_id': 1}
+# Page size for GET /api/attendance when paginating
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
 
-def save_attendance_data(data):
-    """Save attendance data to JSON file"""
-    try:
-        with open(ATTENDANCE_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
-        return True
-    except Exception as e:
-        print(f"Error saving attendance data: {e}")
-        return False
+# Attendance lives in SQLite next to the legacy JSON file (data/attendance.db)
+app.config.setdefault('ATTENDANCE_FILE', ATTENDANCE_FILE)
+app.config.setdefault('EMBEDDINGS_DIR', EMBEDDINGS_DIR)
+# Profiling of live video sessions; the admin endpoints are off unless a token is set
+app.config.setdefault('PROFILE_DIR', PROFILE_DIR)
+app.config.setdefault('PROFILE_ADMIN_TOKEN', os.environ.get('PROFILE_ADMIN_TOKEN'))
+
+def get_attendance_store():
+    """Attendance store for the configured data file, importing the old JSON log once"""
+    json_path = app.config['ATTENDANCE_FILE']
+    return open_attendance_store(db_path_for(json_path), legacy_json=json_path)
+
+_attendance_caches = {}
+_attendance_caches_lock = threading.Lock()
+
+def get_attendance_cache():
+    """Read cache over the attendance store, one per database file"""
+    store = get_attendance_store()
+    with _attendance_caches_lock:
+        cache = _attendance_caches.get(store.path)
+        if cache is None:
+            cache = _attendance_caches[store.path] = AttendanceCache(store)
+        return cache
+
+def get_gallery_store():
+    """Binary gallery for the configured embeddings directory, migrated from JSON on first use"""
+    return open_gallery_store(app.config['EMBEDDINGS_DIR'], dim=EMBEDDING_DIM)
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    """Request latency per route for /metrics (streamed bodies count until the first byte)"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        # The route pattern, not the path, so ids and names don't each get a series
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method,
+                                     route=route, status=response.status_code)
+    return response
 
 # API Routes
 
@@ -63,29 +109,13 @@ def log_attendance():
         if not (0 <= confidence <= 1):
             return jsonify({'error': 'Confidence must be between 0 and 1'}), 400
         
-        # Load current data
-        attendance_data = load_attendance_data()
-        
-        # Create new record
-        now = datetime.utcnow().isoformat()
-        record = {
-            'id': attendance_data['next_id'],
-            'name': name,
-            'timestamp': now,
-            'confidence': round(confidence, 4),
-            'created_at': now,
-            'start_time': start_time if start_time else now
-        }
-        
-        # Add to records
-        attendance_data['records'].append(record)
-        attendance_data['next_id'] += 1
-        
-        # Save updated data
-        if save_attendance_data(attendance_data):
-            return jsonify(record), 201
-        else:
-            return jsonify({'error': 'Failed to save attendance record'}), 500
+        now = utc_now().isoformat()
+        record = get_attendance_store().add(
+            name, round(confidence, 4), timestamp=now, start_time=start_time
+        )
+        get_attendance_cache().invalidate()
+        ATTENDANCE_WRITES.inc(source='api')
+        return jsonify(record), 201
     
     except ValueError as e:
         return jsonify({'error': f'Invalid data format: {str(e)}'}), 400
@@ -94,32 +124,65 @@ def log_attendance():
 
 @app.route('/api/attendance', methods=['GET'])
 def get_attendance():
-    """Fetch attendance records with optional filtering"""
+    """Fetch attendance records with optional filtering and pagination"""
     try:
         name = request.args.get('name', '').strip()
         date = request.args.get('date', '').strip()
+        exact = request.args.get('exact', '').lower() in ('1', 'true', 'yes')
+        start = request.args.get('from', '').strip()
+        end = request.args.get('to', '').strip()
+        cursor = request.args.get('cursor', '').strip()
         
-        # Load attendance data
-        attendance_data = load_attendance_data()
-        records = attendance_data.get('records', [])
-        
-        # Filter by name
-        if name:
-            records = [r for r in records if name.lower() in r['name'].lower()]
-        
-        # Filter by date
         if date:
             try:
                 # Validate date format
                 datetime.strptime(date, '%Y-%m-%d')
-                records = [r for r in records if r['timestamp'].startswith(date)]
             except ValueError:
                 return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
         
-        # Sort by timestamp descending
-        records = sorted(records, key=lambda x: x['timestamp'], reverse=True)
+        bounds = {}
+        for label, value in (('from', start), ('to', end)):
+            if value:
+                try:
+                    # Stored timestamps are naive UTC ISO strings and compared as text, so
+                    # offsets are converted and a bare date becomes midnight
+                    bounds[label] = to_utc(value).isoformat()
+                except ValueError:
+                    return jsonify({'error': f'Invalid {label} timestamp. Use ISO 8601'}), 400
+        start, end = bounds.get('from', ''), bounds.get('to', '')
+        
+        filters = {'name': name, 'date': date, 'exact': exact, 'start': start, 'end': end}
+        cache = get_attendance_cache()
         
-        return jsonify(records), 200
+        # Without paging parameters the full list is returned, as before
+        if not any(key in request.args for key in ('limit', 'offset', 'cursor')):
+            return jsonify(cache.query(**filters)), 200
+        
+        try:
+            limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+            offset = int(request.args.get('offset', 0))
+        except ValueError:
+            return jsonify({'error': 'limit and offset must be integers'}), 400
+        if limit < 1 or offset < 0:
+            return jsonify({'error': 'limit must be positive and offset non-negative'}), 400
+        limit = min(limit, MAX_PAGE_SIZE)
+        
+        try:
+            records = cache.query(limit=limit + 1, offset=offset, cursor=cursor or None, **filters)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # One extra row tells us whether there is a next page without counting
+        has_more = len(records) > limit
+        records = records[:limit]
+        
+        return jsonify({
+            'records': records,
+            'total': cache.count(**filters),
+            'limit': limit,
+            'offset': 0 if cursor else offset,
+            'next_cursor': encode_cursor(records[-1]) if has_more else None
+        }), 200
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -128,25 +191,11 @@ def get_attendance():
 def delete_attendance(record_id):
     """Delete a specific attendance record"""
     try:
-        # Load attendance data
-        attendance_data = load_attendance_data()
-        records = attendance_data.get('records', [])
-        
-        # Find and remove record
-        original_length = len(records)
-        records = [r for r in records if r['id'] != record_id]
-        
-        if len(records) == original_length:
+        if not get_attendance_store().delete(record_id):
             return jsonify({'error': 'Record not found'}), 404
+        get_attendance_cache().invalidate()
         
-        # Update data
-        attendance_data['records'] = records
-        
-        # Save updated data
-        if save_attendance_data(attendance_data):
-            return jsonify({'success': True, 'message': 'Record deleted successfully'}), 200
-        else:
-            return jsonify({'error': 'Failed to delete record'}), 500
+        return jsonify({'success': True, 'message': 'Record deleted successfully'}), 200
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -155,18 +204,16 @@ def delete_attendance(record_id):
 def get_embeddings():
     """List all trained people/embeddings"""
     try:
-        if not os.path.exists(EMBEDDINGS_DIR):
+        if not os.path.exists(app.config['EMBEDDINGS_DIR']):
             return jsonify([]), 200
         
-        embeddings_list = []
-        
-        for filename in os.listdir(EMBEDDINGS_DIR):
-            if filename.endswith('_embedding.json'):
-                person_name = filename.replace('_embedding.json', '')
-                embeddings_list.append({
-                    'name': person_name,
-                    'path': f'embeddings/{filename}'
-                })
+        # The gallery index lists every enrolled name without opening per-person files;
+        # vectors come from GET /api/gallery
+        index = get_gallery_store().read_index()
+        embeddings_list = [
+            {'name': name, 'saved_at': index['meta'].get(name, {}).get('saved_at')}
+            for name in index['names']
+        ]
         
         return jsonify(sorted(embeddings_list, key=lambda x: x['name'])), 200
     
@@ -182,22 +229,22 @@ def save_embedding(name):
         if not data or 'embedding' not in data:
             return jsonify({'error': 'Missing embedding data'}), 400
         
-        name = name.strip()
-        if not name:
-            return jsonify({'error': 'Name cannot be empty'}), 400
-        
-        os.makedirs(EMBEDDINGS_DIR, exist_ok=True)
+        try:
+            name, = validate_names([name])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        embedding_file = os.path.join(EMBEDDINGS_DIR, f'{name}_embedding.json')
-        
-        embedding_data = {
-            'name': name,
-            'embedding': data['embedding'],
-            'saved_at': datetime.utcnow().isoformat()
-        }
-        
-        with open(embedding_file, 'w') as f:
-            json.dump(embedding_data, f, indent=2)
+        store = get_gallery_store()
+        # Held across the gallery and ANN index writes so another worker's save or delete can't interleave
+        with store.lock():
+            try:
+                embedding = np.asarray(data['embedding'], dtype=np.float32)
+                store.upsert(name, embedding, saved_at=utc_now().isoformat())
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            remove_legacy_json(app.config['EMBEDDINGS_DIR'], name)
+            # Keep the saved ANN index current so a restarted worker has nothing to reassign
+            sync_ann_index(store)
         
         return jsonify({'success': True, 'message': f'Embedding saved for {name}'}), 201
     
@@ -208,29 +255,179 @@ def save_embedding(name):
 def delete_embedding(name):
     """Delete an embedding"""
     try:
-        name = name.strip()
-        if not name:
-            return jsonify({'error': 'Name cannot be empty'}), 400
+        try:
+            name, = validate_names([name])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        embedding_file = os.path.join(EMBEDDINGS_DIR, f'{name}_embedding.json')
+        store = get_gallery_store()
+        with store.lock():
+            removed = store.remove(name)
+            # A legacy file alone still counts, so it can be cleaned up through the API
+            removed = remove_legacy_json(app.config['EMBEDDINGS_DIR'], name) or removed
+            sync_ann_index(store)
         
-        if not os.path.exists(embedding_file):
+        if not removed:
             return jsonify({'error': 'Embedding not found'}), 404
         
-        os.remove(embedding_file)
-        
         return jsonify({'success': True, 'message': f'Embedding deleted for {name}'}), 200
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/gallery', methods=['GET'])
+def get_gallery():
+    """Every embedding in one binary response, with an ETag for revalidation"""
+    try:
+        store = get_gallery_store()
+        index = store.read_index()
+        version = store.version()
+        # The generation changes on every enrolment; the mtime guards against a recreated index
+        etag = f"{index['generation']}-{version[1] if version else 0:x}"
+        if etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            # A copy: other workers rewrite rows in place while the body streams
+            index, names, matrix = store.snapshot()
+            etag = f"{index['generation']}-{version[1] if version else 0:x}"
+            response = Response(iter_binary(names, matrix, index['meta'], generation=index['generation']),
+                                mimetype=BINARY_TYPE)
+        response.set_etag(etag)
+        # Cache, but check the ETag with the server before every reuse
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/gallery/import', methods=['POST'])
+def import_gallery():
+    """Save many embeddings in one request (JSON lines or the binary format)"""
+    try:
+        try:
+            if request.mimetype == BINARY_TYPE:
+                names, matrix, meta = parse_binary(request.get_data())
+            elif request.mimetype == NDJSON_TYPE:
+                names, matrix, meta = parse_ndjson(request.stream)
+            else:
+                return jsonify({'error': f'Content-Type must be {NDJSON_TYPE} or {BINARY_TYPE}'}), 415
+            cleaned = validate_names(names)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not cleaned:
+            return jsonify({'error': 'No embeddings in payload'}), 400
+
+        saved_at = utc_now().isoformat()
+        meta = {clean: dict(meta.get(name) or {}, saved_at=(meta.get(name) or {}).get('saved_at') or saved_at)
+                for name, clean in zip(names, cleaned)}
+        replace = request.args.get('replace', '').lower() in ('1', 'true', 'yes')
+        store = get_gallery_store()
+        with store.lock():
+            changed = list(cleaned)
+            try:
+                if replace:
+                    changed += [name for name in store.read_index()['names'] if name not in meta]
+                    store.write(cleaned, matrix, meta)
+                else:
+                    store.merge(cleaned, matrix, meta)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
+            for name in changed:
+                remove_legacy_json(app.config['EMBEDDINGS_DIR'], name)
+
+            sync_ann_index(store)
+            total = len(store.read_index()['names'])
+        return jsonify({'success': True, 'imported': len(cleaned), 'total': total}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/gallery/export', methods=['GET'])
+def export_gallery():
+    """Stream every embedding as JSON lines (default) or ?format=binary"""
+    try:
+        fmt = request.args.get('format', 'ndjson').lower()
+        if fmt not in ('ndjson', 'binary'):
+            return jsonify({'error': 'format must be ndjson or binary'}), 400
+
+        # A copy taken under the gallery lock: enrolments and deletes rewrite rows in place
+        index, names, matrix = get_gallery_store().snapshot()
+
+        if fmt == 'binary':
+            body = iter_binary(names, matrix, index['meta'], generation=index['generation'])
+            return Response(body, mimetype=BINARY_TYPE), 200
+        return Response(iter_ndjson(names, matrix, index['meta']), mimetype=NDJSON_TYPE), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss counters of the attendance read cache"""
+    return jsonify(get_attendance_cache().stats()), 200
+
+def check_admin_token():
+    """Error response unless the request carries the configured admin token"""
+    token = app.config.get('PROFILE_ADMIN_TOKEN')
+    if not token:
+        return jsonify({'error': 'Profiling is disabled; set PROFILE_ADMIN_TOKEN to enable it'}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token):
+        return jsonify({'error': 'Invalid or missing X-Admin-Token'}), 401
+    return None
+
+@app.route('/api/admin/profile', methods=['POST'])
+def start_profile():
+    """Ask every live video session to profile its frames for a few seconds"""
+    denied = check_admin_token()
+    if denied:
+        return denied
+    data = request.get_json(silent=True) or {}
+    mode = data.get('mode', 'cprofile')
+    if mode not in PROFILE_MODES:
+        return jsonify({'error': f'mode must be one of {", ".join(PROFILE_MODES)}'}), 400
+    try:
+        seconds = float(data.get('seconds', 30))
+        profile_request = request_profile(app.config['PROFILE_DIR'], seconds, mode)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'success': True, 'request': profile_request}), 202
+
+@app.route('/api/admin/profile', methods=['GET'])
+def get_profiles():
+    """The latest profiling request and the saved profiles"""
+    denied = check_admin_token()
+    if denied:
+        return denied
+    directory = app.config['PROFILE_DIR']
+    return jsonify({
+        'request': read_request(directory),
+        'profiles': list_profiles(directory),
+        'max_bytes': max_profile_bytes(),
+    }), 200
+
+@app.route('/api/admin/profile/<filename>', methods=['GET'])
+def download_profile(filename):
+    """Download one saved profile (.pstats or .folded)"""
+    denied = check_admin_token()
+    if denied:
+        return denied
+    if filename not in {p['name'] for p in list_profiles(app.config['PROFILE_DIR'])}:
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_from_directory(os.path.abspath(app.config['PROFILE_DIR']), filename, as_attachment=True)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Request timings and counters in the Prometheus text format"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE), 200
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
     return jsonify({'status': 'ok'}), 200
 
 if __name__ == '__main__':
-    import os
+    ensure_directories()
     # Get port from environment variable (for deployment platforms like Render, Railway)
     port = int(os.environ.get('PORT', 5000))
     # Disable debug in production for security
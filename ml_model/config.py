@@ -32,8 +32,3 @@ SIMILARITY_THRESHOLD = 0.1
 API_HOST = '127.0.0.1'
 API_PORT = 5000
 API_DEBUG = True
-
-# Ensure directories exist
-os.makedirs(DATA_DIR, exist_ok=True)
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-os.makedirs(EMBEDDINGS_DIR, exist_ok=True)
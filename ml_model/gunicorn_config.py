@@ -0,0 +1,37 @@
+"""
+Gunicorn settings for serving the REST API with several worker processes
+
+Usage:
+    gunicorn -c ml_model/gunicorn_config.py app:app
+
+Workers share data/attendance.db (SQLite in WAL mode) and the embeddings
+directory (writes serialised by utils.file_lock), so records are not
+lost between them. Each worker keeps its own /metrics counters and read
+cache.
+"""
+
+import multiprocessing
+import os
+
+# Run from ml_model/ so app.py's `from utils...` imports resolve
+chdir = os.path.dirname(os.path.abspath(__file__))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+timeout = 30
+keepalive = 2
+
+# Import the app in each worker, so no SQLite connection is ever inherited across fork
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+loglevel = 'info'
+proc_name = 'face-attendance-api'
+
+
+def post_worker_init(worker):
+    # In the worker, which has just imported the app; the master never imports it
+    from app import ensure_directories
+    ensure_directories()
@@ -1,49 +1,34 @@
 import os
 import json
+import argparse
 import numpy as np
-from utils.extract_embedding import get_embedding
+from utils.enrollment import list_person_images, train_people
 
 DATA_DIR = "data/"
 OUTPUT_DIR = "output/"
 
 
-def train_person(person_name):
-    folder = os.path.join(DATA_DIR, person_name)
-    embeddings = []
-
-    for img in os.listdir(folder):
-        if img.startswith("."):
-            continue
-
-        path = os.path.join(folder, img)
-        print(f"Processing {person_name}: {img}")
-        emb = get_embedding(path)
-
-        if emb is not None:
-            embeddings.append(emb)
-
-    if not embeddings:
-        print(f"❌ No valid faces found for {person_name}")
-        return None
-
-    avg = np.mean(np.array(embeddings), axis=0)
-    avg = avg / np.linalg.norm(avg)
-
-    return avg.tolist()
-
-
 def main():
-    persons = [d for d in os.listdir(DATA_DIR) if os.path.isdir(os.path.join(DATA_DIR, d))]
+    parser = argparse.ArgumentParser(description="Average face embeddings per person from data/")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes for face extraction")
+    args = parser.parse_args()
+
+    persons = sorted(d for d in os.listdir(DATA_DIR) if os.path.isdir(os.path.join(DATA_DIR, d)))
+    people = {person: list_person_images(os.path.join(DATA_DIR, person)) for person in persons}
 
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-    for person in persons:
-        emb = train_person(person)
-        if emb:
-            out_file = os.path.join(OUTPUT_DIR, f"{person}_embedding.json")
-            with open(out_file, "w") as f:
-                json.dump({"name": person, "embedding": emb}, f)
-            print(f"✔ Saved: {out_file}")
+    # One FaceMesh graph per worker process instead of one per image
+    for person, avg, _ in train_people(people, workers=args.workers):
+        if avg is None:
+            print(f"❌ No valid faces found for {person}")
+            continue
+
+        avg = avg / np.linalg.norm(avg)
+        out_file = os.path.join(OUTPUT_DIR, f"{person}_embedding.json")
+        with open(out_file, "w") as f:
+            json.dump({"name": person, "embedding": avg.tolist()}, f)
+        print(f"✔ Saved: {out_file}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,147 @@
+import unittest
+from unittest import mock
+import os
+import tempfile
+import shutil
+import numpy as np
+from utils.ann import ANN_INDEX_FILE, IVFIndex, open_ann_index, sync_ann_index
+from utils.gallery import EmbeddingGallery
+from utils.gallery_store import GalleryStore, GalleryWatcher
+
+DIM = 32
+
+def clustered(rng, count, clusters=40):
+    """Unit vectors around a few centres, like faces of similar-looking people"""
+    centres = rng.standard_normal((clusters, DIM))
+    vectors = centres[rng.integers(clusters, size=count)] + 0.5 * rng.standard_normal((count, DIM))
+    return vectors.astype(np.float32)
+
+class IVFIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+        self.vectors = clustered(self.rng, 3000)
+        self.names = [f'p{i}' for i in range(len(self.vectors))]
+
+    def test_small_gallery_is_exact(self):
+        """Test that below MIN_TRAIN_SIZE the index is one exact list"""
+        index = IVFIndex.from_arrays(self.names[:100], self.vectors[:100])
+        self.assertEqual(index.nlist, 1)
+        exact = EmbeddingGallery.from_arrays(self.names[:100], self.vectors[:100])
+        queries = self.vectors[:10] + 0.1 * self.rng.standard_normal((10, DIM)).astype(np.float32)
+        names, scores = index.match(queries, k=3)
+        exact_names, exact_scores = exact.match(queries, k=3)
+        np.testing.assert_array_equal(names, exact_names)
+        np.testing.assert_allclose(scores, exact_scores, rtol=1e-5)
+
+    def test_recall_against_exact_search(self):
+        """Test that probing a few lists finds the exact nearest neighbour"""
+        index = IVFIndex.from_arrays(self.names, self.vectors, nprobe=8)
+        self.assertEqual(index.nlist, 55)
+        self.assertEqual(index.list_sizes().sum(), 3000)
+        exact = EmbeddingGallery.from_arrays(self.names, self.vectors)
+        queries = self.vectors[:200] + 0.2 * self.rng.standard_normal((200, DIM)).astype(np.float32)
+        names, _ = index.match(queries)
+        exact_names, _ = exact.match(queries)
+        self.assertGreater(np.mean(names[:, 0] == exact_names[:, 0]), 0.95)
+        # Probing every list is exact
+        names, _ = index.match(queries, nprobe=index.nlist)
+        np.testing.assert_array_equal(names[:, 0], exact_names[:, 0])
+
+        # int8 lists with a float32 re-rank find the same identities and scores
+        rows = dict(zip(self.names, self.vectors))
+        int8 = IVFIndex.from_arrays(self.names, self.vectors, nprobe=8, precision='int8',
+                                    exact=lambda names: np.stack([rows[n] for n in names]))
+        self.assertAlmostEqual(index.nbytes / int8.nbytes, DIM * 4 / (DIM + 4))
+        q_names, q_scores = int8.match(queries, k=2)
+        f_names, f_scores = index.match(queries, k=2)
+        np.testing.assert_array_equal(q_names[:, 0], f_names[:, 0])
+        np.testing.assert_allclose(q_scores[:, 0], f_scores[:, 0], rtol=1e-5)
+
+    def test_add_and_remove(self):
+        """Test enrolments and removals on a trained index"""
+        index = IVFIndex.from_arrays(self.names, self.vectors)
+        index.add('new', self.vectors[5] * 3)
+        index.add('p7', self.vectors[9])
+        self.assertTrue(index.remove('p1'))
+        self.assertFalse(index.remove('p1'))
+        self.assertEqual(len(index), 3000)
+        self.assertNotIn('p1', index)
+        names, _ = index.match(np.stack([self.vectors[5], self.vectors[9]]), k=2)
+        self.assertEqual(set(names[0]), {'p5', 'new'})
+        self.assertEqual(set(names[1]), {'p7', 'p9'})
+        with self.assertRaises(ValueError):
+            index.add('bad', np.ones(DIM + 1))
+
+class AnnPersistenceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.rng = np.random.default_rng(1)
+        self.vectors = clustered(self.rng, 2500)
+        self.store = GalleryStore(self.test_dir)
+        self.store.write([f'p{i}' for i in range(2500)], self.vectors)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_reopen_reuses_saved_lists(self):
+        """Test that a saved index is reused and only changes are reassigned"""
+        index = open_ann_index(self.store, nprobe=4)
+        path = os.path.join(self.test_dir, ANN_INDEX_FILE)
+        self.assertTrue(os.path.exists(path))
+
+        self.store.upsert('p3', self.vectors[10])
+        self.store.remove('p4')
+        self.store.upsert('late', self.vectors[20])
+        # Reopening must not retrain
+        with mock.patch('utils.ann.train_centroids', side_effect=AssertionError):
+            reopened = open_ann_index(self.store)
+        np.testing.assert_array_equal(reopened.centroids, index.centroids)
+        self.assertEqual(reopened.nprobe, 4)
+        self.assertEqual(len(reopened), 2500)
+        self.assertNotIn('p4', reopened)
+        names, _ = reopened.match(np.stack([self.vectors[10], self.vectors[20]]), k=2, nprobe=reopened.nlist)
+        self.assertEqual(set(names[0]), {'p3', 'p10'})
+        self.assertEqual(set(names[1]), {'late', 'p20'})
+
+        _, changed = IVFIndex.restore(path, *self.store.load(), self.store.read_index()['meta'])
+        self.assertEqual(changed, 0)
+
+    def test_sync_keeps_saved_index_current(self):
+        """Test that enrolments and deletes are written to the saved index"""
+        index = open_ann_index(self.store, nprobe=4)
+        path = os.path.join(self.test_dir, ANN_INDEX_FILE)
+        self.assertEqual(sync_ann_index(self.store), 0)
+
+        self.store.upsert('p3', self.vectors[10])
+        self.store.remove('p4')
+        self.store.upsert('late', self.vectors[20])
+        self.assertEqual(sync_ann_index(self.store), 3)
+
+        # A restarted worker finds nothing to reassign
+        restored, changed = IVFIndex.restore(path, *self.store.load(), self.store.read_index()['meta'])
+        self.assertEqual(changed, 0)
+        np.testing.assert_array_equal(restored.centroids, index.centroids)
+        self.assertEqual(restored.nprobe, 4)
+        self.assertNotIn('p4', restored)
+        names, _ = restored.match(self.vectors[20][None], k=2)
+        self.assertEqual(set(names[0]), {'late', 'p20'})
+
+    def test_sync_without_saved_index(self):
+        """Test that nothing is written until an index has been opened"""
+        self.store.upsert('late', self.vectors[20])
+        self.assertEqual(sync_ann_index(self.store), 0)
+        self.assertFalse(os.path.exists(os.path.join(self.test_dir, ANN_INDEX_FILE)))
+
+    def test_watcher_uses_ann_factory(self):
+        """Test that a watcher can serve matches from the ANN index"""
+        watcher = GalleryWatcher(self.store, interval=0, factory=open_ann_index)
+        watcher.sync()
+        self.assertIsInstance(watcher.gallery, IVFIndex)
+        self.store.upsert('late', self.vectors[0] * 2)
+        self.assertTrue(watcher.poll())
+        self.assertIn('late', watcher.gallery)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,7 +4,11 @@ import os
 import tempfile
 import shutil
 from datetime import datetime
-from app import app, load_attendance_data, save_attendance_data, ATTENDANCE_FILE, EMBEDDINGS_DIR
+import numpy as np
+from app import app, get_attendance_store, get_gallery_store, ATTENDANCE_FILE, EMBEDDINGS_DIR
+from utils.ann import ANN_INDEX_FILE, IVFIndex, open_ann_index
+from utils.gallery_transfer import iter_binary, parse_binary
+from utils.timestamps import utc_now
 
 class AttendanceAPITestCase(unittest.TestCase):
     
@@ -40,6 +44,48 @@ class AttendanceAPITestCase(unittest.TestCase):
         data = json.loads(response.data)
         self.assertEqual(data['status'], 'ok')
     
+    def test_metrics(self):
+        """Test that /metrics reports route timings in the Prometheus format"""
+        self.client.get('/health')
+        self.client.post('/api/attendance', json={'name': 'Aditya', 'confidence': 0.9})
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        text = response.get_data(as_text=True)
+        self.assertIn('# TYPE http_request_seconds histogram', text)
+        self.assertIn('http_request_seconds_count{method="GET",route="/health",status="200"}', text)
+        self.assertIn('attendance_writes_total{source="api"}', text)
+    
+    def test_profile_admin(self):
+        """Test the token-guarded profiling request and listing"""
+        app.config['PROFILE_DIR'] = os.path.join(self.test_dir, 'profiles')
+        app.config['PROFILE_ADMIN_TOKEN'] = None
+        response = self.client.post('/api/admin/profile', json={'seconds': 10})
+        self.assertEqual(response.status_code, 403)
+
+        app.config['PROFILE_ADMIN_TOKEN'] = 'secret'
+        try:
+            response = self.client.post('/api/admin/profile', json={'seconds': 10})
+            self.assertEqual(response.status_code, 401)
+            headers = {'X-Admin-Token': 'secret'}
+            response = self.client.post('/api/admin/profile', json={'seconds': 10, 'mode': 'gdb'}, headers=headers)
+            self.assertEqual(response.status_code, 400)
+            response = self.client.post('/api/admin/profile', json={'seconds': 10, 'mode': 'sample'}, headers=headers)
+            self.assertEqual(response.status_code, 202)
+
+            with open(os.path.join(self.test_dir, 'profiles', 'door-1.folded'), 'w') as f:
+                f.write('transform;facemesh 3\n')
+            data = json.loads(self.client.get('/api/admin/profile', headers=headers).data)
+            self.assertEqual(data['request']['mode'], 'sample')
+            self.assertEqual([p['name'] for p in data['profiles']], ['door-1.folded'])
+            response = self.client.get('/api/admin/profile/door-1.folded', headers=headers)
+            self.assertEqual(response.data, b'transform;facemesh 3\n')
+            response.close()
+            response = self.client.get('/api/admin/profile/attendance.db', headers=headers)
+            self.assertEqual(response.status_code, 404)
+        finally:
+            app.config['PROFILE_ADMIN_TOKEN'] = None
+    
     def test_log_attendance_success(self):
         """Test logging attendance with valid data"""
         response = self.client.post('/api/attendance', 
@@ -94,12 +140,83 @@ class AttendanceAPITestCase(unittest.TestCase):
         """Test filtering attendance by date"""
         self.client.post('/api/attendance', json={'name': 'Aditya', 'confidence': 0.95})
         
-        today = datetime.utcnow().strftime('%Y-%m-%d')
+        today = utc_now().strftime('%Y-%m-%d')
         response = self.client.get(f'/api/attendance?date={today}')
         self.assertEqual(response.status_code, 200)
         data = json.loads(response.data)
         self.assertEqual(len(data), 1)
     
+    def test_get_attendance_paginated(self):
+        """Test limit/offset and cursor pagination with totals"""
+        for i in range(5):
+            self.client.post('/api/attendance', json={'name': f'Person{i}', 'confidence': 0.9})
+        
+        response = self.client.get('/api/attendance?limit=2')
+        self.assertEqual(response.status_code, 200)
+        page = json.loads(response.data)
+        self.assertEqual(page['total'], 5)
+        self.assertEqual([r['name'] for r in page['records']], ['Person4', 'Person3'])
+        
+        response = self.client.get(f"/api/attendance?limit=2&cursor={page['next_cursor']}")
+        page = json.loads(response.data)
+        self.assertEqual([r['name'] for r in page['records']], ['Person2', 'Person1'])
+        
+        response = self.client.get('/api/attendance?limit=2&offset=4')
+        page = json.loads(response.data)
+        self.assertEqual([r['name'] for r in page['records']], ['Person0'])
+        self.assertIsNone(page['next_cursor'])
+        
+        response = self.client.get('/api/attendance?limit=0')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/attendance?limit=2&cursor=bogus')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_get_attendance_exact_name_and_range(self):
+        """Test exact-name lookup and from/to filters"""
+        self.client.post('/api/attendance', json={'name': 'Aditya', 'confidence': 0.95})
+        self.client.post('/api/attendance', json={'name': 'Aditya Kumar', 'confidence': 0.9})
+        
+        response = self.client.get('/api/attendance?name=Aditya&exact=1&limit=10')
+        page = json.loads(response.data)
+        self.assertEqual(page['total'], 1)
+        self.assertEqual(page['records'][0]['name'], 'Aditya')
+        
+        response = self.client.get('/api/attendance?from=2000-01-01&to=2000-01-02')
+        self.assertEqual(json.loads(response.data), [])
+        response = self.client.get('/api/attendance?from=yesterday')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_range_bounds_are_normalised(self):
+        """Test that from/to with an offset or a bare date filter on the stored UTC times"""
+        store = get_attendance_store()
+        store.add('Early', 0.9, timestamp='2024-11-26T03:00:00')
+        store.add('Late', 0.9, timestamp='2024-11-26T05:00:00.250000')
+        
+        def names(query):
+            response = self.client.get('/api/attendance?' + query.replace('+', '%2B'))
+            self.assertEqual(response.status_code, 200)
+            return [r['name'] for r in json.loads(response.data)]
+        
+        # 09:00 at +05:30 is 03:30 UTC
+        self.assertEqual(names('from=2024-11-26T09:00:00+05:30'), ['Late'])
+        self.assertEqual(names('to=2024-11-26T09:00:00+05:30'), ['Early'])
+        self.assertEqual(names('from=2024-11-26&to=2024-11-27'), ['Late', 'Early'])
+        # `to` is exclusive
+        self.assertEqual(names('to=2024-11-26T03:00:00'), [])
+        self.assertEqual(names('from=2024-11-26T05:00:00.250000'), ['Late'])
+    
+    def test_attendance_reads_are_cached(self):
+        """Test that unchanged reads hit the cache and writes invalidate it"""
+        self.client.post('/api/attendance', json={'name': 'Aditya', 'confidence': 0.95})
+        self.client.get('/api/attendance')
+        self.client.get('/api/attendance')
+        stats = json.loads(self.client.get('/api/cache/stats').data)
+        self.assertGreaterEqual(stats['hits'], 1)
+        
+        self.client.post('/api/attendance', json={'name': 'John', 'confidence': 0.87})
+        response = self.client.get('/api/attendance')
+        self.assertEqual(len(json.loads(response.data)), 2)
+    
     def test_delete_attendance(self):
         """Test deleting an attendance record"""
         response = self.client.post('/api/attendance', json={'name': 'Aditya', 'confidence': 0.95})
@@ -155,5 +272,138 @@ class AttendanceAPITestCase(unittest.TestCase):
         response = self.client.delete('/api/embeddings/TestPerson')
         self.assertEqual(response.status_code, 200)
 
+    def test_bulk_import_ndjson(self):
+        """Test importing many embeddings as JSON lines in one request"""
+        self.client.post('/api/embeddings/Old', json={'embedding': [1.0, 0.0, 0.0]})
+        lines = [json.dumps({'name': f'p{i}', 'embedding': [float(i), 1.0, 2.0], 'num_images': 2})
+                 for i in range(20)] + [json.dumps({'name': 'Old', 'embedding': [0.0, 0.0, 1.0]})]
+        response = self.client.post('/api/gallery/import', data='\n'.join(lines),
+            content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual((data['imported'], data['total']), (21, 21))
+
+        response = self.client.get('/api/gallery/export')
+        records = {r['name']: r for r in map(json.loads, response.data.decode().splitlines())}
+        self.assertEqual(records['p7']['embedding'], [7.0, 1.0, 2.0])
+        self.assertEqual(records['p7']['num_images'], 2)
+        self.assertEqual(records['Old']['embedding'], [0.0, 0.0, 1.0])
+        self.assertNotIn('generation', records['Old'])
+
+    def test_writers_keep_only_the_binary_gallery(self):
+        """Test that saves write no per-person JSON and clear a stale legacy one"""
+        legacy = os.path.join(self.test_embeddings_dir, 'Old_embedding.json')
+        with open(legacy, 'w') as f:
+            json.dump({'name': 'Old', 'embedding': [0.0, 0.0, 1.0]}, f)
+        self.client.post('/api/embeddings/New', json={'embedding': [1.0, 0.0, 0.0]})
+        self.client.post('/api/embeddings/Old', json={'embedding': [0.0, 1.0, 0.0]})
+        self.assertEqual([f for f in os.listdir(self.test_embeddings_dir) if f.endswith('_embedding.json')], [])
+
+        # A person known only from a legacy file can still be deleted
+        with open(os.path.join(self.test_embeddings_dir, 'Legacy_embedding.json'), 'w') as f:
+            json.dump({'name': 'Legacy', 'embedding': [0.0, 0.0, 1.0]}, f)
+        self.assertEqual(self.client.delete('/api/embeddings/Legacy').status_code, 200)
+        self.assertFalse(os.path.exists(os.path.join(self.test_embeddings_dir, 'Legacy_embedding.json')))
+
+    def test_import_then_list_embeddings(self):
+        """Test that imported people are listed without pointing at deleted per-person files"""
+        self.client.post('/api/embeddings/Old', json={'embedding': [1.0, 0.0, 0.0]})
+        lines = [json.dumps({'name': name, 'embedding': [1.0, 2.0, 3.0]}) for name in ('Old', 'New')]
+        response = self.client.post('/api/gallery/import', data='\n'.join(lines),
+            content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+
+        data = json.loads(self.client.get('/api/embeddings').data)
+        self.assertEqual([e['name'] for e in data], ['New', 'Old'])
+        for entry in data:
+            self.assertNotIn('path', entry)
+            self.assertIsNotNone(entry['saved_at'])
+        self.assertFalse(os.path.exists(os.path.join(self.test_embeddings_dir, 'Old_embedding.json')))
+
+    def test_enrol_and_delete_update_saved_ann_index(self):
+        """Test that a restarted worker finds the saved ANN index current"""
+        self.client.post('/api/embeddings/Old', json={'embedding': [1.0, 0.0, 0.0]})
+        store = get_gallery_store()
+        open_ann_index(store)
+        self.client.post('/api/embeddings/New', json={'embedding': [0.0, 1.0, 0.0]})
+        self.client.delete('/api/embeddings/Old')
+
+        path = os.path.join(self.test_embeddings_dir, ANN_INDEX_FILE)
+        index, changed = IVFIndex.restore(path, *store.load(), store.read_index()['meta'])
+        self.assertEqual(changed, 0)
+        self.assertEqual(list(index.names), ['New'])
+
+    def test_import_rejects_path_names(self):
+        """Test that imported names can't reach files outside the embeddings directory"""
+        victim = os.path.join(self.test_dir, 'x_embedding.json')
+        with open(victim, 'w') as f:
+            f.write('{}')
+        for name in ('../x', '../../x', 'a\\b', 'a\0b', '..'):
+            body = json.dumps({'name': name, 'embedding': [1.0, 2.0, 3.0]})
+            response = self.client.post('/api/gallery/import', data=body, content_type='application/x-ndjson')
+            self.assertEqual(response.status_code, 400, name)
+        response = self.client.post('/api/embeddings/..', json={'embedding': [1.0, 2.0, 3.0]})
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(os.path.exists(victim))
+        self.assertEqual(json.loads(self.client.get('/api/embeddings').data), [])
+
+    def test_bulk_import_is_atomic(self):
+        """Test that a bad line rejects the whole import"""
+        self.client.post('/api/embeddings/Old', json={'embedding': [1.0, 0.0, 0.0]})
+        body = '\n'.join([json.dumps({'name': 'a', 'embedding': [1.0, 2.0, 3.0]}),
+                          json.dumps({'name': 'b', 'embedding': [1.0, 2.0]})])
+        response = self.client.post('/api/gallery/import', data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        body = json.dumps({'name': 'a', 'embedding': [1.0, 2.0]})
+        response = self.client.post('/api/gallery/import', data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        names = [e['name'] for e in json.loads(self.client.get('/api/embeddings').data)]
+        self.assertEqual(names, ['Old'])
+
+    def test_bulk_binary_round_trip(self):
+        """Test exporting the binary format and importing it into another site"""
+        matrix = np.random.default_rng(0).standard_normal((50, 8)).astype(np.float32)
+        names = [f'p{i}' for i in range(50)]
+        payload = b''.join(iter_binary(names, matrix))
+        response = self.client.post('/api/gallery/import', data=payload,
+            content_type='application/octet-stream')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get('/api/gallery/export?format=binary')
+        exported_names, exported, meta = parse_binary(response.data)
+        self.assertEqual(exported_names, names)
+        np.testing.assert_array_equal(exported, matrix)
+        self.assertIn('saved_at', meta['p0'])
+
+        # Replace mode makes the other site an exact copy
+        app.config['EMBEDDINGS_DIR'] = os.path.join(self.test_dir, 'other')
+        self.client.post('/api/embeddings/Stale', json={'embedding': [0.0] * 8})
+        response = self.client.post('/api/gallery/import?replace=1', data=response.data,
+            content_type='application/octet-stream')
+        self.assertEqual(json.loads(response.data)['total'], 50)
+
+    def test_gallery_download_and_etag(self):
+        """Test the single-request gallery download and its 304 revalidation"""
+        self.client.post('/api/embeddings/Aditya', json={'embedding': [0.1, 0.2, 0.3]})
+        self.client.post('/api/embeddings/Sanu', json={'embedding': [0.4, 0.5, 0.6]})
+
+        response = self.client.get('/api/gallery')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        names, matrix, _ = parse_binary(response.data)
+        self.assertEqual(names, ['Aditya', 'Sanu'])
+        np.testing.assert_allclose(matrix[1], [0.4, 0.5, 0.6], rtol=1e-6)
+
+        etag = response.headers['ETag']
+        response = self.client.get('/api/gallery', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+        self.client.delete('/api/embeddings/Sanu')
+        response = self.client.get('/api/gallery', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(parse_binary(response.data)[0], ['Aditya'])
+
 if __name__ == '__main__':
     unittest.main()
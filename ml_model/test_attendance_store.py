@@ -0,0 +1,128 @@
+import unittest
+import json
+import os
+import sqlite3
+import tempfile
+import shutil
+import threading
+from unittest import mock
+from utils.attendance_store import AttendanceStore, FIELDS, db_path_for, encode_cursor, open_attendance_store
+
+class AttendanceStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.store = AttendanceStore(os.path.join(self.test_dir, 'attendance.db'))
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.test_dir)
+
+    def test_wal_mode_and_indexes(self):
+        """Test that the database uses WAL and indexes name and timestamp"""
+        conn = sqlite3.connect(self.store.path)
+        self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT MAX(timestamp) FROM attendance WHERE name = 'x'"
+        ).fetchall()
+        self.assertIn('idx_attendance_name_timestamp', str(plan))
+        conn.close()
+
+    def test_add_keeps_record_shape(self):
+        """Test that records keep the attendance.json fields"""
+        record = self.store.add('Aditya', 0.95, timestamp='2024-11-26T10:30:00')
+        self.assertEqual(tuple(record), FIELDS)
+        self.assertEqual(record['start_time'], '2024-11-26T10:30:00')
+        self.assertEqual(self.store.get(record['id']), record)
+
+    def test_query_filters_and_order(self):
+        """Test name substring and date filters, newest first"""
+        self.store.add('Aditya', 0.9, timestamp='2024-11-26T09:00:00')
+        self.store.add('Sanu', 0.8, timestamp='2024-11-26T10:00:00')
+        self.store.add('aditya k', 0.7, timestamp='2024-11-27T08:00:00')
+
+        records = self.store.query()
+        self.assertEqual([r['timestamp'][:13] for r in records],
+                         ['2024-11-27T08', '2024-11-26T10', '2024-11-26T09'])
+        self.assertEqual(len(self.store.query(name='ADITYA')), 2)
+        self.assertEqual(len(self.store.query(date='2024-11-26')), 2)
+        self.assertEqual(len(self.store.query(name='aditya', date='2024-11-27')), 1)
+        self.assertEqual(self.store.query(name='%'), [])
+
+    def test_pagination_and_range(self):
+        """Test keyset cursors, offsets, from/to bounds and filtered counts"""
+        for hour in range(10):
+            self.store.add('Aditya' if hour % 2 else 'Sanu', 0.9, timestamp=f'2024-11-26T{hour:02d}:00:00')
+        first = self.store.query(limit=3)
+        second = self.store.query(limit=3, cursor=encode_cursor(first[-1]))
+        self.assertEqual([r['timestamp'][11:13] for r in first + second], ['09', '08', '07', '06', '05', '04'])
+        self.assertEqual(self.store.query(limit=3, offset=3), second)
+        exact = self.store.query(name='Aditya', exact=True, start='2024-11-26T03:00:00', end='2024-11-26T07:00:00')
+        self.assertEqual([r['timestamp'][11:13] for r in exact], ['05', '03'])
+        self.assertEqual(self.store.count(name='Sanu', exact=True), 5)
+        self.assertEqual(self.store.count(start='2024-11-26T08:00:00'), 2)
+
+    def test_delete_and_last_seen(self):
+        """Test deleting records and finding a person's latest record"""
+        first = self.store.add('Aditya', 0.9, timestamp='2024-11-26T09:00:00')
+        self.store.add('Aditya', 0.9, timestamp='2024-11-26T11:00:00')
+        self.assertEqual(self.store.last_seen('Aditya'), '2024-11-26T11:00:00')
+        self.assertIsNone(self.store.last_seen('Nobody'))
+        self.assertTrue(self.store.delete(first['id']))
+        self.assertFalse(self.store.delete(first['id']))
+        self.assertEqual(self.store.count(), 1)
+
+    def test_import_json_keeps_ids(self):
+        """Test importing attendance.json preserves ids and next_id"""
+        json_path = os.path.join(self.test_dir, 'attendance.json')
+        with open(json_path, 'w') as f:
+            json.dump({'records': [
+                {'id': 3, 'name': 'Aditya', 'timestamp': '2024-11-26T09:00:00', 'confidence': 0.9,
+                 'created_at': '2024-11-26T09:00:00', 'start_time': '2024-11-26T08:55:00'},
+                {'id': 7, 'name': 'Sanu', 'timestamp': '2024-11-26T10:00:00', 'confidence': 0.8,
+                 'created_at': '2024-11-26T10:00:00', 'start_time': '2024-11-26T10:00:00'},
+            ], 'next_id': 10}, f)
+
+        self.assertEqual(self.store.import_json(json_path), 2)
+        self.assertEqual(self.store.import_json(json_path), 0)
+        self.assertEqual(self.store.get(3)['start_time'], '2024-11-26T08:55:00')
+        self.assertEqual(self.store.add('New', 0.5)['id'], 10)
+
+    def test_open_imports_legacy_json_once(self):
+        """Test that a new database picks up the old JSON log"""
+        json_path = os.path.join(self.test_dir, 'legacy.json')
+        with open(json_path, 'w') as f:
+            json.dump({'records': [{'id': 1, 'name': 'Aditya', 'timestamp': '2024-11-26T09:00:00',
+                                    'confidence': 0.9}], 'next_id': 2}, f)
+        store = open_attendance_store(db_path_for(json_path), legacy_json=json_path)
+        self.assertEqual(store.count(), 1)
+        self.assertIs(open_attendance_store(db_path_for(json_path), legacy_json=json_path), store)
+
+    def test_failed_legacy_import_is_retried(self):
+        """Test that a failed import leaves no database that would skip the next one"""
+        json_path = os.path.join(self.test_dir, 'legacy.json')
+        with open(json_path, 'w') as f:
+            json.dump({'records': [{'id': 1, 'name': 'Aditya', 'timestamp': '2024-11-26T09:00:00',
+                                    'confidence': 0.9}], 'next_id': 2}, f)
+        with mock.patch.object(AttendanceStore, 'import_json', side_effect=OSError('disk error')):
+            with self.assertRaises(OSError):
+                open_attendance_store(db_path_for(json_path), legacy_json=json_path)
+        self.assertFalse(os.path.exists(db_path_for(json_path)))
+
+        store = open_attendance_store(db_path_for(json_path), legacy_json=json_path)
+        self.assertEqual(store.count(), 1)
+
+    def test_concurrent_writers_lose_nothing(self):
+        """Test that writers on several threads all land"""
+        def write(n):
+            for i in range(50):
+                self.store.add(f'person{n}', 0.5)
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.store.count(), 400)
+
+if __name__ == '__main__':
+    unittest.main()
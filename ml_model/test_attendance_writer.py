@@ -0,0 +1,137 @@
+import unittest
+import os
+import tempfile
+import shutil
+import threading
+import time
+from utils.attendance_store import AttendanceStore
+from utils.attendance_writer import AttendanceWriter
+from utils.last_seen import LastSeenIndex
+
+class SlowStore(AttendanceStore):
+    """Store whose commits wait on an event, to hold the worker mid-batch"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.release = threading.Event()
+        self.batches = []
+
+    def add_many(self, records):
+        self.release.wait(5)
+        self.batches.append(len(records))
+        return super().add_many(records)
+
+class FailingStore(AttendanceStore):
+    """Store whose next `failures` commits raise"""
+
+    def __init__(self, path, failures=1):
+        super().__init__(path)
+        self.failures = failures
+
+    def add_many(self, records):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError('disk I/O error')
+        return super().add_many(records)
+
+class AttendanceWriterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'attendance.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_submit_does_not_wait_for_commit(self):
+        """Test that submit returns while the worker is still committing"""
+        store = SlowStore(self.path)
+        writer = AttendanceWriter(store)
+        started = time.perf_counter()
+        for i in range(20):
+            self.assertTrue(writer.submit(f'person{i}', 0.9))
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(store.count(), 0)
+        store.release.set()
+        self.assertTrue(writer.flush(timeout=5))
+        self.assertEqual(store.count(), 20)
+        writer.close()
+
+    def test_burst_is_coalesced(self):
+        """Test that a queued burst is committed in few transactions"""
+        store = SlowStore(self.path)
+        writer = AttendanceWriter(store)
+        writer.submit('first', 0.9)
+        time.sleep(0.1)  # worker is now blocked on the first batch
+        for i in range(50):
+            writer.submit(f'person{i}', 0.9)
+        store.release.set()
+        writer.flush(timeout=5)
+        self.assertEqual(store.batches, [1, 50])
+        stats = writer.stats()
+        self.assertEqual(stats['written'], 51)
+        self.assertEqual(stats['batches'], 2)
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertGreaterEqual(stats['max_commit_ms'], stats['last_commit_ms'])
+        writer.close()
+
+    def test_full_queue_drops(self):
+        """Test that a full queue drops records instead of blocking"""
+        store = SlowStore(self.path)
+        writer = AttendanceWriter(store, maxsize=2)
+        writer.submit('first', 0.9)
+        time.sleep(0.1)
+        self.assertTrue(writer.submit('a', 0.9))
+        self.assertTrue(writer.submit('b', 0.9))
+        self.assertFalse(writer.submit('c', 0.9))
+        self.assertEqual(writer.stats()['dropped'], 1)
+        self.assertEqual(writer.stats()['queue_depth'], 2)
+        store.release.set()
+        writer.close()
+        self.assertEqual(store.count(), 3)
+
+    def test_dedup_window(self):
+        """Test that repeats within the window are rejected before queueing"""
+        store = AttendanceStore(self.path)
+        store.add('Aditya', 0.9, timestamp='2024-11-26T10:00:00')
+        index = LastSeenIndex(window=60)
+        index.seed(store, now='2024-11-26T10:00:20')
+        writer = AttendanceWriter(store, last_seen=index)
+        writer.submit('Aditya', 0.9, timestamp='2024-11-26T10:00:30')
+        writer.submit('Aditya', 0.9, timestamp='2024-11-26T10:01:10')
+        writer.submit('Aditya', 0.9, timestamp='2024-11-26T10:01:20')
+        writer.submit('Sanu', 0.8, timestamp='2024-11-26T10:01:20')
+        writer.close()
+        self.assertEqual([r['timestamp'] for r in store.query(name='Aditya')],
+                         ['2024-11-26T10:01:10', '2024-11-26T10:00:00'])
+        self.assertEqual(len(store.query(name='Sanu')), 1)
+        stats = writer.stats()
+        self.assertEqual(stats['duplicates'], 2)
+        self.assertEqual(stats['queued'], 2)
+
+    def test_failed_commit_does_not_suppress_next_sighting(self):
+        """Test that a sighting lost to a failed commit leaves the person unmarked"""
+        store = FailingStore(self.path)
+        index = LastSeenIndex(window=60)
+        writer = AttendanceWriter(store, last_seen=index)
+        self.assertTrue(writer.submit('Aditya', 0.9, timestamp='2024-11-26T10:00:00'))
+        writer.flush()
+        self.assertEqual(writer.stats()['errors'], 1)
+        self.assertIsNone(index.get('Aditya'))
+
+        self.assertTrue(writer.submit('Aditya', 0.9, timestamp='2024-11-26T10:00:05'))
+        writer.close()
+        self.assertEqual([r['timestamp'] for r in store.query(name='Aditya')], ['2024-11-26T10:00:05'])
+
+    def test_close_flushes_and_rejects(self):
+        """Test that close commits queued records and later submits are dropped"""
+        store = AttendanceStore(self.path)
+        writer = AttendanceWriter(store)
+        for i in range(10):
+            writer.submit(f'person{i}', 0.9)
+        writer.close()
+        self.assertEqual(store.count(), 10)
+        self.assertFalse(writer.submit('late', 0.9))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,205 @@
+import unittest
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import numpy as np
+from utils.attendance_store import AttendanceStore
+from utils.file_lock import atomic_write, file_lock
+from utils.gallery_store import GalleryStore
+
+ML_MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKERS = 4
+ROUNDS = 20
+DIM = 16
+# Records in the old attendance.json that the first worker to start imports
+LEGACY = 30
+
+# One API worker: its own interpreter and Flask app over the shared files
+WORKER = """
+import json, sys
+from app import app
+worker, attendance_file, embeddings_dir, rounds, dim = sys.argv[1:]
+app.config.update(TESTING=True, ATTENDANCE_FILE=attendance_file, EMBEDDINGS_DIR=embeddings_dir)
+client = app.test_client()
+kept, deleted, failures = [], [], []
+for i in range(int(rounds)):
+    name = f'w{worker}-{i}'
+    response = client.post('/api/attendance', json={'name': name, 'confidence': 0.9})
+    if response.status_code != 201:
+        failures.append(response.get_data(as_text=True))
+        continue
+    record_id = response.get_json()['id']
+    vector = [float(worker), float(i)] + [1.0] * (int(dim) - 2)
+    if client.post(f'/api/embeddings/{name}', json={'embedding': vector}).status_code != 201:
+        failures.append(f'save {name}')
+    if i % 3 == 0:
+        if client.delete(f'/api/attendance/{record_id}').status_code != 200:
+            failures.append(f'delete {record_id}')
+        if client.delete(f'/api/embeddings/{name}').status_code != 200:
+            failures.append(f'delete {name}')
+        deleted.append(record_id)
+    else:
+        kept.append([record_id, name])
+print(json.dumps({'kept': kept, 'deleted': deleted, 'failures': failures}))
+"""
+
+# Read-modify-write of a counter file, with or without the lock
+COUNTER = """
+import sys
+from utils.file_lock import file_lock
+path, rounds = sys.argv[1], int(sys.argv[2])
+for _ in range(rounds):
+    with file_lock(path + '.lock'):
+        with open(path) as f:
+            value = int(f.read() or 0)
+        with open(path, 'w') as f:
+            f.write(str(value + 1))
+"""
+
+# Exports the gallery over and over, checking every row still belongs to its name
+EXPORTER = """
+import json, sys
+from app import app
+from utils.gallery_transfer import parse_binary
+embeddings_dir, rounds = sys.argv[1:]
+app.config.update(TESTING=True, EMBEDDINGS_DIR=embeddings_dir)
+client = app.test_client()
+mismatches = []
+for _ in range(int(rounds)):
+    for path in ('/api/gallery/export?format=binary', '/api/gallery'):
+        names, matrix, _ = parse_binary(client.get(path).get_data())
+        mismatches += [name for name, row in zip(names, matrix) if not (row == int(name[1:])).all()]
+print(json.dumps({'mismatches': mismatches}))
+"""
+
+# Deletes every other name, one request at a time
+DELETER = """
+import sys
+from app import app
+embeddings_dir, count = sys.argv[1:]
+app.config.update(TESTING=True, EMBEDDINGS_DIR=embeddings_dir)
+client = app.test_client()
+for i in range(0, int(count), 2):
+    assert client.delete(f'/api/embeddings/p{i}').status_code == 200
+"""
+
+def start_processes(code, args_per_process):
+    """Start one interpreter per argument list"""
+    return [
+        subprocess.Popen([sys.executable, '-c', code, *map(str, args)], cwd=ML_MODEL_DIR,
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        for args in args_per_process
+    ]
+
+def run_processes(code, args_per_process):
+    """Start one interpreter per argument list at once and wait for them all"""
+    return wait_processes(start_processes(code, args_per_process))
+
+def wait_processes(processes):
+    outputs = []
+    for process in processes:
+        stdout, stderr = process.communicate(timeout=120)
+        if process.returncode:
+            raise AssertionError(stderr)
+        outputs.append(stdout)
+    return outputs
+
+class FileLockTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_lock_serialises_processes(self):
+        """Test that no increment is lost when processes update one file under the lock"""
+        path = os.path.join(self.test_dir, 'counter')
+        open(path, 'w').close()
+        run_processes(COUNTER, [[path, 200]] * WORKERS)
+        with open(path) as f:
+            self.assertEqual(int(f.read()), 200 * WORKERS)
+
+    def test_lock_is_reentrant(self):
+        """Test that a thread can nest blocks on the same lock"""
+        path = os.path.join(self.test_dir, 'nested.lock')
+        with file_lock(path):
+            with file_lock(path, shared=True):
+                pass
+            with file_lock(path):
+                pass
+
+    def test_atomic_write(self):
+        """Test that atomic_write replaces the file and leaves no temp files behind"""
+        path = os.path.join(self.test_dir, 'data.json')
+        atomic_write(path, '{"a": ', b'1}')
+        atomic_write(path, json.dumps({'a': 2}))
+        with open(path) as f:
+            self.assertEqual(json.load(f), {'a': 2})
+        self.assertEqual(os.listdir(self.test_dir), ['data.json'])
+
+class MultiWorkerAPITestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.attendance_file = os.path.join(self.test_dir, 'attendance.json')
+        self.embeddings_dir = os.path.join(self.test_dir, 'embeddings')
+        os.makedirs(self.embeddings_dir)
+        # No database yet, only the legacy log: the workers race to create and import it
+        self.legacy = {i: f'legacy{i}' for i in range(1, LEGACY + 1)}
+        with open(self.attendance_file, 'w') as f:
+            json.dump({'records': [
+                {'id': i, 'name': name, 'timestamp': '2024-01-01T09:00:00', 'confidence': 0.9}
+                for i, name in self.legacy.items()
+            ], 'next_id': LEGACY + 1}, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_concurrent_writes_lose_nothing(self):
+        """Test POST/DELETE from several worker processes at once keeps every surviving record"""
+        outputs = run_processes(WORKER, [
+            [worker, self.attendance_file, self.embeddings_dir, ROUNDS, DIM] for worker in range(WORKERS)
+        ])
+        results = [json.loads(output.strip().splitlines()[-1]) for output in outputs]
+        for result in results:
+            self.assertEqual(result['failures'], [])
+        kept = {record_id: name for result in results for record_id, name in result['kept']}
+        deleted = [record_id for result in results for record_id in result['deleted']]
+
+        # Attendance: legacy records imported once, ids unique across workers,
+        # every kept record present and every deleted one gone
+        records = AttendanceStore(os.path.join(self.test_dir, 'attendance.db')).query()
+        self.assertEqual(len(records), len({r['id'] for r in records}))
+        self.assertEqual({r['id']: r['name'] for r in records}, {**self.legacy, **kept})
+        self.assertEqual(len(set(kept) | set(deleted)), WORKERS * ROUNDS)
+        self.assertFalse(set(kept) & set(self.legacy))
+
+        # Gallery: exactly the kept names, each with the row its worker wrote
+        names, matrix = GalleryStore(self.embeddings_dir).load()
+        self.assertEqual(sorted(names), sorted(kept.values()))
+        for name, row in zip(names, np.asarray(matrix)):
+            worker, i = name[1:].split('-')
+            np.testing.assert_array_equal(row[:2], [float(worker), float(i)])
+        self.assertFalse([f for f in os.listdir(self.embeddings_dir) if f.endswith('_embedding.json')])
+        self.assertFalse([f for f in os.listdir(self.embeddings_dir) if f.endswith('.tmp')])
+
+    def test_export_while_deleting(self):
+        """Test that exports overlapping deletes in another worker never pair a name with another row"""
+        count = 400
+        names = [f'p{i}' for i in range(count)]
+        matrix = np.repeat(np.arange(count, dtype=np.float32)[:, None], DIM, axis=1)
+        GalleryStore(self.embeddings_dir).write(names, matrix)
+
+        exporters = start_processes(EXPORTER, [[self.embeddings_dir, 15]] * 2)
+        wait_processes(start_processes(DELETER, [[self.embeddings_dir, count]]))
+        for output in wait_processes(exporters):
+            self.assertEqual(json.loads(output.strip().splitlines()[-1])['mismatches'], [])
+        names, _ = GalleryStore(self.embeddings_dir).load()
+        self.assertEqual(sorted(names), sorted(f'p{i}' for i in range(1, count, 2)))
+
+if __name__ == '__main__':
+    unittest.main()
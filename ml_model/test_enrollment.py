@@ -0,0 +1,117 @@
+import unittest
+from unittest import mock
+import os
+import sys
+import tempfile
+import shutil
+import hashlib
+from pathlib import Path
+import numpy as np
+from utils.enrollment import list_person_images, train_people
+from utils.gallery_store import GalleryStore
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+import train_embeddings
+
+def fake_embed(path):
+    """Deterministic stand-in for FaceMesh: a vector seeded by the file contents"""
+    data = Path(path).read_bytes()
+    if data == b'no face':
+        return None
+    seed = int.from_bytes(hashlib.sha256(data).digest()[:4], 'little')
+    return np.random.default_rng(seed).normal(size=16).astype(np.float32)
+
+class EnrollmentTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.people = {}
+        for p in range(4):
+            person_dir = os.path.join(self.test_dir, f'person{p}')
+            os.makedirs(person_dir)
+            for i in range(5):
+                with open(os.path.join(person_dir, f'img{i}.jpg'), 'wb') as f:
+                    f.write(b'no face' if (p, i) == (1, 2) else f'{p}-{i}'.encode())
+            with open(os.path.join(person_dir, 'notes.txt'), 'w') as f:
+                f.write('ignored')
+            self.people[f'person{p}'] = list_person_images(person_dir)
+        os.makedirs(os.path.join(self.test_dir, 'empty'))
+        self.people['empty'] = []
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_list_person_images(self):
+        """Test that only images are listed, in sorted order"""
+        names = [p.name for p in self.people['person0']]
+        self.assertEqual(names, [f'img{i}.jpg' for i in range(5)])
+
+    def test_serial_averages(self):
+        """Test per-person averages and image counts"""
+        results = {name: (avg, n) for name, avg, n in train_people(self.people, workers=1, embed=fake_embed)}
+        self.assertEqual(results['person1'][1], 4)
+        self.assertEqual(results['empty'], (None, 0))
+        expected = np.mean([fake_embed(p) for p in self.people['person0']], axis=0)
+        np.testing.assert_array_equal(results['person0'][0], expected)
+
+    def test_parallel_matches_serial(self):
+        """Test that a process pool gives bit-identical results"""
+        self.people['alias'] = list(self.people['person0'])  # same files under two names
+        serial = {name: avg for name, avg, _ in train_people(self.people, workers=1, embed=fake_embed)}
+        parallel = {name: avg for name, avg, _ in train_people(self.people, workers=3, chunksize=2, embed=fake_embed)}
+        self.assertEqual(serial.keys(), parallel.keys())
+        for name in serial:
+            if serial[name] is None:
+                self.assertIsNone(parallel[name])
+            else:
+                np.testing.assert_array_equal(serial[name], parallel[name])
+
+class TrainerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.data_dir = Path(self.test_dir) / 'data'
+        self.embeddings_dir = Path(self.test_dir) / 'embeddings'
+        for p in range(3):
+            os.makedirs(self.data_dir / f'person{p}')
+            for i in range(2):
+                (self.data_dir / f'person{p}' / f'img{i}.jpg').write_bytes(f'{p}-{i}'.encode())
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def train(self):
+        """Run train_embeddings.main() on the test directories with fake_embed"""
+        fake_train = lambda people, workers, chunksize, cache: train_people(
+            people, workers, chunksize, embed=fake_embed, cache=cache)
+        with mock.patch.multiple(train_embeddings, DATA_DIR=self.data_dir, EMBEDDINGS_DIR=self.embeddings_dir,
+                                 train_people=fake_train), \
+                mock.patch.object(sys, 'argv', ['train_embeddings.py']):
+            train_embeddings.main()
+        return GalleryStore(str(self.embeddings_dir)).read_index()['names']
+
+    def test_person_without_usable_images_is_removed(self):
+        """Test that a person whose images no longer show a face stops being recognised"""
+        self.assertEqual(sorted(self.train()), ['person0', 'person1', 'person2'])
+        for i in range(2):
+            (self.data_dir / 'person1' / f'img{i}.jpg').write_bytes(b'no face')
+        self.assertEqual(sorted(self.train()), ['person0', 'person2'])
+        self.assertFalse((self.embeddings_dir / 'person1_embedding.json').exists())
+
+    def test_run_writes_the_gallery_once(self):
+        """Test that a run rewrites the names index once, not once per person"""
+        self.train()
+        for p in range(3, 20):
+            os.makedirs(self.data_dir / f'person{p}')
+            (self.data_dir / f'person{p}' / 'img0.jpg').write_bytes(f'{p}'.encode())
+        # The trainer imports the store through the ml_model package
+        store_class = sys.modules[train_embeddings.open_gallery_store.__module__].GalleryStore
+        with mock.patch.object(store_class, '_write_index', autospec=True,
+                               side_effect=store_class._write_index) as write_index:
+            self.assertEqual(len(self.train()), 20)
+        self.assertEqual(write_index.call_count, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import os
+import tempfile
+import shutil
+import time
+from pathlib import Path
+import numpy as np
+from utils.enrollment import list_person_images, train_people
+from utils.enrollment_manifest import EnrollmentManifest, CACHE_FILE
+from test_enrollment import fake_embed
+
+class EnrollmentManifestTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.test_dir, 'data')
+        self.out_dir = os.path.join(self.test_dir, 'embeddings')
+        os.makedirs(self.out_dir)
+        for p in range(3):
+            for i in range(3):
+                self.write_image(f'person{p}', f'img{i}.jpg', f'{p}-{i}')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write_image(self, person, name, content):
+        os.makedirs(os.path.join(self.data_dir, person), exist_ok=True)
+        with open(os.path.join(self.data_dir, person, name), 'w') as f:
+            f.write(content)
+
+    def people(self):
+        return {d.name: list_person_images(d) for d in sorted(Path(self.data_dir).iterdir()) if d.is_dir()}
+
+    def run_training(self):
+        """One incremental run; returns (extracted paths, {name: average})"""
+        people = self.people()
+        manifest = EnrollmentManifest(self.out_dir, self.data_dir)
+        entries, todo, affected = manifest.scan(people)
+        to_train = {name: people[name] for name in affected if name in people}
+        cache = manifest.load_embeddings(entries, [p for paths in to_train.values() for p in paths])
+        averages = {name: avg for name, avg, _ in train_people(to_train, cache=cache, embed=fake_embed)}
+        manifest.save(entries, {path: cache[path] for path in todo})
+        return [Path(p).relative_to(self.data_dir).as_posix() for p in todo], averages, affected
+
+    def full_average(self, person):
+        return np.mean([fake_embed(p) for p in self.people()[person]], axis=0)
+
+    def test_rerun_extracts_nothing(self):
+        """Test that an unchanged dataset is not re-extracted"""
+        todo, averages, _ = self.run_training()
+        self.assertEqual(len(todo), 9)
+        todo, averages, affected = self.run_training()
+        self.assertEqual((todo, averages, affected), ([], {}, set()))
+
+    def test_new_image_updates_only_its_person(self):
+        """Test that one new photo is extracted and only its person re-averaged"""
+        self.run_training()
+        self.write_image('person1', 'img9.jpg', 'new')
+        todo, averages, _ = self.run_training()
+        self.assertEqual(todo, ['person1/img9.jpg'])
+        self.assertEqual(list(averages), ['person1'])
+        np.testing.assert_array_equal(averages['person1'], self.full_average('person1'))
+
+    def test_changed_deleted_and_renamed_images(self):
+        """Test content changes, deletions and renames"""
+        self.run_training()
+        self.write_image('person0', 'img0.jpg', 'edited')
+        os.remove(os.path.join(self.data_dir, 'person2', 'img2.jpg'))
+        os.rename(os.path.join(self.data_dir, 'person1', 'img0.jpg'),
+                  os.path.join(self.data_dir, 'person1', 'renamed.jpg'))
+        todo, averages, affected = self.run_training()
+        self.assertEqual(todo, ['person0/img0.jpg'])
+        self.assertEqual(affected, {'person0', 'person1', 'person2'})
+        for person in ('person0', 'person2'):
+            np.testing.assert_array_equal(averages[person], self.full_average(person))
+
+    def test_touched_file_is_hashed_not_extracted(self):
+        """Test that a new mtime with the same content costs no extraction"""
+        self.run_training()
+        path = os.path.join(self.data_dir, 'person0', 'img1.jpg')
+        future = time.time() + 100
+        os.utime(path, (future, future))
+        todo, averages, affected = self.run_training()
+        self.assertEqual((todo, affected), ([], set()))
+
+    def test_cache_is_compacted(self):
+        """Test that rows of deleted images are reclaimed"""
+        self.run_training()
+        for i in range(3):
+            for p in range(3):
+                os.remove(os.path.join(self.data_dir, f'person{p}', f'img{i}.jpg'))
+            self.write_image('person0', f'new{i}.jpg', f'new-{i}')
+            self.run_training()
+        rows = np.load(os.path.join(self.out_dir, CACHE_FILE), mmap_mode='r').shape[0]
+        self.assertLessEqual(rows, 6)
+        _, averages, _ = self.run_training()
+        manifest = EnrollmentManifest(self.out_dir, self.data_dir)
+        people = self.people()
+        entries, _, _ = manifest.scan(people)
+        cached = manifest.load_embeddings(entries, people['person0'])
+        for path, vector in cached.items():
+            np.testing.assert_array_equal(vector, fake_embed(path))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import os
+import tempfile
+import shutil
+import threading
+import numpy as np
+from utils.attendance_store import AttendanceStore
+from utils.attendance_writer import AttendanceWriter
+from utils.frame_scheduler import FrameScheduler
+from utils.gallery_store import GalleryStore, GalleryWatcher
+from utils.ingest import IngestServer
+from utils.landmarks import NUM_LANDMARKS, compute_embeddings
+from utils.last_seen import LastSeenIndex
+
+def face_points(person):
+    return np.random.default_rng(person).random((1, NUM_LANDMARKS, 3)).astype(np.float32)
+
+class FrameSchedulerTestCase(unittest.TestCase):
+
+    def test_latest_frame_wins(self):
+        """Test that unprocessed frames are replaced and counted as dropped"""
+        scheduler = FrameScheduler(['door'])
+        for i in range(5):
+            scheduler.put('door', i)
+        self.assertEqual(scheduler.get(timeout=0)[:2], ('door', 4))
+        scheduler.done('door')
+        stats = scheduler.stats()['door']
+        self.assertEqual((stats['received'], stats['processed'], stats['dropped']), (5, 1, 4))
+
+    def test_round_robin_and_busy_cameras(self):
+        """Test that a busy camera waits and the others are served in turn"""
+        scheduler = FrameScheduler(['a', 'b', 'c'])
+        for camera in 'abc':
+            scheduler.put(camera, camera + '1')
+        order = [scheduler.get(timeout=0)[0] for _ in range(3)]
+        self.assertEqual(order, ['a', 'b', 'c'])
+        # 'a' has a new frame but its previous one is still being processed
+        scheduler.put('a', 'a2')
+        scheduler.put('b', 'b2')
+        scheduler.done('b')
+        self.assertEqual(scheduler.get(timeout=0)[:2], ('b', 'b2'))
+        self.assertIsNone(scheduler.get(timeout=0))
+        scheduler.done('a')
+        self.assertEqual(scheduler.get(timeout=0)[:2], ('a', 'a2'))
+        self.assertFalse(scheduler.idle())
+
+    def test_close_wakes_workers(self):
+        """Test that close() releases a worker blocked in get()"""
+        scheduler = FrameScheduler(['door'])
+        results = []
+        worker = threading.Thread(target=lambda: results.append(scheduler.get()))
+        worker.start()
+        scheduler.close()
+        worker.join(2)
+        self.assertEqual(results, [None])
+        self.assertFalse(scheduler.put('door', 1))
+
+class IngestServerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.gallery_store = GalleryStore(os.path.join(self.test_dir, 'embeddings'))
+        self.gallery_store.write(['Aditya', 'Sanu'], compute_embeddings(np.concatenate([face_points(1), face_points(2)])))
+        self.store = AttendanceStore(os.path.join(self.test_dir, 'attendance.db'))
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.test_dir)
+
+    def test_cameras_share_gallery_and_writer(self):
+        """Test that every camera's faces reach the common writer once per person"""
+        # Frames are just the person in view; 0 is an empty doorway. Readers
+        # outpace the workers, but the last frame of a camera is never dropped
+        sources = {'door1': [0, 1, 0, 1], 'door2': [2, 2], 'door3': [0, 0, 0]}
+        landmarks = lambda camera, person: face_points(person) if person else np.zeros((0, NUM_LANDMARKS, 3))
+        writer = AttendanceWriter(self.store, last_seen=LastSeenIndex(window=60))
+        server = IngestServer(sources, GalleryWatcher(self.gallery_store), writer, workers=2, landmarks=landmarks)
+        server.start()
+        server.wait_sources(5)
+        self.assertTrue(server.drain(5))
+        server.stop()
+        writer.close()
+
+        self.assertEqual(sorted(r['name'] for r in self.store.query()), ['Aditya', 'Sanu'])
+        stats = server.stats()
+        self.assertEqual(stats['recognised'], 2)
+        self.assertEqual(stats['errors'], 0)
+        for camera, frames in sources.items():
+            counters = stats['cameras'][camera]
+            self.assertEqual(counters['received'], len(frames))
+            self.assertEqual(counters['processed'] + counters['dropped'], len(frames))
+
+if __name__ == '__main__':
+    unittest.main()
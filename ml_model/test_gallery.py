@@ -0,0 +1,131 @@
+import unittest
+import numpy as np
+from utils.gallery import EmbeddingGallery
+from utils.cosine_similarity import cosine_similarity
+
+DIM = 478 * 3 + 7
+
+class EmbeddingGalleryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.embeddings = {f'person{i}': rng.standard_normal(DIM).astype(np.float32) for i in range(20)}
+        self.gallery = EmbeddingGallery.from_embeddings(self.embeddings)
+
+    def brute_force(self, query):
+        """Reference: the per-name loop the gallery replaces"""
+        best_name, best_sim = None, -1
+        for name, known in self.embeddings.items():
+            sim = cosine_similarity(query, known)
+            if sim > best_sim:
+                best_name, best_sim = name, sim
+        return best_name, best_sim
+
+    def test_match_agrees_with_loop(self):
+        """Test that the matrix product picks the same best match as the loop"""
+        rng = np.random.default_rng(1)
+        queries = rng.standard_normal((5, DIM)).astype(np.float32)
+        queries[0] = self.embeddings['person7'] * 3.0
+
+        names, sims = self.gallery.match(queries, k=1)
+        self.assertEqual(names.shape, (5, 1))
+        for i, query in enumerate(queries):
+            best_name, best_sim = self.brute_force(query)
+            self.assertEqual(names[i, 0], best_name)
+            self.assertAlmostEqual(float(sims[i, 0]), best_sim, places=5)
+        self.assertEqual(names[0, 0], 'person7')
+
+    def test_top_k_sorted(self):
+        """Test that top-k results are ordered best first"""
+        query = self.embeddings['person3']
+        names, sims = self.gallery.match(query, k=4)
+        self.assertEqual(names.shape, (1, 4))
+        self.assertEqual(names[0, 0], 'person3')
+        self.assertTrue(np.all(np.diff(sims[0]) <= 0))
+
+        # k larger than the gallery returns every identity
+        names, sims = self.gallery.match(query, k=100)
+        self.assertEqual(names.shape, (1, 20))
+
+    def test_add_remove(self):
+        """Test enrolling and removing without rebuilding"""
+        new = np.ones(DIM, dtype=np.float32)
+        self.gallery.add('newcomer', new)
+        self.assertIn('newcomer', self.gallery)
+        self.assertEqual(len(self.gallery), 21)
+        self.assertEqual(self.gallery.match(new)[0][0, 0], 'newcomer')
+
+        self.assertTrue(self.gallery.remove('person0'))
+        self.assertFalse(self.gallery.remove('person0'))
+        self.assertNotIn('person0', self.gallery)
+        self.assertEqual(len(self.gallery), 20)
+        # The row moved into the hole still matches its own name
+        self.assertEqual(self.gallery.match(new)[0][0, 0], 'newcomer')
+        expected = ['newcomer'] + [n for n in self.embeddings if n != 'person0']
+        self.assertEqual(sorted(self.gallery.names), sorted(expected))
+
+    def test_add_replaces_existing(self):
+        """Test that re-enrolling a name overwrites its row"""
+        new = -self.embeddings['person5']
+        self.gallery.add('person5', new)
+        self.assertEqual(len(self.gallery), 20)
+        np.testing.assert_allclose(self.gallery.get('person5'), new / np.linalg.norm(new), rtol=1e-5)
+
+    def test_grows_past_capacity(self):
+        """Test that the buffer grows when enrolments exceed capacity"""
+        gallery = EmbeddingGallery(dim=3, capacity=2)
+        for i in range(10):
+            gallery.add(f'p{i}', np.array([i + 1, 1, 0], dtype=np.float32))
+        self.assertEqual(len(gallery), 10)
+        self.assertEqual(gallery.matrix.shape, (10, 3))
+
+    def test_mismatched_dimensions_skipped(self):
+        """Test that legacy vectors of another length are skipped"""
+        embeddings = dict(self.embeddings)
+        embeddings['legacy'] = np.ones(478 * 3, dtype=np.float32)
+        gallery = EmbeddingGallery.from_embeddings(embeddings)
+        self.assertNotIn('legacy', gallery)
+        self.assertEqual(gallery.dim, DIM)
+        with self.assertRaises(ValueError):
+            gallery.add('legacy', embeddings['legacy'])
+
+    def test_empty_gallery(self):
+        """Test that matching against an empty gallery returns no candidates"""
+        names, sims = EmbeddingGallery().match(np.ones((2, 3)))
+        self.assertEqual(names.shape, (2, 0))
+        self.assertEqual(sims.shape, (2, 0))
+
+    def test_quantized_precisions(self):
+        """Test float16 and int8 galleries against the float32 one"""
+        rng = np.random.default_rng(2)
+        queries = np.stack([self.embeddings[f'person{i}'] for i in range(20)])
+        queries += 0.5 * rng.standard_normal(queries.shape).astype(np.float32)
+        names, sims = self.gallery.match(queries, k=3)
+        for precision, ratio, atol in (('float16', 2, 1e-3), ('int8', 3.9, 1e-2)):
+            gallery = EmbeddingGallery.from_embeddings(self.embeddings, precision=precision)
+            self.assertAlmostEqual(self.gallery.nbytes / gallery.nbytes, ratio, delta=0.1)
+            q_names, q_sims = gallery.match(queries, k=3)
+            np.testing.assert_array_equal(q_names[:, 0], names[:, 0])
+            np.testing.assert_allclose(q_sims, sims, atol=atol)
+
+        # Add/remove keep the per-row scales aligned
+        gallery = EmbeddingGallery.from_embeddings(self.embeddings, precision='int8')
+        gallery.add('newcomer', np.ones(DIM, dtype=np.float32) * 50)
+        gallery.remove('person0')
+        for name in ['newcomer', 'person19', 'person7']:
+            self.assertEqual(gallery.match(gallery.get(name))[0][0, 0], name)
+
+    def test_quantized_rerank_is_exact(self):
+        """Test that re-ranking returns float32 names and scores"""
+        def exact(names):
+            return np.stack([self.embeddings[n] if n in self.embeddings else np.full(DIM, np.nan)
+                             for n in names]).astype(np.float32)
+        gallery = EmbeddingGallery.from_embeddings(self.embeddings, precision='int8', exact=exact, rerank=5)
+        queries = np.stack([self.embeddings['person3'], self.embeddings['person11'] + 1])
+        names, sims = self.gallery.match(queries, k=2)
+        q_names, q_sims = gallery.match(queries, k=2)
+        np.testing.assert_array_equal(q_names, names)
+        np.testing.assert_allclose(q_sims, sims, rtol=1e-6)
+
+if __name__ == '__main__':
+    unittest.main()
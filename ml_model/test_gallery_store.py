@@ -0,0 +1,197 @@
+import unittest
+import json
+import os
+import tempfile
+import shutil
+import numpy as np
+from utils.gallery import EmbeddingGallery
+from utils.gallery_store import GalleryStore, GalleryWatcher, migrate_json_gallery, open_gallery_store
+
+DIM = 16
+
+class GalleryStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.rng = np.random.default_rng(0)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write_json(self, name, embedding, **extra):
+        with open(os.path.join(self.test_dir, f'{name}_embedding.json'), 'w') as f:
+            json.dump(dict({'name': name, 'embedding': list(map(float, embedding))}, **extra), f, indent=2)
+
+    def test_migrate_json_files(self):
+        """Test one-shot migration from *_embedding.json files"""
+        vectors = {n: self.rng.standard_normal(DIM).astype(np.float32) for n in ['Aditya', 'Sanu', 'Person']}
+        for name, vector in vectors.items():
+            self.write_json(name, vector, num_images=3)
+        self.write_json('legacy', np.ones(DIM - 7))
+
+        store = GalleryStore(self.test_dir)
+        names = migrate_json_gallery(self.test_dir, store)
+        self.assertEqual(sorted(names), ['Aditya', 'Person', 'Sanu'])
+
+        names, matrix = store.load()
+        self.assertIsInstance(matrix, np.memmap)
+        for i, name in enumerate(names):
+            np.testing.assert_allclose(matrix[i], vectors[name], rtol=1e-6)
+        self.assertEqual(store.read_index()['meta']['Sanu']['num_images'], 3)
+
+    def test_open_migrates_once(self):
+        """Test that opening a directory without a gallery migrates it"""
+        self.write_json('Aditya', np.ones(DIM))
+        store = open_gallery_store(self.test_dir)
+        self.assertTrue(store.exists())
+        # Later JSON files are not picked up: the binary gallery is authoritative
+        self.write_json('Sanu', np.ones(DIM))
+        self.assertEqual(open_gallery_store(self.test_dir).read_index()['names'], ['Aditya'])
+
+    def test_upsert_appends_in_place(self):
+        """Test appending and overwriting rows without a full rewrite"""
+        store = GalleryStore(self.test_dir)
+        vectors = self.rng.standard_normal((50, DIM)).astype(np.float32)
+        for i, vector in enumerate(vectors):
+            store.upsert(f'p{i}', vector)
+        store.upsert('p7', vectors[0])
+
+        names, matrix = store.load()
+        self.assertEqual(len(names), 50)
+        self.assertEqual(matrix.shape, (50, DIM))
+        np.testing.assert_array_equal(matrix[names.index('p7')], vectors[0])
+        np.testing.assert_array_equal(matrix[names.index('p49')], vectors[49])
+        # The file is still a valid .npy for plain numpy
+        self.assertEqual(np.load(store.matrix_path).shape, (50, DIM))
+        self.assertEqual(store.read_index()['generation'], 51)
+
+    def test_upsert_rejects_wrong_dimension(self):
+        """Test that a vector of a different length is refused"""
+        store = GalleryStore(self.test_dir)
+        store.upsert('a', np.ones(DIM))
+        with self.assertRaises(ValueError):
+            store.upsert('b', np.ones(DIM + 1))
+
+    def test_remove(self):
+        """Test removing identities keeps names and rows aligned"""
+        store = GalleryStore(self.test_dir)
+        vectors = {f'p{i}': self.rng.standard_normal(DIM).astype(np.float32) for i in range(5)}
+        for name, vector in vectors.items():
+            store.upsert(name, vector)
+
+        self.assertTrue(store.remove('p1'))
+        self.assertFalse(store.remove('p1'))
+        store.upsert('p9', vectors['p1'])
+
+        names, matrix = store.load()
+        self.assertEqual(sorted(names), ['p0', 'p2', 'p3', 'p4', 'p9'])
+        for i, name in enumerate(names):
+            np.testing.assert_array_equal(matrix[i], vectors['p1' if name == 'p9' else name])
+
+    def test_merge(self):
+        """Test bulk add/overwrite in one rewrite"""
+        store = GalleryStore(self.test_dir)
+        vectors = self.rng.standard_normal((6, DIM)).astype(np.float32)
+        store.merge(['a', 'b', 'c'], vectors[:3], {'a': {'num_images': 4}})
+        store.merge(['c', 'd', 'e'], vectors[3:])
+
+        names, matrix = store.load()
+        self.assertEqual(names, ['a', 'b', 'c', 'd', 'e'])
+        np.testing.assert_array_equal(matrix, np.vstack((vectors[:2], vectors[3:])))
+        self.assertEqual(store.read_index()['meta']['a']['num_images'], 4)
+        with self.assertRaises(ValueError):
+            store.merge(['f'], np.ones((1, DIM + 1)))
+
+    def test_rows_by_name(self):
+        """Test reading float32 rows by name, with NaN for unknown names"""
+        store = GalleryStore(self.test_dir)
+        vectors = self.rng.standard_normal((3, DIM)).astype(np.float32)
+        store.write(['a', 'b', 'c'], vectors)
+        rows = store.rows(['c', 'missing', 'a'])
+        np.testing.assert_array_equal(rows[[0, 2]], vectors[[2, 0]])
+        self.assertTrue(np.isnan(rows[1]).all())
+        # The cached name map follows changes
+        store.remove('a')
+        self.assertTrue(np.isnan(store.rows(['a'])).all())
+        np.testing.assert_array_equal(store.rows(['c'])[0], vectors[2])
+
+    def test_float16_storage(self):
+        """Test the half-precision gallery format"""
+        store = GalleryStore(self.test_dir, dtype='float16')
+        vectors = self.rng.standard_normal((4, DIM)).astype(np.float32)
+        store.write(['a', 'b', 'c', 'd'], vectors)
+        store.upsert('e', vectors[0])
+
+        # A store opened without a dtype keeps the on-disk precision
+        reopened = GalleryStore(self.test_dir)
+        self.assertEqual(reopened.dtype, np.float16)
+        names, matrix = reopened.load()
+        self.assertEqual(matrix.dtype, np.float16)
+        np.testing.assert_allclose(matrix[:4], vectors, atol=1e-2)
+
+    def test_gallery_from_store(self):
+        """Test building an EmbeddingGallery from the mapped matrix"""
+        store = GalleryStore(self.test_dir)
+        vectors = self.rng.standard_normal((3, DIM)).astype(np.float32)
+        store.write(['a', 'b', 'c'], vectors)
+        gallery = EmbeddingGallery.from_arrays(*store.load())
+        names, _ = gallery.match(vectors * 2)
+        self.assertEqual(list(names[:, 0]), ['a', 'b', 'c'])
+
+class GalleryWatcherTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.store = GalleryStore(self.test_dir)
+        rng = np.random.default_rng(0)
+        self.vectors = {f'p{i}': rng.standard_normal(DIM).astype(np.float32) for i in range(6)}
+        self.store.write(list(self.vectors)[:4], np.stack(list(self.vectors.values())[:4]))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def assert_matches_own_name(self, gallery):
+        for name in gallery.names:
+            self.assertEqual(gallery.match(self.vectors[name])[0][0, 0], name)
+
+    def test_initial_sync_loads_everything(self):
+        """Test that the first sync loads every identity"""
+        watcher = GalleryWatcher(self.store)
+        self.assertTrue(watcher.sync())
+        self.assertEqual(sorted(watcher.gallery.names), ['p0', 'p1', 'p2', 'p3'])
+        self.assertFalse(watcher.sync())
+
+    def test_poll_applies_only_changes(self):
+        """Test that enrolments and removals reach a running gallery in place"""
+        watcher = GalleryWatcher(self.store, interval=0)
+        watcher.sync()
+        gallery = watcher.gallery
+        self.assertFalse(watcher.poll())
+
+        self.store.upsert('p4', self.vectors['p4'])
+        self.store.remove('p0')
+        self.assertTrue(watcher.poll())
+        # Same gallery object, updated incrementally
+        self.assertIs(watcher.gallery, gallery)
+        self.assertEqual(sorted(gallery.names), ['p1', 'p2', 'p3', 'p4'])
+        self.assert_matches_own_name(gallery)
+
+    def test_poll_picks_up_reenrolment(self):
+        """Test that overwriting an existing name refreshes its embedding"""
+        watcher = GalleryWatcher(self.store, interval=0)
+        watcher.sync()
+        self.store.upsert('p1', self.vectors['p5'])
+        self.assertTrue(watcher.poll())
+        self.assertEqual(watcher.gallery.match(self.vectors['p5'])[0][0, 0], 'p1')
+
+    def test_poll_is_rate_limited(self):
+        """Test that the index is only checked once per interval"""
+        watcher = GalleryWatcher(self.store, interval=10)
+        self.assertTrue(watcher.poll(now=100))
+        self.store.upsert('p4', self.vectors['p4'])
+        self.assertFalse(watcher.poll(now=105))
+        self.assertTrue(watcher.poll(now=111))
+        self.assertIn('p4', watcher.gallery)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+from types import SimpleNamespace
+import numpy as np
+from utils.landmarks import (
+    EMBEDDING_DIM, NUM_LANDMARKS, compute_embeddings, embed_results, landmarks_to_array
+)
+
+def make_face(points):
+    """Mimic a MediaPipe NormalizedLandmarkList"""
+    return SimpleNamespace(landmark=[SimpleNamespace(x=float(x), y=float(y), z=float(z)) for x, y, z in points])
+
+def reference_embedding(landmarks):
+    """The per-landmark loop previously copied into every caller"""
+    raw = []
+    for lm in landmarks:
+        raw.extend([lm.x, lm.y, lm.z])
+    raw = np.array(raw, dtype=np.float32)
+
+    def dist(i1, i2):
+        p1 = landmarks[i1]
+        p2 = landmarks[i2]
+        return np.sqrt((p1.x - p2.x)**2 + (p1.y - p2.y)**2 + (p1.z - p2.z)**2)
+
+    KP = {"leftEye": 33, "rightEye": 263, "nose": 1, "chin": 152, "leftMouth": 61, "rightMouth": 291}
+    derived = [
+        dist(KP["leftEye"], KP["rightEye"]), dist(KP["leftEye"], KP["nose"]),
+        dist(KP["rightEye"], KP["nose"]), dist(KP["nose"], KP["chin"]),
+        dist(KP["leftMouth"], KP["rightMouth"]), dist(KP["leftEye"], KP["chin"]),
+        dist(KP["rightEye"], KP["chin"])
+    ]
+    derived = np.array(derived, dtype=np.float32)
+
+    raw_norm = np.linalg.norm(raw)
+    if raw_norm > 0: raw = raw / raw_norm
+    der_norm = np.linalg.norm(derived)
+    if der_norm > 0: derived = derived / der_norm
+
+    return np.concatenate((raw, derived))
+
+class LandmarkEmbeddingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.points = rng.uniform([0.2, 0.2, -0.1], [0.8, 0.8, 0.1], size=(3, NUM_LANDMARKS, 3))
+        self.results = SimpleNamespace(multi_face_landmarks=[make_face(p) for p in self.points])
+
+    def test_landmarks_to_array_shape(self):
+        """Test conversion of MediaPipe results to an (N, 478, 3) array"""
+        array = landmarks_to_array(self.results.multi_face_landmarks)
+        self.assertEqual(array.shape, (3, NUM_LANDMARKS, 3))
+        self.assertEqual(array.dtype, np.float32)
+        np.testing.assert_allclose(array, self.points, rtol=1e-6)
+
+    def test_matches_reference_implementation(self):
+        """Test that batched embeddings equal the per-face reference output"""
+        embeddings = embed_results(self.results)
+        self.assertEqual(embeddings.shape, (3, EMBEDDING_DIM))
+        for face, emb in zip(self.results.multi_face_landmarks, embeddings):
+            np.testing.assert_allclose(emb, reference_embedding(face.landmark), rtol=1e-5, atol=1e-7)
+
+    def test_single_face_array(self):
+        """Test that a single (478, 3) face is accepted"""
+        emb = compute_embeddings(self.points[0])
+        self.assertEqual(emb.shape, (1, EMBEDDING_DIM))
+
+    def test_both_parts_unit_norm(self):
+        """Test that raw and derived parts are normalised independently"""
+        emb = compute_embeddings(self.points)
+        raw, derived = emb[:, :NUM_LANDMARKS * 3], emb[:, NUM_LANDMARKS * 3:]
+        np.testing.assert_allclose(np.linalg.norm(raw, axis=1), 1.0, rtol=1e-5)
+        np.testing.assert_allclose(np.linalg.norm(derived, axis=1), 1.0, rtol=1e-5)
+
+    def test_no_faces(self):
+        """Test that an empty result gives an empty batch"""
+        embeddings = embed_results(SimpleNamespace(multi_face_landmarks=None))
+        self.assertEqual(embeddings.shape, (0, EMBEDDING_DIM))
+
+if __name__ == '__main__':
+    unittest.main()
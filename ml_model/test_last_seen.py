@@ -0,0 +1,85 @@
+import unittest
+import os
+import tempfile
+import shutil
+from datetime import datetime, timedelta
+from unittest import mock
+from utils.attendance_store import AttendanceStore
+from utils.last_seen import LastSeenIndex
+
+T0 = datetime(2024, 11, 26, 10, 0, 0)
+
+class LastSeenIndexTestCase(unittest.TestCase):
+
+    def test_window(self):
+        """Test that a name is logged once per window"""
+        index = LastSeenIndex(window=60)
+        self.assertTrue(index.should_log('Aditya', T0))
+        self.assertFalse(index.should_log('Aditya', T0 + timedelta(seconds=59)))
+        self.assertTrue(index.should_log('Sanu', T0 + timedelta(seconds=59)))
+        self.assertTrue(index.should_log('Aditya', T0 + timedelta(seconds=60)))
+        self.assertEqual(index.get('Aditya'), T0 + timedelta(seconds=60))
+
+    def test_out_of_order_sightings(self):
+        """Test that an earlier sighting is not a duplicate and doesn't move the window back"""
+        index = LastSeenIndex(window=60)
+        self.assertTrue(index.should_log('Aditya', T0))
+        self.assertTrue(index.should_log('Aditya', T0 - timedelta(seconds=30)))
+        self.assertEqual(index.get('Aditya'), T0)
+        self.assertFalse(index.should_log('Aditya', T0 + timedelta(seconds=59)))
+        self.assertTrue(index.should_log('Aditya', T0 + timedelta(seconds=60)))
+
+    def test_window_from_environment(self):
+        """Test that ATTENDANCE_DEDUP_SECONDS sets the default window"""
+        with mock.patch.dict(os.environ, {'ATTENDANCE_DEDUP_SECONDS': '5'}):
+            index = LastSeenIndex()
+        self.assertEqual(index.window, 5)
+        self.assertTrue(index.should_log('Aditya', T0))
+        self.assertTrue(index.should_log('Aditya', T0 + timedelta(seconds=5)))
+
+    def test_expired_names_are_evicted(self):
+        """Test that names outside the window are dropped from memory"""
+        index = LastSeenIndex(window=60)
+        for i in range(100):
+            index.should_log(f'person{i}', T0)
+        index.should_log('late', T0 + timedelta(seconds=61))
+        self.assertEqual(len(index), 1)
+        self.assertIsNone(index.get('person0'))
+
+    def test_size_bound_evicts_least_recent(self):
+        """Test that at most max_names entries are kept"""
+        index = LastSeenIndex(window=10, max_names=3)
+        for i, name in enumerate(['a', 'b', 'c', 'd']):
+            index.should_log(name, T0 + timedelta(seconds=i))
+        self.assertEqual(len(index), 3)
+        self.assertIsNone(index.get('a'))
+        self.assertIsNotNone(index.get('b'))
+
+    def test_offsets_are_compared_in_utc(self):
+        """Test that a timestamp with an offset and a naive UTC one are the same clock"""
+        index = LastSeenIndex(window=60)
+        self.assertTrue(index.should_log('Aditya', '2024-11-26T15:30:00+05:30'))
+        self.assertEqual(index.get('Aditya'), datetime(2024, 11, 26, 10, 0, 0))
+        self.assertFalse(index.should_log('Aditya', '2024-11-26T10:00:30'))
+        self.assertTrue(index.should_log('Aditya', datetime(2024, 11, 26, 10, 1, 0)))
+
+    def test_seed_from_store(self):
+        """Test that seeding loads names logged within the window only"""
+        test_dir = tempfile.mkdtemp()
+        try:
+            store = AttendanceStore(os.path.join(test_dir, 'attendance.db'))
+            store.add('Aditya', 0.9, timestamp='2024-11-26T09:59:30')
+            store.add('Aditya', 0.9, timestamp='2024-11-26T09:58:00')
+            store.add('Sanu', 0.9, timestamp='2024-11-26T09:50:00')
+            store.add('Future', 0.9, timestamp='2024-11-26T15:00:00')
+            index = LastSeenIndex(window=60)
+            self.assertEqual(index.seed(store, now=T0), 1)
+            self.assertFalse(index.should_log('Aditya', T0))
+            self.assertTrue(index.should_log('Sanu', T0))
+            self.assertTrue(index.should_log('Future', T0))
+            store.close()
+        finally:
+            shutil.rmtree(test_dir)
+
+if __name__ == '__main__':
+    unittest.main()
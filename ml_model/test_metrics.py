@@ -0,0 +1,56 @@
+import unittest
+from utils.metrics import Registry, StageTimer
+
+class MetricsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_and_gauge_render(self):
+        """Test the Prometheus text for labelled counters and collected gauges"""
+        writes = self.registry.counter('writes_total', 'Records written', labels=('source',))
+        writes.inc(source='api')
+        writes.inc(2, source='api')
+        writes.inc(source='video')
+        self.registry.gauge('queue_depth', 'Waiting records', collect=lambda: 7)
+        self.assertIs(self.registry.counter('writes_total', 'Records written', labels=('source',)), writes)
+
+        text = self.registry.render()
+        self.assertIn('# TYPE writes_total counter', text)
+        self.assertIn('writes_total{source="api"} 3', text)
+        self.assertIn('writes_total{source="video"} 1', text)
+        self.assertIn('queue_depth 7', text)
+        with self.assertRaises(ValueError):
+            writes.inc(stage='api')
+
+    def test_histogram_buckets_and_quantiles(self):
+        """Test cumulative buckets, sum/count and interpolated quantiles"""
+        latency = self.registry.histogram('frame_seconds', 'Frame time', buckets=(0.01, 0.1, 1.0))
+        for value in (0.005, 0.02, 0.05, 0.08, 2.0):
+            latency.observe(value)
+        text = self.registry.render()
+        self.assertIn('frame_seconds_bucket{le="0.01"} 1', text)
+        self.assertIn('frame_seconds_bucket{le="0.1"} 4', text)
+        self.assertIn('frame_seconds_bucket{le="+Inf"} 5', text)
+        self.assertIn('frame_seconds_count 5', text)
+        summary = latency.summary()
+        self.assertAlmostEqual(summary['sum'], 2.155)
+        self.assertAlmostEqual(summary['p50'], 0.01 + 0.09 * 1.5 / 3)
+        self.assertEqual(summary['p99'], 1.0)
+
+    def test_stage_timer(self):
+        """Test that every marked stage and the total are observed"""
+        stages = self.registry.histogram('stage_seconds', 'Stage time', labels=('stage',))
+        total = self.registry.histogram('total_seconds', 'Total time')
+        timer = StageTimer(stages)
+        timer.mark('facemesh')
+        timer.mark('match')
+        timer.mark('match')
+        elapsed = timer.finish(total)
+        self.assertEqual(stages.summary(stage='facemesh')['count'], 1)
+        self.assertEqual(stages.summary(stage='match')['count'], 2)
+        self.assertEqual(total.summary()['count'], 1)
+        self.assertGreaterEqual(elapsed, stages.summary(stage='match')['sum'])
+
+if __name__ == '__main__':
+    unittest.main()
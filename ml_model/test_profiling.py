@@ -0,0 +1,84 @@
+import unittest
+import os
+import pstats
+import tempfile
+import shutil
+import time
+from unittest import mock
+from utils.profiling import (
+    SessionProfiler, list_profiles, parse_profile_spec, prune_profiles, request_profile
+)
+
+def busy_frame(seconds=0.02):
+    """Stand-in for transform(): burns CPU for a while"""
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(100))
+    return total
+
+class ProfilingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def run_frames(self, profiler, count):
+        for _ in range(count):
+            profiler.run(busy_frame)
+
+    def test_idle_until_requested(self):
+        """Test that nothing is profiled or saved without a request"""
+        profiler = SessionProfiler(self.test_dir, poll_interval=0)
+        self.run_frames(profiler, 3)
+        self.assertFalse(profiler.active)
+        self.assertEqual(list_profiles(self.test_dir), [])
+
+    def test_request_starts_cprofile_capture(self):
+        """Test that a request file starts a capture that saves a pstats file"""
+        profiler = SessionProfiler(self.test_dir, session='door', poll_interval=0)
+        request_profile(self.test_dir, 0.1, 'cprofile')
+        self.run_frames(profiler, 10)
+        self.assertFalse(profiler.active)
+        self.assertEqual(len(profiler.saved), 1)
+        self.assertTrue(os.path.basename(profiler.saved[0]).startswith('door-'))
+        stats = pstats.Stats(profiler.saved[0])
+        self.assertTrue(any(func[2] == 'busy_frame' for func in stats.stats))
+        # The same request doesn't start a second capture
+        self.run_frames(profiler, 2)
+        self.assertFalse(profiler.active)
+
+    def test_sampler_writes_folded_stacks(self):
+        """Test the stack sampler's flamegraph (folded) output"""
+        with mock.patch.dict(os.environ, {'FACE_PROFILE': 'sample:0.2'}):
+            profiler = SessionProfiler(self.test_dir, poll_interval=0)
+        self.run_frames(profiler, 15)
+        with open(profiler.saved[0]) as f:
+            lines = f.read().splitlines()
+        self.assertTrue(profiler.saved[0].endswith('.folded'))
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertIn('busy_frame (test_profiling.py:', stack)
+        self.assertGreater(int(count), 0)
+
+    def test_prune_and_spec(self):
+        """Test that the oldest profiles are deleted beyond the size limit"""
+        for i in range(4):
+            path = os.path.join(self.test_dir, f'session-{i}.pstats')
+            with open(path, 'wb') as f:
+                f.write(b'x' * 1000)
+            os.utime(path, (1000 + i, 1000 + i))
+        removed = prune_profiles(self.test_dir, max_bytes=2500)
+        self.assertEqual(removed, ['session-0.pstats', 'session-1.pstats'])
+        self.assertEqual([p['name'] for p in list_profiles(self.test_dir)], ['session-3.pstats', 'session-2.pstats'])
+
+        self.assertEqual(parse_profile_spec('sample:10'), ('sample', 10.0))
+        self.assertEqual(parse_profile_spec('30'), ('cprofile', 30.0))
+        self.assertIsNone(parse_profile_spec(''))
+        with self.assertRaises(ValueError):
+            parse_profile_spec('perf:10')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import os
+import tempfile
+import shutil
+from unittest import mock
+from utils.attendance_store import AttendanceStore
+from utils.query_cache import AttendanceCache
+
+class AttendanceCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'attendance.db')
+        self.store = AttendanceStore(self.path)
+        self.store.add('Aditya', 0.9, timestamp='2024-11-26T09:00:00')
+        self.cache = AttendanceCache(self.store)
+
+    def tearDown(self):
+        self.cache.close()
+        self.store.close()
+        shutil.rmtree(self.test_dir)
+
+    def test_unchanged_reads_hit(self):
+        """Test that repeated reads are served without querying the store"""
+        first = self.cache.query(name='Aditya')
+        with mock.patch.object(self.store, 'query', side_effect=AssertionError('queried')):
+            self.assertIs(self.cache.query(name='Aditya'), first)
+        self.assertEqual(self.cache.count(), 1)
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    def test_other_process_write_invalidates(self):
+        """Test that a commit from another connection is noticed"""
+        self.assertEqual(len(self.cache.query()), 1)
+        other = AttendanceStore(self.path)  # stands in for the Streamlit app
+        other.add('Sanu', 0.8)
+        other.close()
+        self.assertEqual(len(self.cache.query()), 2)
+        self.assertEqual(self.cache.stats()['invalidations'], 1)
+
+    def test_write_through_invalidate(self):
+        """Test that invalidate() drops cached results"""
+        self.cache.query()
+        self.store.add('Sanu', 0.8)
+        self.cache.invalidate()
+        self.assertEqual(self.cache.stats()['entries'], 0)
+        self.assertEqual(len(self.cache.query()), 2)
+
+    def test_entries_are_bounded(self):
+        """Test that the least recently used results are evicted"""
+        cache = AttendanceCache(self.store, max_entries=2)
+        for name in ('a', 'b', 'c'):
+            cache.query(name=name)
+        self.assertEqual(cache.stats()['entries'], 2)
+        cache.close()
+
+    def test_rows_are_bounded(self):
+        """Test that the cache is bounded by cached records and skips oversized results"""
+        for i in range(4):
+            self.store.add('Sanu', 0.8, timestamp=f'2024-11-26T1{i}:00:00')
+        cache = AttendanceCache(self.store, max_rows=4)
+        cache.query(name='Aditya')
+        cache.query(name='Sanu')
+        self.assertEqual((cache.stats()['entries'], cache.stats()['rows']), (1, 4))
+        self.assertEqual(len(cache.query()), 5)
+        self.assertEqual(cache.stats()['rows'], 4)
+        with mock.patch.object(self.store, 'query', side_effect=AssertionError('queried')):
+            self.assertEqual(len(cache.query(name='Sanu')), 4)
+        cache.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+from types import SimpleNamespace
+import numpy as np
+from utils.landmarks import NUM_LANDMARKS, compute_embeddings
+from utils.roi import RoiFaceMesh, crop_landmarks_to_frame, detections_to_boxes, roi_boxes
+
+FRAME_W, FRAME_H = 1920, 1080
+
+def make_detection(x_min, y_min, x_max, y_max):
+    box = SimpleNamespace(xmin=x_min, ymin=y_min, width=x_max - x_min, height=y_max - y_min)
+    return SimpleNamespace(location_data=SimpleNamespace(relative_bounding_box=box))
+
+def make_results(points):
+    faces = [SimpleNamespace(landmark=[SimpleNamespace(x=float(x), y=float(y), z=float(z)) for x, y, z in face])
+             for face in points]
+    return SimpleNamespace(multi_face_landmarks=faces or None)
+
+class FakeSession:
+    def __init__(self, respond):
+        self.respond = respond
+        self.calls = []
+
+    def process(self, image_rgb):
+        self.calls.append(image_rgb.shape)
+        return self.respond(image_rgb)
+
+    def close(self):
+        pass
+
+class RoiTestCase(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # One face in frame coordinates, in the middle of a 1080p frame
+        self.face = np.empty((NUM_LANDMARKS, 3), dtype=np.float32)
+        self.face[:, 0] = rng.uniform(0.45, 0.55, NUM_LANDMARKS)
+        self.face[:, 1] = rng.uniform(0.40, 0.60, NUM_LANDMARKS)
+        self.face[:, 2] = rng.uniform(-0.05, 0.05, NUM_LANDMARKS)
+
+    def test_roi_boxes_pad_square_and_clip(self):
+        """Test that ROIs are padded squares clipped to the frame"""
+        rois = roi_boxes([[0.45, 0.4, 0.55, 0.6], [0.0, 0.0, 0.05, 0.1]], FRAME_W, FRAME_H, padding=0.25)
+        x0, y0, x1, y1 = rois[0]
+        self.assertEqual(x1 - x0, y1 - y0)
+        self.assertEqual(x1 - x0, 324)  # 216 px face side * 1.5
+        self.assertEqual(tuple(rois[1][:2]), (0, 0))
+        self.assertEqual(len(roi_boxes(np.zeros((0, 4)), FRAME_W, FRAME_H)), 0)
+
+    def test_crop_mapping_round_trip(self):
+        """Test that crop-relative landmarks map back to frame coordinates"""
+        roi = (800, 300, 1200, 700)
+        crop = self.face.copy()
+        crop[:, 0] = (self.face[:, 0] * FRAME_W - 800) / 400
+        crop[:, 1] = (self.face[:, 1] * FRAME_H - 300) / 400
+        crop[:, 2] = self.face[:, 2] * FRAME_W / 400
+        np.testing.assert_allclose(crop_landmarks_to_frame(crop, roi, FRAME_W, FRAME_H), self.face, atol=1e-6)
+
+    def test_process_matches_full_frame_embedding(self):
+        """Test that the two-stage path yields the full-frame landmarks and embedding"""
+        detector = FakeSession(lambda img: SimpleNamespace(detections=[make_detection(0.45, 0.4, 0.55, 0.6)]))
+        rois = []
+
+        def mesh_respond(crop_rgb):
+            x0, y0, x1, y1 = rois[-1]
+            crop = self.face.copy()
+            crop[:, 0] = (self.face[:, 0] * FRAME_W - x0) / (x1 - x0)
+            crop[:, 1] = (self.face[:, 1] * FRAME_H - y0) / (y1 - y0)
+            crop[:, 2] = self.face[:, 2] * FRAME_W / (x1 - x0)
+            return make_results([crop])
+
+        roi_mesh = RoiFaceMesh(detect_width=640, detector=detector, mesh=FakeSession(mesh_respond))
+        frame = np.zeros((FRAME_H, FRAME_W, 3), dtype=np.uint8)
+        rois.extend(roi_mesh.detect(frame))
+        points = roi_mesh.process(frame)
+
+        self.assertEqual(detector.calls[0][:2], (360, 640))
+        self.assertEqual(roi_mesh.mesh.calls[0][:2], (rois[0][3] - rois[0][1], rois[0][2] - rois[0][0]))
+        np.testing.assert_allclose(points[0], self.face, atol=1e-5)
+        np.testing.assert_allclose(compute_embeddings(points), compute_embeddings(self.face), atol=1e-5)
+
+    def test_no_faces(self):
+        """Test that a frame without detections yields no landmarks"""
+        detector = FakeSession(lambda img: SimpleNamespace(detections=None))
+        roi_mesh = RoiFaceMesh(detector=detector, mesh=FakeSession(lambda img: make_results([])))
+        points = roi_mesh.process(np.zeros((720, 1280, 3), dtype=np.uint8))
+        self.assertEqual(points.shape, (0, NUM_LANDMARKS, 3))
+        self.assertEqual(detections_to_boxes(None).shape, (0, 4))
+
+if __name__ == '__main__':
+    unittest.main()
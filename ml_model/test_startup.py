@@ -0,0 +1,58 @@
+import unittest
+import json
+import os
+import subprocess
+import sys
+
+ML_MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(ML_MODEL_DIR)
+# Loaded on first use only; none of these is needed to serve the API or start training
+HEAVY_MODULES = ('streamlit', 'mediapipe', 'cv2', 'pandas', 'av', 'multiprocessing')
+
+def import_in_subprocess(modules, cwd):
+    """Heavy modules loaded and directories created by importing `modules` in a fresh interpreter"""
+    code = f"""
+import json, os, sys
+made = []
+# Path.mkdir goes through os.mkdir, os.makedirs through both
+os.makedirs = os.mkdir = lambda path, *args, **kwargs: made.append(str(path))
+for module in {modules!r}:
+    __import__(module)
+print(json.dumps({{'heavy': [m for m in {HEAVY_MODULES!r} if m in sys.modules], 'made': made}}))
+"""
+    result = subprocess.run([sys.executable, '-c', code], cwd=cwd, capture_output=True, text=True, timeout=60)
+    if result.returncode:
+        raise AssertionError(result.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+class StartupTestCase(unittest.TestCase):
+
+    def test_api_import_is_light(self):
+        """Test that importing the API and shared helpers loads no heavy dependency or directory"""
+        loaded = import_in_subprocess(
+            ['app', 'config', 'utils.helpers', 'utils.extract_embedding', 'utils.detect_face', 'utils.roi'],
+            ML_MODEL_DIR
+        )
+        self.assertEqual(loaded, {'heavy': [], 'made': []})
+
+    def test_trainer_import_is_light(self):
+        """Test that the trainer defers OpenCV, MediaPipe and the process pool to first use"""
+        loaded = import_in_subprocess(['train_embeddings'], ROOT_DIR)
+        self.assertEqual(loaded, {'heavy': [], 'made': []})
+
+    def test_gunicorn_master_does_not_import_app(self):
+        """Test that the gunicorn master hooks leave importing the app to the workers"""
+        code = """
+import json, sys
+import gunicorn_config
+for hook in ('on_starting', 'when_ready', 'on_reload'):
+    if hasattr(gunicorn_config, hook):
+        getattr(gunicorn_config, hook)(None)
+print(json.dumps([m for m in ('app', 'flask') if m in sys.modules]))
+"""
+        result = subprocess.run([sys.executable, '-c', code], cwd=ML_MODEL_DIR, capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(json.loads(result.stdout.strip().splitlines()[-1]), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import numpy as np
+from utils.tracker import FaceTracker, box_iou
+
+class FaceTrackerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tracker = FaceTracker(iou_threshold=0.3, drift_iou=0.5, refresh_interval=5.0, max_missed=2)
+
+    def test_box_iou(self):
+        """Test IoU for identical, overlapping and disjoint boxes"""
+        ious = box_iou([[0, 0, 10, 10]], [[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]])
+        np.testing.assert_allclose(ious, [[1.0, 1 / 3, 0.0]], rtol=1e-6)
+
+    def test_ids_follow_moving_faces(self):
+        """Test that faces keep their track ids as they move a little"""
+        a, b = self.tracker.update([[0, 0, 100, 100], [200, 0, 300, 100]])
+        b2, a2 = self.tracker.update([[205, 5, 305, 105], [5, 0, 105, 100]])
+        self.assertIs(a2, a)
+        self.assertIs(b2, b)
+        self.assertNotEqual(a.id, b.id)
+
+    def test_match_only_new_moved_or_stale(self):
+        """Test that cached identities are reused until the face drifts or goes stale"""
+        tracks = self.tracker.update([[0, 0, 100, 100], [200, 0, 300, 100]])
+        self.assertEqual(self.tracker.pending(tracks, now=0.0), [0, 1])
+        for track in tracks:
+            self.tracker.assign(track, 'Aditya', 0.9, now=0.0)
+
+        tracks = self.tracker.update([[2, 0, 102, 100], [200, 0, 300, 100]])
+        self.assertEqual(self.tracker.pending(tracks, now=1.0), [])
+
+        # Second face walks away from where it was matched
+        for dx in (30, 60, 90):
+            tracks = self.tracker.update([[2, 0, 102, 100], [200 + dx, 0, 300 + dx, 100]])
+        self.assertEqual(self.tracker.pending(tracks, now=2.0), [1])
+
+        self.assertEqual(self.tracker.pending(tracks, now=5.0), [0, 1])
+
+    def test_new_face_joins(self):
+        """Test that only the newcomer needs matching"""
+        tracks = self.tracker.update([[0, 0, 100, 100]])
+        self.tracker.assign(tracks[0], 'Aditya', 0.9, now=0.0)
+        tracks = self.tracker.update([[0, 0, 100, 100], [300, 0, 400, 100]])
+        self.assertEqual(self.tracker.pending(tracks, now=0.5), [1])
+
+    def test_lost_tracks_are_dropped(self):
+        """Test that tracks missing for more than max_missed frames are removed"""
+        self.tracker.update([[0, 0, 100, 100]])
+        for _ in range(3):
+            self.tracker.update([])
+        self.assertEqual(self.tracker.tracks, [])
+        track = self.tracker.update([[0, 0, 100, 100]])[0]
+        self.assertIsNone(track.identity)
+
+    def test_forget_identities(self):
+        """Test that a gallery change forces re-matching"""
+        tracks = self.tracker.update([[0, 0, 100, 100]])
+        self.tracker.assign(tracks[0], 'Aditya', 0.9, now=0.0)
+        self.tracker.forget_identities()
+        self.assertEqual(self.tracker.pending(tracks, now=0.1), [0])
+
+if __name__ == '__main__':
+    unittest.main()
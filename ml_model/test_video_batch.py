@@ -0,0 +1,86 @@
+import unittest
+import os
+import tempfile
+import shutil
+from datetime import datetime
+import cv2
+import numpy as np
+from utils.gallery_store import GalleryStore
+from utils.landmarks import NUM_LANDMARKS, compute_embeddings
+from utils.video_batch import plan_segments, read_frames, scan_segments, sightings_to_records
+
+FPS = 10
+# Frame brightness -> enrolled person; dark frames have no face
+PEOPLE = {1: 'Aditya', 2: 'Sanu'}
+
+def face_points(person):
+    return np.random.default_rng(person).random((1, NUM_LANDMARKS, 3)).astype(np.float32)
+
+def fake_landmarks(frame):
+    """Stand-in for FaceMesh: the person is encoded in the frame brightness"""
+    person = int(round(frame.mean() / 80))
+    if person not in PEOPLE:
+        return np.zeros((0, NUM_LANDMARKS, 3), dtype=np.float32)
+    return face_points(person)
+
+class VideoBatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.embeddings_dir = os.path.join(self.test_dir, 'embeddings')
+        GalleryStore(self.embeddings_dir).write(
+            list(PEOPLE.values()), compute_embeddings(np.concatenate([face_points(p) for p in PEOPLE]))
+        )
+        # 20 s: nobody for 5 s, Aditya for 10 s, then Sanu
+        self.people = [0] * 50 + [1] * 100 + [2] * 50
+        self.video = os.path.join(self.test_dir, 'lecture.avi')
+        writer = cv2.VideoWriter(self.video, cv2.VideoWriter_fourcc(*'MJPG'), FPS, (64, 48))
+        for person in self.people:
+            writer.write(np.full((48, 64, 3), person * 80, dtype=np.uint8))
+        writer.release()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_segments_align_with_stride(self):
+        """Test that splitting a video doesn't change which frames are sampled"""
+        segments = plan_segments([self.video], stride=3, segment_seconds=4)
+        self.assertEqual([(s[1], s[2]) for s in segments],
+                         [(0, 39), (39, 78), (78, 117), (117, 156), (156, 195), (195, 200)])
+        sampled = [i for s in segments for i, _ in read_frames(s[0], s[1], s[2], stride=3)]
+        self.assertEqual(sampled, list(range(0, 200, 3)))
+
+    def test_scan_and_dedup(self):
+        """Test sightings with media times and their deduplicated records"""
+        segments = plan_segments([self.video], stride=5, segment_seconds=4)
+        results = list(scan_segments(segments, self.embeddings_dir, stride=5, landmarks=fake_landmarks))
+        self.assertEqual(len(results), 5)
+        sightings = sorted(s for _, found in results for s in found)
+        self.assertEqual(len(sightings), 30)
+        self.assertEqual(sightings[0][1:3], (5.0, 'Aditya'))
+        self.assertEqual(sightings[-1][1:3], (19.5, 'Sanu'))
+
+        records = sightings_to_records(sightings, datetime(2024, 11, 4, 9, 0), window=8)
+        self.assertEqual([(r['timestamp'], r['name']) for r in records], [
+            ('2024-11-04T09:00:05', 'Aditya'),
+            ('2024-11-04T09:00:13', 'Aditya'),
+            ('2024-11-04T09:00:15', 'Sanu'),
+        ])
+
+    def test_worker_pool_matches_serial(self):
+        """Test that a process pool finds the same sightings"""
+        os.makedirs(os.path.join(self.test_dir, 'frames'))
+        for i, person in enumerate(self.people[::2]):
+            cv2.imwrite(os.path.join(self.test_dir, 'frames', f'{i:04d}.png'),
+                        np.full((48, 64, 3), person * 80, dtype=np.uint8))
+        sources = [self.video, os.path.join(self.test_dir, 'frames')]
+        segments = plan_segments(sources, stride=4, segment_seconds=3, fps=FPS)
+        serial = sorted(s for _, found in scan_segments(segments, self.embeddings_dir, stride=4,
+                                                        landmarks=fake_landmarks) for s in found)
+        pooled = sorted(s for _, found in scan_segments(segments, self.embeddings_dir, workers=2, stride=4,
+                                                        landmarks=fake_landmarks) for s in found)
+        self.assertEqual(pooled, serial)
+        self.assertEqual({s[0] for s in serial}, set(sources))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,324 @@
+import io
+import math
+import os
+
+import numpy as np
+
+from .file_lock import atomic_write
+from .gallery import EmbeddingGallery, normalize_rows, rerank
+
+ANN_INDEX_FILE = 'gallery_ivf.npz'
+FORMAT_VERSION = 1
+# Below this many identities one exact list is as fast as probing
+MIN_TRAIN_SIZE = 2000
+# Rows assigned to centroids per matrix product, to bound temporary memory
+_ASSIGN_CHUNK = 4096
+
+
+def default_nlist(size):
+    """Roughly sqrt(N) lists, so centroids and probed lists cost about the same"""
+    return max(1, int(round(math.sqrt(size))))
+
+
+def _write_index_file(path, centroids, names, lists, generation, nprobe):
+    buffer = io.BytesIO()
+    np.savez(
+        buffer,
+        version=FORMAT_VERSION,
+        centroids=centroids,
+        names=np.array(names, dtype=str),
+        lists=np.array(lists, dtype=np.int32),
+        generation=generation,
+        nprobe=nprobe,
+    )
+    # A private temp file per writer: several workers may save the same index
+    atomic_write(path, buffer.getvalue())
+
+
+def _read_index_file(path):
+    """(centroids, {name: list}, generation, nprobe), or None if missing or outdated"""
+    try:
+        with np.load(path) as data:
+            if int(data['version']) != FORMAT_VERSION:
+                return None
+            return (data['centroids'], dict(zip(data['names'].tolist(), data['lists'].tolist())),
+                    int(data['generation']), int(data['nprobe']))
+    except (FileNotFoundError, KeyError, ValueError, OSError):
+        return None
+
+
+def train_centroids(vectors, nlist, iterations=10, sample=64, seed=0):
+    """Spherical k-means on unit rows; returns (nlist, dim) unit centroids.
+
+    Trains on at most `sample` rows per list, which is plenty to place the
+    centroids and keeps the cost independent of gallery size.
+    """
+    rng = np.random.default_rng(seed)
+    nlist = min(nlist, len(vectors))
+    if len(vectors) > sample * nlist:
+        vectors = vectors[np.sort(rng.choice(len(vectors), sample * nlist, replace=False))]
+    vectors = normalize_rows(vectors)
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        order = np.argsort(assign, kind='stable')
+        lists, starts = np.unique(assign[order], return_index=True)
+        sums = np.add.reduceat(vectors[order], starts, axis=0)
+        # Lists that lost every member are re-seeded on random rows
+        centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+        centroids[lists] = sums
+        centroids = normalize_rows(centroids)
+    return centroids
+
+
+def assign_lists(centroids, matrix):
+    """Nearest centroid of every row of `matrix` (any dtype, may be memory-mapped)"""
+    assign = np.empty(len(matrix), dtype=np.int32)
+    for start in range(0, len(matrix), _ASSIGN_CHUNK):
+        chunk = normalize_rows(matrix[start:start + _ASSIGN_CHUNK])
+        assign[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assign
+
+
+class IVFIndex:
+    """Inverted-file index for approximate cosine search over a large gallery.
+
+    Identities are split into `nlist` lists by their nearest k-means
+    centroid, each list being a small EmbeddingGallery. A query is scored
+    against the centroids first and then only against the members of the
+    `nprobe` closest lists, so it touches about nprobe / nlist of the
+    gallery. Exposes the same add/remove/match interface as
+    EmbeddingGallery; with fewer than MIN_TRAIN_SIZE identities it keeps a
+    single list and search is exact.
+
+    `precision`, `exact` and `rerank` work as for EmbeddingGallery: the
+    lists hold quantized rows and the best candidates over all probed
+    lists are re-scored in float32.
+    """
+
+    def __init__(self, centroids=None, nprobe=8, precision='float32', exact=None, rerank=16):
+        self.centroids = centroids
+        self.nprobe = nprobe
+        self.precision = precision
+        self.exact = exact
+        self.rerank = rerank
+        nlist = 1 if centroids is None else len(centroids)
+        self._lists = [EmbeddingGallery(precision=precision) for _ in range(nlist)]
+        self._where = {}
+        self.dim = None if centroids is None else centroids.shape[1]
+
+    @classmethod
+    def from_arrays(cls, names, matrix, nlist=None, nprobe=8, seed=0, **options):
+        """Train centroids on `matrix` and index every row"""
+        centroids = None
+        if len(names) >= MIN_TRAIN_SIZE:
+            centroids = train_centroids(matrix, nlist or default_nlist(len(names)), seed=seed)
+        index = cls(centroids, nprobe=nprobe, **options)
+        index._fill(names, matrix, index._assign(matrix))
+        return index
+
+    def _assign(self, matrix):
+        if self.centroids is None:
+            return np.zeros(len(matrix), dtype=np.int32)
+        return assign_lists(self.centroids, matrix)
+
+    def _fill(self, names, matrix, assign):
+        names = np.asarray(names, dtype=object)
+        if len(names):
+            self.dim = matrix.shape[1]
+        order = np.argsort(assign, kind='stable')
+        lists, starts = np.unique(assign[order], return_index=True)
+        for l, rows in zip(lists, np.split(order, starts[1:])):
+            self._lists[l] = EmbeddingGallery.from_arrays(list(names[rows]), matrix[rows], precision=self.precision)
+            self._where.update((name, int(l)) for name in names[rows])
+
+    @property
+    def nlist(self):
+        return len(self._lists)
+
+    @property
+    def names(self):
+        return np.array(list(self._where), dtype=object)
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, name):
+        return name in self._where
+
+    @property
+    def nbytes(self):
+        """Memory held by the embedding rows (centroids excluded)"""
+        return sum(g.nbytes for g in self._lists)
+
+    def list_sizes(self):
+        return np.array([len(g) for g in self._lists])
+
+    def get(self, name):
+        """Normalised embedding for `name`, or None"""
+        l = self._where.get(name)
+        return None if l is None else self._lists[l].get(name)
+
+    def add(self, name, embedding):
+        """Insert or replace `name` in the list of its nearest centroid"""
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        if self.dim is not None and len(vector) != self.dim:
+            raise ValueError(f"Embedding for {name} has dimension {len(vector)}, expected {self.dim}")
+        l = int(self._assign(vector[np.newaxis])[0])
+        old = self._where.get(name)
+        if old is not None and old != l:
+            self._lists[old].remove(name)
+        self._lists[l].add(name, vector)
+        self._where[name] = l
+        self.dim = len(vector)
+
+    def remove(self, name):
+        """Drop `name`; returns False if it wasn't enrolled"""
+        l = self._where.pop(name, None)
+        if l is None:
+            return False
+        return self._lists[l].remove(name)
+
+    def match(self, queries, k=1, nprobe=None):
+        """Approximate top-k identities for each query row, like EmbeddingGallery.match.
+
+        Returns (names, scores) of shape (F, min(k, N)), best first. If the
+        probed lists hold fewer than k identities the remaining slots are
+        None with a score of -1.
+        """
+        queries = normalize_rows(queries)
+        k = min(k, len(self))
+        reranking = self.exact is not None and self.precision != 'float32'
+        wanted = max(k, self.rerank) if reranking else k
+        names = np.full((len(queries), k), None, dtype=object)
+        scores = np.full((len(queries), k), -1.0, dtype=np.float32)
+        if k == 0:
+            return names, scores
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        if self.centroids is None:
+            probes = np.zeros((len(queries), 1), dtype=int)
+        else:
+            coarse = queries @ self.centroids.T
+            probes = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe]
+
+        for f, query in enumerate(queries):
+            candidates = [self._lists[l] for l in probes[f] if len(self._lists[l])]
+            if not candidates:
+                continue
+            sims = np.concatenate([g.scores(query)[0] for g in candidates])
+            found = min(wanted, len(sims))
+            top = np.argpartition(-sims, found - 1)[:found] if found < len(sims) else np.arange(found)
+            top = top[np.argsort(-sims[top], kind='stable')]
+            top_names, top_scores = np.concatenate([g.names for g in candidates])[top], sims[top]
+            if reranking:
+                top_names, top_scores = rerank(query[np.newaxis], top_names[np.newaxis], self.exact, k)
+                top_names, top_scores = top_names[0], top_scores[0]
+            found = min(k, found)
+            names[f, :found] = top_names[:found]
+            scores[f, :found] = top_scores[:found]
+        return names, scores
+
+    def save(self, path, generation=0):
+        """Persist centroids and list assignments (atomically)"""
+        names = list(self._where)
+        centroids = self.centroids if self.centroids is not None else np.zeros((0, self.dim or 0), np.float32)
+        _write_index_file(path, centroids, names, [self._where[n] for n in names], generation, self.nprobe)
+
+    @classmethod
+    def restore(cls, path, names, matrix, meta, nprobe=None, **options):
+        """Rebuild from a saved index and the current gallery.
+
+        Saved assignments are reused for identities unchanged since the
+        save (per-name generation in `meta`); new or re-enrolled ones are
+        assigned to their nearest centroid and removed ones are dropped.
+        Returns (index, number of identities that had to be assigned), or
+        (None, 0) if the file is missing, outdated or doesn't fit.
+        """
+        saved_file = _read_index_file(path)
+        if saved_file is None:
+            return None, 0
+        centroids, saved, generation, saved_nprobe = saved_file
+        if len(centroids) and (not len(names) or centroids.shape[1] != matrix.shape[1]):
+            return None, 0
+        if not len(centroids) and len(names) >= MIN_TRAIN_SIZE:
+            # Saved while too small to train; worth training now
+            return None, 0
+
+        index = cls(centroids if len(centroids) else None, nprobe=nprobe or saved_nprobe, **options)
+        assign = np.empty(len(names), dtype=np.int32)
+        stale = []
+        for i, name in enumerate(names):
+            l = saved.get(name)
+            if l is None or meta.get(name, {}).get('generation', 0) > generation or l >= index.nlist:
+                stale.append(i)
+            else:
+                assign[i] = l
+        if stale:
+            assign[stale] = index._assign(matrix[stale])
+        index._fill(names, matrix, assign)
+        return index, len(stale) + (len(saved) - (len(names) - len(stale)))
+
+
+def open_ann_index(store, nlist=None, nprobe=None, **options):
+    """IVFIndex over a GalleryStore, persisted as gallery_ivf.npz next to it.
+
+    The saved index is reused when it fits the gallery (only identities
+    enrolled, re-enrolled or removed since are reassigned) and retrained
+    when the gallery has grown past 4x the size it was trained for or
+    `nlist` asks for a different number of lists. `nprobe` defaults to
+    the saved value; other options go to IVFIndex. The file is rewritten
+    whenever it was out of date.
+    """
+    path = os.path.join(store.directory, ANN_INDEX_FILE)
+    index = store.read_index()
+    names, matrix = store.load()
+    ann, changed = IVFIndex.restore(path, names, matrix, index['meta'], nprobe=nprobe, **options)
+    if ann is not None and ann.centroids is not None:
+        wanted = nlist or default_nlist(len(names))
+        if (nlist and ann.nlist != nlist) or ann.nlist * ann.nlist * 4 < wanted * wanted:
+            ann = None
+    if ann is None:
+        ann = IVFIndex.from_arrays(names, matrix, nlist=nlist, nprobe=nprobe or 8, **options)
+        changed = 1
+    if changed:
+        try:
+            ann.save(path, generation=index['generation'])
+        except OSError as e:
+            print(f"Could not save ANN index: {e}")
+    return ann
+
+
+def sync_ann_index(store):
+    """Bring a saved gallery_ivf.npz up to date after enrolments or deletes in `store`.
+
+    Writers call this after changing the gallery, so a restarted worker
+    finds an index with nothing to reassign. New and re-enrolled
+    identities go to their nearest saved centroid and removed ones are
+    dropped; the centroids are not retrained (open_ann_index still does
+    that once the gallery outgrows them). Does nothing if no index has
+    been saved. Returns the number of identities updated.
+    """
+    path = os.path.join(store.directory, ANN_INDEX_FILE)
+    if not os.path.exists(path):
+        return 0
+    with store.lock():
+        saved_file = _read_index_file(path)
+        index = store.read_index()
+        if saved_file is None or saved_file[2] == index['generation']:
+            return 0
+        centroids, saved, generation, nprobe = saved_file
+        if len(centroids) and index['names'] and centroids.shape[1] != index['dim']:
+            return 0
+        names, meta = index['names'], index['meta']
+        stale = [name for name in names
+                 if name not in saved or meta.get(name, {}).get('generation', 0) > generation]
+        lists = {name: saved[name] for name in names if name in saved}
+        if stale:
+            assign = assign_lists(centroids, store.rows(stale)) if len(centroids) else np.zeros(len(stale), np.int32)
+            lists.update(zip(stale, assign.tolist()))
+        try:
+            _write_index_file(path, centroids, names, [lists[name] for name in names], index['generation'], nprobe)
+        except OSError as e:
+            print(f"Could not save ANN index: {e}")
+            return 0
+        return len(stale) + len(set(saved) - set(lists))
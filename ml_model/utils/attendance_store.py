@@ -0,0 +1,258 @@
+import base64
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from .file_lock import file_lock
+from .timestamps import utc_now
+
+FIELDS = ('id', 'name', 'timestamp', 'confidence', 'created_at', 'start_time')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attendance (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    created_at TEXT NOT NULL,
+    start_time TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_attendance_name_timestamp ON attendance (name, timestamp);
+CREATE INDEX IF NOT EXISTS idx_attendance_timestamp ON attendance (timestamp);
+"""
+
+
+def db_path_for(json_path):
+    """SQLite file that replaces a legacy attendance.json (same directory and stem)"""
+    return os.path.splitext(json_path)[0] + '.db'
+
+
+def _to_record(row):
+    return dict(zip(FIELDS, row)) if row else None
+
+
+def encode_cursor(record):
+    """Opaque keyset cursor pointing just past `record` in newest-first order"""
+    raw = json.dumps([record['timestamp'], record['id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(timestamp, id) from encode_cursor(); ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, record_id = json.loads(raw)
+        return str(timestamp), int(record_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+class AttendanceStore:
+    """Attendance log in SQLite (WAL mode), indexed on name and timestamp.
+
+    Records keep the shape of the old attendance.json entries. Each thread
+    gets its own connection; SQLite's locking makes concurrent writers from
+    several threads or processes safe.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def add(self, name, confidence, timestamp=None, start_time=None):
+        """Insert one record and return it"""
+        return self.add_many([{
+            'name': name, 'confidence': confidence,
+            'timestamp': timestamp, 'start_time': start_time
+        }])[0]
+
+    def add_many(self, records):
+        """Insert several records in one transaction; returns them with ids"""
+        conn = self._connection()
+        saved = []
+        with conn:
+            for record in records:
+                now = record.get('timestamp') or utc_now().isoformat()
+                row = (
+                    record['name'], now, float(record['confidence']),
+                    record.get('created_at') or now, record.get('start_time') or now
+                )
+                cursor = conn.execute(
+                    'INSERT INTO attendance (name, timestamp, confidence, created_at, start_time) '
+                    'VALUES (?, ?, ?, ?, ?)', row
+                )
+                saved.append(dict(zip(FIELDS, (cursor.lastrowid,) + row)))
+        return saved
+
+    def get(self, record_id):
+        cursor = self._connection().execute(
+            f'SELECT {", ".join(FIELDS)} FROM attendance WHERE id = ?', (record_id,)
+        )
+        return _to_record(cursor.fetchone())
+
+    def delete(self, record_id):
+        """Delete one record; False if it didn't exist"""
+        conn = self._connection()
+        with conn:
+            return conn.execute('DELETE FROM attendance WHERE id = ?', (record_id,)).rowcount > 0
+
+    def clear(self):
+        conn = self._connection()
+        with conn:
+            conn.execute('DELETE FROM attendance')
+
+    def _filters(self, name=None, date=None, exact=False, start=None, end=None):
+        """WHERE clauses and parameters shared by query() and count()"""
+        where, params = [], []
+        if name and exact:
+            where.append('name = ?')
+            params.append(name)
+        elif name:
+            where.append("name LIKE ? ESCAPE '\\'")
+            escaped = name.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f'%{escaped}%')
+        if date:
+            # Range on the timestamp index instead of a prefix scan
+            day = datetime.strptime(date, '%Y-%m-%d')
+            where.append('timestamp >= ? AND timestamp < ?')
+            params.extend([day.strftime('%Y-%m-%d'), (day + timedelta(days=1)).strftime('%Y-%m-%d')])
+        if start:
+            where.append('timestamp >= ?')
+            params.append(start)
+        if end:
+            where.append('timestamp < ?')
+            params.append(end)
+        return where, params
+
+    def query(self, name=None, date=None, exact=False, start=None, end=None,
+              limit=None, offset=0, cursor=None):
+        """Records newest first.
+
+        `name` matches a substring (or the whole name with `exact`), `date` is
+        a YYYY-MM-DD day and `start`/`end` bound the timestamp (end
+        exclusive). Pages are taken with `limit` plus either `offset` or a
+        `cursor` from encode_cursor(); cursors stay cheap on deep pages.
+        """
+        where, params = self._filters(name, date, exact, start, end)
+        if cursor:
+            # Row-value comparison walks the (.., timestamp, id) index from the cursor
+            where.append('(timestamp, id) < (?, ?)')
+            params.extend(decode_cursor(cursor))
+        sql = f'SELECT {", ".join(FIELDS)} FROM attendance'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY timestamp DESC, id DESC'
+        if limit is not None:
+            sql += ' LIMIT ? OFFSET ?'
+            params.extend([int(limit), 0 if cursor else int(offset)])
+        return [_to_record(row) for row in self._connection().execute(sql, params)]
+
+    def last_seen(self, name):
+        """Timestamp of the newest record for `name`, or None"""
+        row = self._connection().execute(
+            'SELECT MAX(timestamp) FROM attendance WHERE name = ?', (name,)
+        ).fetchone()
+        return row[0]
+
+    def last_seen_since(self, since, until=None):
+        """{name: newest timestamp} for names logged at or after `since` (and not after `until`)"""
+        sql = 'SELECT name, MAX(timestamp) FROM attendance WHERE timestamp >= ?'
+        params = [since]
+        if until:
+            sql += ' AND timestamp <= ?'
+            params.append(until)
+        sql += ' GROUP BY name'
+        return dict(self._connection().execute(sql, params).fetchall())
+
+    def count(self, name=None, date=None, exact=False, start=None, end=None):
+        """Number of records matching the query() filters"""
+        where, params = self._filters(name, date, exact, start, end)
+        sql = 'SELECT COUNT(*) FROM attendance'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        return self._connection().execute(sql, params).fetchone()[0]
+
+    def import_json(self, json_path):
+        """Import an attendance.json file, keeping record ids; returns the number of new records"""
+        with open(json_path, 'r') as f:
+            data = json.load(f)
+        records = data.get('records', [])
+        conn = self._connection()
+        with conn:
+            before = conn.total_changes
+            conn.executemany(
+                'INSERT OR IGNORE INTO attendance (id, name, timestamp, confidence, created_at, start_time) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(r['id'], r['name'], r['timestamp'], float(r['confidence']),
+                  r.get('created_at') or r['timestamp'], r.get('start_time') or r['timestamp'])
+                 for r in records]
+            )
+            imported = conn.total_changes - before
+            # Never hand out ids that the JSON file had already used
+            next_id = max([data.get('next_id', 1)] + [r['id'] + 1 for r in records])
+            conn.execute("DELETE FROM sqlite_sequence WHERE name = 'attendance'")
+            conn.execute(
+                "INSERT INTO sqlite_sequence (name, seq) "
+                "SELECT 'attendance', MAX(?, IFNULL(MAX(id), 0)) FROM attendance", (next_id - 1,)
+            )
+        return imported
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_attendance_store(path, legacy_json=None):
+    """Shared AttendanceStore for `path`.
+
+    When the database is created, records from `legacy_json` (the old
+    attendance.json) are imported once. Creation holds a file lock, so of
+    several workers starting together exactly one creates and imports,
+    and none inserts a record before the import has claimed its ids. If
+    the import fails the new database is removed and the error raised.
+    """
+    path = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with file_lock(f"{path}.lock"):
+                is_new = not os.path.exists(path)
+                store = AttendanceStore(path)
+                if is_new and legacy_json and os.path.exists(legacy_json):
+                    try:
+                        imported = store.import_json(legacy_json)
+                    except Exception as e:
+                        # Drop the new database so the next open imports again
+                        # instead of finding it and skipping the legacy records
+                        store.close()
+                        for leftover in (path, f"{path}-wal", f"{path}-shm"):
+                            try:
+                                os.remove(leftover)
+                            except FileNotFoundError:
+                                pass
+                        print(f"Error importing {legacy_json}: {e}")
+                        raise
+                    print(f"Imported {imported} attendance records from {legacy_json}")
+            _stores[path] = store
+        return store
@@ -0,0 +1,127 @@
+import queue
+import threading
+import time
+
+from .timestamps import to_utc, utc_now
+
+_STOP = object()
+
+
+class AttendanceWriter:
+    """Writes attendance records to an AttendanceStore from a background thread.
+
+    submit() only puts the record on a bounded queue, so the caller (the
+    video frame thread) never waits on SQLite. Repeats within the dedup
+    window of `last_seen` (a LastSeenIndex) are rejected before queueing.
+    The worker commits whatever has queued up in a single transaction. If
+    the queue is full the record is dropped and counted rather than
+    blocking the caller. A batch that fails to commit is un-marked in
+    `last_seen`, so the next sighting of those people is recorded.
+    """
+
+    def __init__(self, store, maxsize=1024, max_batch=256, last_seen=None):
+        self.store = store
+        self.max_batch = max_batch
+        self.last_seen = last_seen
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._counters = {
+            'queued': 0,
+            'written': 0,
+            'duplicates': 0,
+            'dropped': 0,
+            'errors': 0,
+            'batches': 0,
+            'last_commit_ms': 0.0,
+            'max_commit_ms': 0.0,
+        }
+        self._thread = threading.Thread(target=self._run, name='attendance-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, name, confidence, timestamp=None):
+        """Queue one sighting; False if it was a repeat or was dropped (queue full or closed)"""
+        when = to_utc(timestamp) if timestamp else utc_now()
+        record = {
+            'name': name,
+            'confidence': float(confidence),
+            'timestamp': when.isoformat(),
+        }
+        with self._lock:
+            # Only submit() adds to the queue, so a slot free now is still free below
+            if self._closed or self._queue.full():
+                self._counters['dropped'] += 1
+                return False
+            if self.last_seen is not None and not self.last_seen.should_log(name, when):
+                self._counters['duplicates'] += 1
+                return False
+            self._queue.put_nowait(record)
+            self._counters['queued'] += 1
+        return True
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is committed; False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=10):
+        """Commit what is queued and stop the worker"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self):
+        """Counters plus the current queue depth"""
+        with self._lock:
+            stats = dict(self._counters)
+        stats['queue_depth'] = self._queue.qsize()
+        return stats
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Coalesce whatever arrived meanwhile into the same commit
+            while len(batch) < self.max_batch and batch[-1] is not _STOP:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is _STOP
+            records = [r for r in batch if r is not _STOP]
+            try:
+                if records:
+                    self._write(records)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, records):
+        started = time.perf_counter()
+        try:
+            self.store.add_many(records)
+        except Exception as e:
+            print(f"Attendance writer error: {e}")
+            with self._lock:
+                self._counters['errors'] += 1
+            if self.last_seen is not None:
+                for record in records:
+                    self.last_seen.forget(record['name'], record['timestamp'])
+            return
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            counters = self._counters
+            counters['written'] += len(records)
+            counters['batches'] += 1
+            counters['last_commit_ms'] = elapsed
+            counters['max_commit_ms'] = max(counters['max_commit_ms'], elapsed)
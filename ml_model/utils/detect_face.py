@@ -1,10 +1,11 @@
-import cv2
-import mediapipe as mp
 import numpy as np
 
-mp_face_mesh = mp.solutions.face_mesh
-
 def get_landmark_embedding(image_path):
+    # Imported on first use so importing this module stays cheap
+    import cv2
+    import mediapipe as mp
+    mp_face_mesh = mp.solutions.face_mesh
+
     img = cv2.imread(image_path)
     rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
 
@@ -0,0 +1,116 @@
+from pathlib import Path
+
+import numpy as np
+
+from .face_mesh import FaceMeshSession
+from .landmarks import embed_results
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+
+# One FaceMesh graph per process, shared by every image it handles
+_session = None
+
+
+def list_person_images(person_dir):
+    """Image files of one person, sorted so every run sees the same order"""
+    return sorted(p for p in Path(person_dir).iterdir()
+                  if p.is_file() and p.suffix.lower() in IMAGE_EXTENSIONS)
+
+
+def _get_session():
+    global _session
+    if _session is None:
+        _session = FaceMeshSession(
+            static_image_mode=True,
+            refine_landmarks=True,
+            max_num_faces=1,
+            min_detection_confidence=0.5
+        )
+    return _session
+
+
+def embed_image(image_path):
+    """Embedding of the first face in an image file, or None"""
+    import cv2
+    img = cv2.imread(str(image_path))
+    if img is None:
+        return None
+    results = _get_session().process(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    if not results.multi_face_landmarks:
+        return None
+    return embed_results(results)[0]
+
+
+def _embed_chunk(embed, start, paths):
+    return [(start + i, embed(path)) for i, path in enumerate(paths)]
+
+
+def extract_embeddings(paths, workers=1, chunksize=8, embed=embed_image):
+    """Yield (index into `paths`, embedding or None) for every image, in completion order.
+
+    With `workers` > 1 the paths are split into chunks of `chunksize` and
+    spread over a process pool; each worker process keeps its own FaceMesh
+    graph for all the chunks it handles. `embed` must be a module-level
+    function so it can be sent to the workers.
+    """
+    paths = list(paths)
+    if workers <= 1:
+        for i, path in enumerate(paths):
+            yield i, embed(path)
+        return
+    # Only pools pay for importing multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_embed_chunk, embed, start, paths[start:start + chunksize])
+                   for start in range(0, len(paths), chunksize)]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def average_embedding(embeddings):
+    """Mean of a person's per-image embeddings, summed in a fixed order"""
+    return np.mean(np.stack(embeddings), axis=0)
+
+
+def train_people(people, workers=1, chunksize=8, embed=embed_image, cache=None):
+    """Extract and average embeddings for {name: [image paths]}.
+
+    Yields (name, average or None, images used) as soon as all of a
+    person's images are done, so results can be saved while the rest are
+    still being processed. Per-image embeddings are averaged in the order
+    of the person's path list, which makes the output identical whatever
+    the number of workers.
+
+    `cache` ({path: embedding or None}) supplies already extracted images;
+    newly extracted ones are added to it.
+    """
+    cache = {} if cache is None else cache
+    # (person, position in that person's list) for every image to extract
+    jobs, todo = [], []
+    pending = {name: len(paths) for name, paths in people.items()}
+    results = {name: [None] * len(paths) for name, paths in people.items()}
+    for name, paths in people.items():
+        for slot, path in enumerate(paths):
+            if path in cache:
+                results[name][slot] = cache[path]
+                pending[name] -= 1
+            else:
+                jobs.append((name, slot))
+                todo.append(path)
+
+    for name in [n for n, count in pending.items() if count == 0]:
+        found = [e for e in results.pop(name) if e is not None]
+        yield name, (average_embedding(found) if found else None), len(found)
+
+    for i, embedding in extract_embeddings(todo, workers, chunksize, embed):
+        name, slot = jobs[i]
+        cache[todo[i]] = embedding
+        if embedding is not None:
+            print(f"    ✓ {name}/{Path(todo[i]).name}")
+        else:
+            print(f"    ✗ {name}/{Path(todo[i]).name} (no face detected)")
+        results[name][slot] = embedding
+        pending[name] -= 1
+        if pending[name] == 0:
+            found = [e for e in results.pop(name) if e is not None]
+            yield name, (average_embedding(found) if found else None), len(found)
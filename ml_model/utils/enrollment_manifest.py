@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from .file_lock import atomic_write
+from .gallery_store import _npy_header, _read_npy_header, _write_json_atomic
+
+MANIFEST_FILE = 'enrollment_manifest.json'
+CACHE_FILE = 'enrollment_cache.npy'
+FORMAT_VERSION = 1
+
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class EnrollmentManifest:
+    """What train_embeddings.py has already extracted, image by image.
+
+    `enrollment_manifest.json` maps each source image (relative to the data
+    directory) to its person, size, mtime and SHA-256, plus the row of its
+    embedding in `enrollment_cache.npy` (null if no face was found). A
+    file whose size and mtime are unchanged is trusted without hashing; a
+    changed one is hashed and only re-extracted if its content differs
+    from every known image (so renames and touched files are free).
+
+    New rows are appended to the cache in place; rows of deleted images
+    are reclaimed when more than half the file is dead.
+    """
+
+    def __init__(self, directory, data_dir):
+        self.data_dir = Path(data_dir)
+        self.manifest_path = os.path.join(directory, MANIFEST_FILE)
+        self.cache_path = os.path.join(directory, CACHE_FILE)
+        self.entries = {}
+        self.dim = None
+        try:
+            with open(self.manifest_path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') == FORMAT_VERSION and os.path.exists(self.cache_path):
+                self.entries = data['images']
+                self.dim = data['dim']
+        except FileNotFoundError:
+            pass
+
+    def reset(self):
+        """Forget every recorded image, so the next scan re-extracts everything"""
+        self.entries = {}
+        self.dim = None
+
+    def key(self, path):
+        return Path(path).relative_to(self.data_dir).as_posix()
+
+    def scan(self, people):
+        """Compare {name: [image paths]} against the manifest.
+
+        Returns (entries, todo, affected): the manifest entries for the
+        current files (entries still to be extracted have no 'row'), the
+        paths to extract, and the names whose average has to be recomputed
+        because an image of theirs was added, changed or deleted.
+        """
+        by_hash = {e['sha256']: e for e in self.entries.values()}
+        entries, todo, affected = {}, [], set()
+        for name, paths in people.items():
+            for path in paths:
+                key = self.key(path)
+                st = os.stat(path)
+                old = self.entries.get(key)
+                if (old and old['person'] == name and old['size'] == st.st_size
+                        and old['mtime_ns'] == st.st_mtime_ns):
+                    entries[key] = old
+                    continue
+                digest = file_sha256(path)
+                entry = {'person': name, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': digest}
+                known = by_hash.get(digest)
+                if known is not None:
+                    entry['row'] = known['row']
+                else:
+                    todo.append(path)
+                if not (old and old['person'] == name and old['sha256'] == digest):
+                    affected.add(name)
+                entries[key] = entry
+        for key, old in self.entries.items():
+            if key not in entries:
+                affected.add(old['person'])
+        return entries, todo, affected
+
+    def load_embeddings(self, entries, paths):
+        """{path: cached embedding or None} for the given paths that have a row"""
+        cached = {}
+        matrix = None
+        for path in paths:
+            entry = entries[self.key(path)]
+            if 'row' not in entry:
+                continue
+            if entry['row'] is None:
+                cached[path] = None
+                continue
+            if matrix is None:
+                matrix = np.load(self.cache_path, mmap_mode='r')
+            cached[path] = np.array(matrix[entry['row']], dtype=np.float32)
+        return cached
+
+    def save(self, entries, embeddings):
+        """Record `entries`, storing the new `embeddings` ({path: vector or None})"""
+        new_rows = []
+        for path, vector in embeddings.items():
+            entry = entries.get(self.key(path))
+            if entry is None or 'row' in entry:
+                continue
+            if vector is None:
+                entry['row'] = None
+            else:
+                entry['row'] = -1 - len(new_rows)  # placeholder until rows are placed
+                new_rows.append(np.asarray(vector, dtype=np.float32))
+        entries = {k: e for k, e in entries.items() if 'row' in e}
+
+        dim = len(new_rows[0]) if new_rows else self.dim
+        if new_rows and self.dim is not None and dim != self.dim:
+            # Embedding layout changed: nothing old can be reused
+            raise ValueError(f"Embedding dimension {dim} does not match cache dimension {self.dim}")
+        new_rows = np.stack(new_rows) if new_rows else np.zeros((0, dim or 0), dtype=np.float32)
+
+        live = {e['row'] for e in entries.values() if e['row'] is not None and e['row'] >= 0}
+        on_disk = self._rows_on_disk()
+        if on_disk is not None and on_disk <= 2 * max(len(live), 1) and self._append(new_rows, on_disk):
+            offset = on_disk
+        else:
+            offset = self._compact(entries, live, new_rows)
+
+        for entry in entries.values():
+            if entry['row'] is not None and entry['row'] < 0:
+                entry['row'] = offset - 1 - entry['row']
+        self.entries = entries
+        self.dim = dim
+        _write_json_atomic(self.manifest_path, {
+            'version': FORMAT_VERSION,
+            'dim': dim,
+            'images': entries,
+        })
+
+    def _rows_on_disk(self):
+        if not os.path.exists(self.cache_path):
+            return None
+        with open(self.cache_path, 'rb') as f:
+            shape, _, _ = _read_npy_header(f)
+        return shape[0]
+
+    def _append(self, rows, on_disk):
+        """Write `rows` after the existing ones; False if the header has no room"""
+        if not len(rows):
+            return True
+        with open(self.cache_path, 'r+b') as f:
+            shape, dtype, offset = _read_npy_header(f)
+            header = _npy_header((on_disk + len(rows), shape[1]), dtype, length=offset)
+            if header is None:
+                return False
+            f.seek(offset + on_disk * shape[1] * dtype.itemsize)
+            f.write(rows.astype(dtype).tobytes())
+            f.seek(0)
+            f.write(header)
+        return True
+
+    def _compact(self, entries, live, new_rows):
+        """Rewrite the cache with only live rows, renumbering entries; returns the offset of new rows"""
+        order = sorted(live)
+        remap = {old: new for new, old in enumerate(order)}
+        kept = np.zeros((0, new_rows.shape[1]), dtype=np.float32)
+        if order:
+            kept = np.asarray(np.load(self.cache_path, mmap_mode='r')[order], dtype=np.float32)
+        for entry in entries.values():
+            if entry['row'] is not None and entry['row'] >= 0:
+                entry['row'] = remap[entry['row']]
+        matrix = np.concatenate((kept, new_rows)) if len(kept) else new_rows
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        atomic_write(self.cache_path, _npy_header(matrix.shape, np.float32), matrix.astype(np.float32).tobytes())
+        return len(kept)
@@ -0,0 +1,64 @@
+import threading
+
+
+class FaceMeshSession:
+    """Long-lived MediaPipe FaceMesh graph, opened on first use.
+
+    Building a FaceMesh graph is far more expensive than running it on a
+    frame, so a session keeps one graph alive and reuses it. If the graph
+    raises, it is closed and a fresh one is built on the next call.
+    """
+
+    def __init__(self, static_image_mode=False, max_num_faces=4,
+                 refine_landmarks=True, min_detection_confidence=0.5,
+                 min_tracking_confidence=0.5):
+        self.options = {
+            'static_image_mode': static_image_mode,
+            'max_num_faces': max_num_faces,
+            'refine_landmarks': refine_landmarks,
+            'min_detection_confidence': min_detection_confidence,
+            'min_tracking_confidence': min_tracking_confidence,
+        }
+        self.graphs_opened = 0
+        self._mesh = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        import mediapipe as mp
+        self.graphs_opened += 1
+        return mp.solutions.face_mesh.FaceMesh(**self.options)
+
+    def process(self, image_rgb):
+        """Run landmark detection on an RGB frame"""
+        with self._lock:
+            if self._mesh is None:
+                self._mesh = self._open()
+            try:
+                return self._mesh.process(image_rgb)
+            except Exception:
+                # Drop the broken graph; the next frame gets a new one
+                self._close_mesh()
+                raise
+
+    def close(self):
+        """Release the underlying graph (safe to call more than once)"""
+        with self._lock:
+            self._close_mesh()
+
+    @property
+    def is_open(self):
+        return self._mesh is not None
+
+    def _close_mesh(self):
+        mesh, self._mesh = self._mesh, None
+        if mesh is not None:
+            try:
+                mesh.close()
+            except Exception as e:
+                print(f"Error closing FaceMesh: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
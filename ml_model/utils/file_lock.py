@@ -0,0 +1,82 @@
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks below only cover threads of one process
+    fcntl = None
+
+_held = threading.local()
+_fallback_locks = {}
+_fallback_guard = threading.Lock()
+
+
+@contextmanager
+def file_lock(path, shared=False):
+    """Advisory lock on `path` (created if missing) for the length of the block.
+
+    Exclusive by default; `shared` lets readers overlap each other but not
+    a writer. Uses fcntl.flock, so it holds across processes (gunicorn
+    workers, the Streamlit app) as well as threads. Reentrant within a
+    thread: a block nested in one that already holds the lock does not
+    lock again.
+    """
+    path = os.path.abspath(path)
+    held = _held.__dict__.setdefault('paths', {})
+    if path in held:
+        held[path] += 1
+        try:
+            yield
+        finally:
+            held[path] -= 1
+        return
+
+    if fcntl is None:
+        with _fallback_guard:
+            lock = _fallback_locks.setdefault(path, threading.Lock())
+        with lock:
+            held[path] = 1
+            try:
+                yield
+            finally:
+                del held[path]
+        return
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        held[path] = 1
+        try:
+            yield
+        finally:
+            del held[path]
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, *chunks):
+    """Write `chunks` (bytes or str) to a private temp file and rename it over `path`.
+
+    Readers see the old file or the new one, never a partial write, and
+    concurrent writers never share a temp file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk.encode() if isinstance(chunk, str) else chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file owner-only; keep the usual permissions
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import deque
+
+
+class CameraState:
+    """The pending frame and counters of one camera"""
+
+    def __init__(self, name, window=5.0):
+        self.name = name
+        self.window = window
+        self.frame = None
+        self.captured_at = None
+        self.busy = False
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.latency_ms = 0.0
+        self._arrivals = deque()
+        self._completions = deque()
+
+    def _rate(self, times, now):
+        while times and now - times[0] > self.window:
+            times.popleft()
+        if len(times) < 2:
+            return 0.0
+        return (len(times) - 1) / max(times[-1] - times[0], 1e-9)
+
+    def stats(self, now):
+        return {
+            'received': self.received,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'input_fps': round(self._rate(self._arrivals, now), 2),
+            'fps': round(self._rate(self._completions, now), 2),
+            'latency_ms': round(self.latency_ms, 1),
+        }
+
+
+class FrameScheduler:
+    """Hands frames from many cameras to a fixed pool of workers.
+
+    Each camera keeps only its latest frame: put() replaces a frame no
+    worker has taken yet and counts it as dropped, so a slow pool falls
+    behind by skipping frames rather than by queueing them. get() serves
+    cameras round-robin and never gives out a second frame of a camera
+    whose previous frame is still being processed, so every camera gets
+    an equal share of the workers and its frames are handled in order.
+    Workers call done() when they finish a frame.
+    """
+
+    def __init__(self, cameras, window=5.0):
+        self._cameras = [CameraState(name, window) for name in cameras]
+        self._by_name = {camera.name: camera for camera in self._cameras}
+        self._next = 0
+        self._closed = False
+        self._ready = threading.Condition()
+
+    @property
+    def cameras(self):
+        return [camera.name for camera in self._cameras]
+
+    def put(self, camera, frame, captured_at=None):
+        """Offer the newest frame of `camera`; returns False once closed"""
+        now = time.monotonic()
+        with self._ready:
+            if self._closed:
+                return False
+            state = self._by_name[camera]
+            if state.frame is not None:
+                state.dropped += 1
+            state.frame = frame
+            state.captured_at = now if captured_at is None else captured_at
+            state.received += 1
+            state._arrivals.append(now)
+            self._ready.notify()
+        return True
+
+    def get(self, timeout=None):
+        """Next (camera, frame, captured_at) in round-robin order; None when closed or timed out"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._ready:
+            while True:
+                if self._closed:
+                    return None
+                for offset in range(len(self._cameras)):
+                    state = self._cameras[(self._next + offset) % len(self._cameras)]
+                    if state.frame is not None and not state.busy:
+                        self._next = (self._next + offset + 1) % len(self._cameras)
+                        frame, state.frame = state.frame, None
+                        state.busy = True
+                        return state.name, frame, state.captured_at
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._ready.wait(remaining)
+
+    def done(self, camera, captured_at=None):
+        """Mark the frame taken from `camera` as finished, freeing the camera for the next get()"""
+        now = time.monotonic()
+        with self._ready:
+            state = self._by_name[camera]
+            state.busy = False
+            state.processed += 1
+            state._completions.append(now)
+            if captured_at is not None:
+                state.latency_ms = (now - captured_at) * 1000
+            if state.frame is not None:
+                self._ready.notify()
+
+    def idle(self):
+        """True when no frame is waiting or being processed"""
+        with self._ready:
+            return all(camera.frame is None and not camera.busy for camera in self._cameras)
+
+    def close(self):
+        """Wake every waiting worker; get() returns None from now on"""
+        with self._ready:
+            self._closed = True
+            self._ready.notify_all()
+
+    def stats(self):
+        """{camera: counters} with frame rates over the last `window` seconds"""
+        now = time.monotonic()
+        with self._ready:
+            return {camera.name: camera.stats(now) for camera in self._cameras}
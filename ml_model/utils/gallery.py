@@ -0,0 +1,259 @@
+from collections import Counter
+
+import numpy as np
+
+PRECISIONS = ('float32', 'float16', 'int8')
+# Rows converted back to float32 per matrix product when scoring a quantized
+# gallery; small enough for the converted block to stay in cache
+_SCORE_CHUNK = 256
+
+
+def normalize_rows(vectors):
+    """L2-normalise each row of a 2-D float32 array (zero rows stay zero)"""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def quantize_int8(rows):
+    """Per-row symmetric int8: returns (codes, scales) with rows ~= codes * scales[:, None]"""
+    rows = np.atleast_2d(np.asarray(rows, dtype=np.float32))
+    scales = np.abs(rows).max(axis=1) / 127
+    scales[scales == 0] = 1
+    codes = np.clip(np.round(rows / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def rerank(queries, names, exact, k):
+    """Rescore each query's candidates with float32 rows and keep the best k.
+
+    `names` holds (F, C) candidate names for the unit `queries`;
+    `exact(names)` returns float32 rows for a list of names (NaN rows for
+    names no longer enrolled). Returns (names, scores) of shape
+    (F, min(k, C)), best first.
+    """
+    rows = normalize_rows(exact(list(names.ravel()))).reshape(names.shape + (-1,))
+    sims = np.einsum('fcd,fd->fc', rows, queries)
+    sims = np.where(np.isnan(sims), -1.0, sims).astype(np.float32)
+    order = np.argsort(-sims, axis=1, kind='stable')[:, :k]
+    return np.take_along_axis(names, order, axis=1), np.take_along_axis(sims, order, axis=1)
+
+
+class EmbeddingGallery:
+    """All enrolled embeddings as one pre-normalised matrix.
+
+    Row i of `matrix` belongs to `names[i]`. Because the rows are unit
+    length, scoring every face in a frame against every identity is a
+    single matrix product. Rows live in a buffer with spare capacity so
+    enrolments and removals don't rebuild the matrix.
+
+    `precision` sets how rows are held in memory: float32, float16 (half
+    the memory) or int8 with one float32 scale per row (about a quarter).
+    Quantized rows are scored in small blocks converted back to float32;
+    int8 scores as fast as float32, float16 conversion is several times
+    slower in NumPy. Given
+    `exact` (a callable returning float32 rows for a list of names, such
+    as GalleryStore.rows), match() re-scores the `rerank` best quantized
+    candidates in float32, so the returned names and scores are those of
+    a float32 gallery unless the true best falls outside the candidates.
+    """
+
+    def __init__(self, dim=None, capacity=64, precision='float32', exact=None, rerank=16):
+        if precision not in PRECISIONS:
+            raise ValueError(f"precision must be one of {PRECISIONS}")
+        self.dim = dim
+        self.precision = precision
+        self.exact = exact
+        self.rerank = rerank
+        self._capacity = capacity
+        self._size = 0
+        self._rows = {}
+        self._names = np.empty(0, dtype=object)
+        self._matrix = None
+        self._scales = None
+        if dim is not None:
+            self._allocate(dim, capacity)
+
+    @classmethod
+    def from_embeddings(cls, embeddings, dim=None, **options):
+        """Build a gallery from a {name: vector} dict.
+
+        Vectors whose length differs from `dim` (by default the most common
+        length) are skipped, since they can't be compared with live faces.
+        """
+        if dim is None and embeddings:
+            dim = Counter(len(v) for v in embeddings.values()).most_common(1)[0][0]
+        gallery = cls(dim=dim, capacity=max(64, len(embeddings)), **options)
+        for name, vector in embeddings.items():
+            if len(vector) != dim:
+                print(f"Skipping embedding for {name}: dimension {len(vector)} != {dim}")
+                continue
+            gallery.add(name, vector)
+        return gallery
+
+    @classmethod
+    def from_arrays(cls, names, matrix, **options):
+        """Build a gallery from a name list and a matching (N, dim) matrix in one step"""
+        if not len(names):
+            return cls(**options)
+        gallery = cls(dim=matrix.shape[1], capacity=max(64, len(names)), **options)
+        if gallery.precision == 'float32':
+            rows = gallery._matrix[:len(names)]
+            # Copy and normalise straight into the buffer (works for memory maps and float16)
+            rows[:] = matrix
+            norms = np.linalg.norm(rows, axis=1, keepdims=True)
+            norms[norms == 0] = 1
+            rows /= norms
+        else:
+            # Normalised in float32 a chunk at a time, so only the quantized copy is kept
+            for start in range(0, len(names), _SCORE_CHUNK):
+                chunk = normalize_rows(matrix[start:start + _SCORE_CHUNK])
+                gallery._store(slice(start, start + len(chunk)), chunk)
+        gallery._names[:len(names)] = names
+        gallery._rows = {name: i for i, name in enumerate(names)}
+        gallery._size = len(names)
+        return gallery
+
+    def _allocate(self, dim, capacity):
+        dtype = np.float32 if self.precision == 'float32' else np.dtype(self.precision)
+        matrix = np.zeros((capacity, dim), dtype=dtype)
+        names = np.empty(capacity, dtype=object)
+        scales = np.ones(capacity, dtype=np.float32) if self.precision == 'int8' else None
+        if self._matrix is not None:
+            matrix[:self._size] = self._matrix[:self._size]
+            names[:self._size] = self._names[:self._size]
+            if scales is not None:
+                scales[:self._size] = self._scales[:self._size]
+        self._matrix = matrix
+        self._names = names
+        self._scales = scales
+        self._capacity = capacity
+
+    def _store(self, rows, vectors):
+        """Write unit float32 `vectors` into the buffer rows selected by `rows`"""
+        if self.precision == 'int8':
+            self._matrix[rows], self._scales[rows] = quantize_int8(vectors)
+        else:
+            self._matrix[rows] = vectors
+
+    def _decode(self, start, stop):
+        """float32 copy of rows start:stop"""
+        rows = self._matrix[start:stop].astype(np.float32)
+        if self._scales is not None:
+            rows *= self._scales[start:stop, None]
+        return rows
+
+    @property
+    def names(self):
+        return self._names[:self._size]
+
+    @property
+    def matrix(self):
+        """The rows as float32 (a copy when the gallery is quantized)"""
+        if self._matrix is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        if self.precision == 'float32':
+            return self._matrix[:self._size]
+        return self._decode(0, self._size)
+
+    @property
+    def nbytes(self):
+        """Memory held by the embedding rows in use"""
+        if self._matrix is None:
+            return 0
+        per_row = self._matrix.itemsize * self.dim + (4 if self._scales is not None else 0)
+        return per_row * self._size
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, name):
+        return name in self._rows
+
+    def get(self, name):
+        """Normalised embedding for `name`, or None"""
+        row = self._rows.get(name)
+        return None if row is None else self._decode(row, row + 1)[0]
+
+    def add(self, name, embedding):
+        """Insert or replace the embedding for `name`"""
+        vector = normalize_rows(embedding)[0]
+        if self.dim is None:
+            self.dim = len(vector)
+            self._allocate(self.dim, self._capacity)
+        if len(vector) != self.dim:
+            raise ValueError(f"Embedding for {name} has dimension {len(vector)}, expected {self.dim}")
+
+        row = self._rows.get(name)
+        if row is None:
+            if self._size == self._capacity:
+                self._allocate(self.dim, self._capacity * 2)
+            row = self._size
+            self._size += 1
+            self._rows[name] = row
+            self._names[row] = name
+        self._store(slice(row, row + 1), vector[np.newaxis])
+
+    def remove(self, name):
+        """Drop `name`; returns False if it wasn't enrolled"""
+        row = self._rows.pop(name, None)
+        if row is None:
+            return False
+        last = self._size - 1
+        if row != last:
+            # Move the last row into the hole to keep the matrix contiguous
+            moved = self._names[last]
+            self._matrix[row] = self._matrix[last]
+            if self._scales is not None:
+                self._scales[row] = self._scales[last]
+            self._names[row] = moved
+            self._rows[moved] = row
+        self._names[last] = None
+        self._size = last
+        return True
+
+    def scores(self, queries):
+        """Cosine similarity of each query row against every identity, shape (F, N)"""
+        queries = normalize_rows(queries)
+        if self._size == 0:
+            return np.zeros((len(queries), 0), dtype=np.float32)
+        if self.precision == 'float32':
+            return queries @ self.matrix.T
+        sims = np.empty((len(queries), self._size), dtype=np.float32)
+        block = np.empty((min(_SCORE_CHUNK, self._size), self.dim), dtype=np.float32)
+        for start in range(0, self._size, _SCORE_CHUNK):
+            stop = min(start + _SCORE_CHUNK, self._size)
+            rows = block[:stop - start]
+            rows[:] = self._matrix[start:stop]
+            sims[:, start:stop] = queries @ rows.T
+            if self._scales is not None:
+                # Row scales applied to the scores rather than the rows
+                sims[:, start:stop] *= self._scales[start:stop]
+        return sims
+
+    def match(self, queries, k=1):
+        """Top-k identities for each query row.
+
+        Returns (names, scores), both of shape (F, min(k, N)), best first.
+        """
+        queries = normalize_rows(queries)
+        sims = self.scores(queries)
+        reranking = self.exact is not None and self.precision != 'float32'
+        k_out = k
+        if reranking:
+            k = max(k, self.rerank)
+        k = min(k, sims.shape[1])
+        if k == 0:
+            return np.empty((len(sims), 0), dtype=object), sims[:, :0]
+        if k < sims.shape[1]:
+            top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(k), sims.shape).copy()
+        top_scores = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        names, top_scores = self.names[top], np.take_along_axis(top_scores, order, axis=1)
+        if reranking:
+            return rerank(queries, names, self.exact, k_out)
+        return names, top_scores
@@ -0,0 +1,433 @@
+import json
+import os
+import struct
+import time
+from collections import Counter
+
+import numpy as np
+
+from .file_lock import atomic_write, file_lock
+from .gallery import EmbeddingGallery
+from .timestamps import utc_now
+
+GALLERY_MATRIX = 'gallery.npy'
+GALLERY_INDEX = 'gallery_index.json'
+# Held by every change, so processes sharing the directory take turns
+GALLERY_LOCK = 'gallery.lock'
+FORMAT_VERSION = 1
+
+_NPY_MAGIC = b'\x93NUMPY\x01\x00'
+# Spare header bytes so the row count can grow without moving the data
+_HEADER_GROWTH = 32
+
+
+def _npy_header(shape, dtype, length=None):
+    """Version 1.0 .npy header, padded to `length` bytes (or 64-byte aligned with growth room)"""
+    header = repr({
+        'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+        'fortran_order': False,
+        'shape': tuple(shape),
+    })
+    prefix = len(_NPY_MAGIC) + 2
+    if length is None:
+        length = prefix + len(header) + _HEADER_GROWTH + 1
+        length += -length % 64
+    pad = length - prefix - len(header) - 1
+    if pad < 0:
+        return None
+    header = header + ' ' * pad + '\n'
+    return _NPY_MAGIC + struct.pack('<H', len(header)) + header.encode('latin1')
+
+
+def _read_npy_header(f):
+    """Return (shape, dtype, data offset) of an open .npy file"""
+    f.seek(0)
+    np.lib.format.read_magic(f)
+    shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+    return shape, dtype, f.tell()
+
+
+def _write_json_atomic(path, data):
+    atomic_write(path, json.dumps(data))
+
+
+class GalleryStore:
+    """Enrolled embeddings on disk as one contiguous .npy matrix plus a names index.
+
+    `gallery.npy` holds one row per identity and is opened with
+    np.load(mmap_mode='r'), so loading costs a header parse rather than
+    float-to-text conversion. The row count in the .npy header is
+    authoritative; bytes past it are unused. `gallery_index.json` lists the names in row
+    order along with per-name metadata and a generation counter that is
+    bumped on every change.
+
+    Changes hold an exclusive lock on `gallery.lock` (and load() a shared
+    one), so several API workers or processes can enrol into the same
+    directory without losing each other's rows.
+    """
+
+    def __init__(self, directory, dtype=None):
+        self.directory = directory
+        self._dtype = np.dtype(dtype) if dtype else None
+        self.matrix_path = os.path.join(directory, GALLERY_MATRIX)
+        self.index_path = os.path.join(directory, GALLERY_INDEX)
+        self.lock_path = os.path.join(directory, GALLERY_LOCK)
+        self._row_map = None
+
+    def lock(self, shared=False):
+        """Cross-process lock on the gallery directory (see utils.file_lock)"""
+        os.makedirs(self.directory, exist_ok=True)
+        return file_lock(self.lock_path, shared=shared)
+
+    @property
+    def dtype(self):
+        """Storage dtype: as requested, else as already on disk, else float32"""
+        if self._dtype is not None:
+            return self._dtype
+        return np.dtype(self.read_index()['dtype'] or 'float32')
+
+    def exists(self):
+        return os.path.exists(self.index_path) and os.path.exists(self.matrix_path)
+
+    def version(self):
+        """Cheap change marker: stat of the index file, or None if there is none"""
+        try:
+            st = os.stat(self.index_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def read_index(self):
+        """Names, metadata and version info; an empty index if there is no gallery"""
+        try:
+            with open(self.index_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'version': FORMAT_VERSION, 'dtype': None, 'dim': None,
+                    'names': [], 'meta': {}, 'generation': 0}
+
+    def load(self, mmap=True):
+        """Return (names, matrix) with one matrix row per name"""
+        index = self.read_index()
+        if index['names']:
+            # The index and the matrix header must come from the same change
+            with self.lock(shared=True):
+                index = self.read_index()
+                if index['names']:
+                    matrix = np.load(self.matrix_path, mmap_mode='r' if mmap else None)
+                    return index['names'], matrix[:len(index['names'])]
+        return index['names'], np.zeros((0, index['dim'] or 0), dtype=np.float32)
+
+    def rows(self, names):
+        """float32 rows for `names` through the memory map; NaN rows for unknown names.
+
+        Used to re-rank candidates of a quantized in-memory gallery: only
+        the requested rows are paged in. The name-to-row map is cached
+        until the index changes.
+        """
+        # Under the lock, so a row moved or rewritten in place is never read half-way
+        with self.lock(shared=True):
+            version = self.version()
+            if self._row_map is None or self._row_map[0] != version:
+                all_names, matrix = self.load()
+                self._row_map = (version, {name: i for i, name in enumerate(all_names)}, matrix)
+            _, row_of, matrix = self._row_map
+            out = np.full((len(names), matrix.shape[1]), np.nan, dtype=np.float32)
+            found = [(i, row_of[name]) for i, name in enumerate(names) if name in row_of]
+            if found:
+                at, rows = zip(*found)
+                out[list(at)] = matrix[list(rows)]
+        return out
+
+    def snapshot(self):
+        """(index, names, in-memory matrix copy) read consistently under the shared lock.
+
+        upsert() and remove() rewrite rows of gallery.npy in place, so a
+        memory map from load() can change under a reader; anything that
+        streams or hashes the gallery uses this copy instead.
+        """
+        index = self.read_index()
+        if not index['names']:
+            return index, [], np.zeros((0, index['dim'] or 0), dtype=np.float32)
+        with self.lock(shared=True):
+            index = self.read_index()
+            names, matrix = self.load(mmap=False)
+            return index, names, matrix
+
+    def load_embeddings(self):
+        """{name: float32 vector} for callers that expect the old dict shape"""
+        names, matrix = self.load()
+        matrix = np.asarray(matrix, dtype=np.float32)
+        return {name: matrix[i] for i, name in enumerate(names)}
+
+    def write(self, names, matrix, meta=None):
+        """Replace the whole gallery (atomically, via temp files)"""
+        with self.lock():
+            self._write(names, matrix, meta)
+
+    def _write(self, names, matrix, meta=None):
+        dtype = self.dtype
+        matrix = np.ascontiguousarray(matrix, dtype=dtype)
+        if matrix.ndim != 2 or len(matrix) != len(names):
+            raise ValueError("matrix must have one row per name")
+        index = self.read_index()
+
+        atomic_write(self.matrix_path, _npy_header(matrix.shape, dtype), matrix.tobytes())
+
+        meta = meta or {}
+        self._write_index(index, list(names), matrix.shape[1], {n: meta.get(n, {}) for n in names}, dtype)
+
+    def merge(self, names, matrix, meta=None):
+        """Add or overwrite many identities in one atomic rewrite"""
+        with self.lock():
+            self._merge(names, matrix, meta)
+
+    def _merge(self, names, matrix, meta=None):
+        matrix = np.asarray(matrix, dtype=np.float32)
+        meta = meta or {}
+        index = self.read_index()
+        if not index['names'] or not self.exists():
+            self.write(names, matrix, {n: self._meta(meta.get(n, {})) for n in names})
+            return
+        if matrix.shape[1] != index['dim']:
+            raise ValueError(f"Embedding dimension {matrix.shape[1]} does not match gallery dimension {index['dim']}")
+
+        all_names, current = index['names'], self.load(mmap=False)[1]
+        rows = {name: i for i, name in enumerate(all_names)}
+        added = [name for name in names if name not in rows]
+        merged = np.empty((len(all_names) + len(added), matrix.shape[1]), dtype=current.dtype)
+        merged[:len(all_names)] = current
+        all_names = all_names + added
+        rows.update((name, i) for i, name in enumerate(all_names))
+        merged[[rows[name] for name in names]] = matrix
+
+        all_meta = index['meta']
+        all_meta.update((n, self._meta(meta.get(n, {}))) for n in names)
+        self.write(all_names, merged, all_meta)
+
+    def upsert(self, name, embedding, **meta):
+        """Add or overwrite one identity without rewriting the other rows"""
+        with self.lock():
+            self._upsert(name, embedding, meta)
+
+    def _upsert(self, name, embedding, meta):
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        index = self.read_index()
+        names = index['names']
+        if not names or not self.exists():
+            self.write([name], vector[np.newaxis], {name: self._meta(meta)})
+            return
+
+        if len(vector) != index['dim']:
+            raise ValueError(f"Embedding dimension {len(vector)} does not match gallery dimension {index['dim']}")
+
+        row = names.index(name) if name in index['meta'] else len(names)
+        with open(self.matrix_path, 'r+b') as f:
+            shape, dtype, offset = _read_npy_header(f)
+            vector = vector.astype(dtype)
+            if row == len(names):
+                header = _npy_header((row + 1, len(vector)), dtype, length=offset)
+                if header is None:
+                    # No room left in the header; fall back to a full rewrite
+                    f.close()
+                    _, matrix = self.load(mmap=False)
+                    self.write(names + [name], np.vstack((matrix, vector)),
+                               dict(index['meta'], **{name: self._meta(meta)}))
+                    return
+            f.seek(offset + row * vector.nbytes)
+            f.write(vector.tobytes())
+            if row == len(names):
+                f.seek(0)
+                f.write(header)
+                names = names + [name]
+
+        index['meta'][name] = self._meta(meta)
+        self._write_index(index, names, len(vector), index['meta'], dtype, changed=[name])
+
+    def remove(self, name):
+        """Drop one identity by moving the last row into its slot; False if absent"""
+        with self.lock():
+            return self._remove(name)
+
+    def _remove(self, name):
+        index = self.read_index()
+        names = index['names']
+        if name not in index['meta']:
+            return False
+        row = names.index(name)
+        last = len(names) - 1
+        with open(self.matrix_path, 'r+b') as f:
+            shape, dtype, offset = _read_npy_header(f)
+            row_bytes = shape[1] * dtype.itemsize
+            if row != last:
+                f.seek(offset + last * row_bytes)
+                last_row = f.read(row_bytes)
+                f.seek(offset + row * row_bytes)
+                f.write(last_row)
+                names[row] = names[last]
+            # The file is never shrunk in place: another process may have it
+            # memory-mapped. The stale last row is overwritten by the next add.
+            f.seek(0)
+            f.write(_npy_header((last, shape[1]), dtype, length=offset))
+        names.pop()
+        meta = index['meta']
+        meta.pop(name)
+        # The moved row keeps its own embedding, so no name needs reloading
+        self._write_index(index, names, index['dim'], meta, dtype, changed=[])
+        return True
+
+    def _meta(self, meta):
+        return dict(meta, saved_at=meta.get('saved_at') or utc_now().isoformat())
+
+    def _write_index(self, index, names, dim, meta, dtype, changed=None):
+        """Write the index, stamping `changed` names (default: all) with the new generation"""
+        generation = index.get('generation', 0) + 1
+        for name in (names if changed is None else changed):
+            meta[name] = dict(meta.get(name, {}), generation=generation)
+        _write_json_atomic(self.index_path, {
+            'version': FORMAT_VERSION,
+            'dtype': dtype.name,
+            'dim': dim,
+            'names': names,
+            'meta': meta,
+            'generation': generation,
+        })
+
+
+class GalleryWatcher:
+    """Keeps an in-memory EmbeddingGallery in step with a GalleryStore.
+
+    poll() only stats the index file; when it has changed, the identities
+    added, re-enrolled or removed since the last sync are applied to the
+    gallery in place, so open video streams pick up new enrolments
+    without reloading everyone.
+
+    `factory(store)` builds the gallery when (nearly) everything changed;
+    by default an exact EmbeddingGallery, or e.g. utils.ann.open_ann_index
+    for approximate search over very large galleries.
+    """
+
+    def __init__(self, store, interval=1.0, factory=None):
+        self.store = store
+        self.interval = interval
+        self.factory = factory or (lambda store: EmbeddingGallery.from_arrays(*store.load()))
+        self.gallery = EmbeddingGallery()
+        self.generation = 0
+        self._version = None
+        self._checked_at = None
+
+    def poll(self, now=None):
+        """Sync if the store changed; checks at most once per `interval` seconds"""
+        now = time.monotonic() if now is None else now
+        if self._checked_at is not None and now - self._checked_at < self.interval:
+            return False
+        self._checked_at = now
+        version = self.store.version()
+        if version == self._version:
+            return False
+        self._version = version
+        return self.sync()
+
+    def sync(self):
+        """Apply changes since the last sync; returns True if the gallery changed"""
+        if self.store.read_index()['generation'] == self.generation:
+            return False
+        # Held while rows are copied out of the memory map, so no write moves them meanwhile
+        with self.store.lock(shared=True):
+            index = self.store.read_index()
+            names, meta = index['names'], index['meta']
+            removed = [name for name in self.gallery.names if name not in meta]
+            changed = [i for i, name in enumerate(names)
+                       if name not in self.gallery or meta[name].get('generation', 0) > self.generation]
+
+            if changed:
+                _, matrix = self.store.load()
+                if len(changed) > len(names) // 2 or (len(self.gallery) and self.gallery.dim != index['dim']):
+                    # Mostly new (first load, bulk rewrite): one bulk build is cheaper
+                    self.gallery = self.factory(self.store)
+                    removed = []
+                else:
+                    for i in changed:
+                        self.gallery.add(names[i], np.array(matrix[i], dtype=np.float32))
+        for name in removed:
+            self.gallery.remove(name)
+
+        self.generation = index['generation']
+        return bool(changed or removed)
+
+
+def legacy_json_path(directory, name):
+    """Path of `name`'s legacy <name>_embedding.json; ValueError if it would leave `directory`"""
+    filename = f'{name}_embedding.json'
+    path = os.path.join(directory, filename)
+    if os.path.basename(path) != filename:
+        raise ValueError(f"Invalid name: {name!r}")
+    return path
+
+
+def remove_legacy_json(directory, name):
+    """Delete `name`'s legacy per-person JSON, if any; True if there was one.
+
+    The binary gallery is the only copy writers keep. A leftover
+    *_embedding.json is stale as soon as that person is enrolled,
+    re-enrolled or removed, so every writer calls this for the names it
+    changes.
+    """
+    try:
+        os.remove(legacy_json_path(directory, name))
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def read_json_embeddings(json_dir):
+    """Read every *_embedding.json file: {name: (vector, metadata)}"""
+    embeddings = {}
+    if not os.path.isdir(json_dir):
+        return embeddings
+    for filename in sorted(os.listdir(json_dir)):
+        if not filename.endswith('_embedding.json'):
+            continue
+        name = filename.replace('_embedding.json', '')
+        try:
+            with open(os.path.join(json_dir, filename), 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Error loading embedding for {name}: {e}")
+            continue
+        meta = {k: v for k, v in data.items() if k in ('saved_at', 'num_images')}
+        embeddings[name] = (np.asarray(data['embedding'], dtype=np.float32), meta)
+    return embeddings
+
+
+def migrate_json_gallery(json_dir, store, dim=None):
+    """One-shot conversion of *_embedding.json files into `store`.
+
+    Files whose dimension differs from `dim` (by default the most common
+    one) are skipped. Returns the list of migrated names.
+    """
+    embeddings = read_json_embeddings(json_dir)
+    if dim is None and embeddings:
+        dim = Counter(len(v) for v, _ in embeddings.values()).most_common(1)[0][0]
+    names, rows, meta = [], [], {}
+    for name, (vector, info) in embeddings.items():
+        if len(vector) != dim:
+            print(f"Skipping {name}: dimension {len(vector)} != {dim}")
+            continue
+        names.append(name)
+        rows.append(vector)
+        meta[name] = info
+    matrix = np.stack(rows) if rows else np.zeros((0, dim or 0), dtype=np.float32)
+    store.write(names, matrix, meta)
+    return names
+
+
+def open_gallery_store(directory, dim=None):
+    """GalleryStore for `directory`, migrating its *_embedding.json files on first use"""
+    store = GalleryStore(directory)
+    if not store.exists() and os.path.isdir(directory):
+        with store.lock():
+            # Another worker may have migrated while we waited
+            if not store.exists():
+                migrate_json_gallery(directory, store, dim=dim)
+    return store
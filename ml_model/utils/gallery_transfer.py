@@ -0,0 +1,104 @@
+import json
+import struct
+
+import numpy as np
+
+NDJSON_TYPE = 'application/x-ndjson'
+BINARY_TYPE = 'application/octet-stream'
+
+# Rows per chunk when streaming an export
+_EXPORT_CHUNK = 1024
+
+
+def _public_meta(meta):
+    """Per-name metadata without the store's internal generation stamp"""
+    return {k: v for k, v in meta.items() if k != 'generation'}
+
+
+def iter_ndjson(names, matrix, meta=None):
+    """Yield one JSON line per identity: {"name", "embedding", ...metadata}"""
+    meta = meta or {}
+    for start in range(0, len(names), _EXPORT_CHUNK):
+        rows = np.asarray(matrix[start:start + _EXPORT_CHUNK], dtype=np.float32).tolist()
+        lines = []
+        for name, row in zip(names[start:start + _EXPORT_CHUNK], rows):
+            record = dict(_public_meta(meta.get(name, {})), name=name, embedding=row)
+            lines.append(json.dumps(record))
+        yield '\n'.join(lines) + '\n'
+
+
+def pack_header(names, dim, meta=None, **extra):
+    """Framing for the binary format: uint32 header length + JSON header.
+
+    The header is padded with spaces so the float32 rows that follow start
+    on a 4-byte boundary and can be viewed in place (np.frombuffer, a JS
+    Float32Array).
+    """
+    meta = meta or {}
+    header = json.dumps(dict(extra, names=list(names), dim=dim, dtype='float32',
+                             meta={n: _public_meta(meta.get(n, {})) for n in names})).encode('utf-8')
+    header += b' ' * (-len(header) % 4)
+    return struct.pack('<I', len(header)) + header
+
+
+def iter_binary(names, matrix, meta=None, **extra):
+    """Yield the header, then the rows as little-endian float32 in chunks"""
+    dim = matrix.shape[1] if matrix.ndim == 2 else 0
+    yield pack_header(names, dim, meta, **extra)
+    for start in range(0, len(names), _EXPORT_CHUNK):
+        yield np.ascontiguousarray(matrix[start:start + _EXPORT_CHUNK], dtype='<f4').tobytes()
+
+
+def parse_binary(data):
+    """Return (names, matrix, meta) from a binary payload; ValueError if malformed"""
+    if len(data) < 4:
+        raise ValueError("Payload too short")
+    (length,) = struct.unpack_from('<I', data)
+    try:
+        header = json.loads(bytes(data[4:4 + length]))
+        names, dim = header['names'], int(header['dim'])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid header: {e}")
+    if header.get('dtype', 'float32') != 'float32':
+        raise ValueError(f"Unsupported dtype {header['dtype']}")
+    body = memoryview(data)[4 + length:]
+    if len(body) != len(names) * dim * 4:
+        raise ValueError(f"Expected {len(names)} x {dim} float32 values, got {len(body)} bytes")
+    matrix = np.frombuffer(body, dtype='<f4').reshape(len(names), dim)
+    return names, matrix.astype(np.float32), header.get('meta') or {}
+
+
+def parse_ndjson(lines):
+    """Return (names, matrix, meta) from JSON lines; ValueError if malformed"""
+    names, rows, meta = [], [], {}
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            name, embedding = record.pop('name'), record.pop('embedding')
+            rows.append(np.asarray(embedding, dtype=np.float32))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"Line {number}: {e}")
+        if rows[-1].ndim != 1 or len(rows[-1]) != len(rows[0]):
+            raise ValueError(f"Line {number}: embedding dimension differs from line 1")
+        names.append(name)
+        meta[name] = record
+    matrix = np.stack(rows) if rows else np.zeros((0, 0), dtype=np.float32)
+    return names, matrix, meta
+
+
+def validate_names(names):
+    """Stripped names; ValueError on empty, repeated or path-like ones"""
+    cleaned = []
+    for name in names:
+        if not isinstance(name, str) or not name.strip():
+            raise ValueError("Name cannot be empty")
+        name = name.strip()
+        # Names become file names (<name>_embedding.json) in the embeddings directory
+        if any(c in name for c in ('/', '\\', '\0')) or '..' in name:
+            raise ValueError(f"Invalid name: {name!r}")
+        cleaned.append(name)
+    if len(set(cleaned)) != len(cleaned):
+        raise ValueError("Duplicate names in payload")
+    return cleaned
@@ -1,8 +1,17 @@
 import os
-import json
+import atexit
+import threading
 import numpy as np
-from datetime import datetime
-import streamlit as st
+
+from .ann import open_ann_index, sync_ann_index
+from .attendance_store import db_path_for, open_attendance_store
+from .attendance_writer import AttendanceWriter
+from .last_seen import LastSeenIndex
+from .gallery import EmbeddingGallery
+from .gallery_store import GalleryWatcher, open_gallery_store, remove_legacy_json
+from .landmarks import EMBEDDING_DIM
+from .metrics import ATTENDANCE_WRITES, register_writer
+from .timestamps import utc_now
 
 # Constants
 # Assuming this file is in ml_model/utils/helpers.py
@@ -16,73 +25,110 @@ BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 EMBEDDINGS_DIR = os.path.join(BASE_DIR, 'web_app', 'embeddings')
 ATTENDANCE_FILE = os.path.join(DATA_DIR, 'attendance.json')
+# Profiles captured from live sessions (see utils/profiling.py)
+PROFILE_DIR = os.path.join(DATA_DIR, 'profiles')
 
-# Ensure directories exist
-os.makedirs(DATA_DIR, exist_ok=True)
-os.makedirs(EMBEDDINGS_DIR, exist_ok=True)
+# Attendance is stored in SQLite; ATTENDANCE_FILE is only read once to import old logs
+ATTENDANCE_DB = db_path_for(ATTENDANCE_FILE)
 
-# Initialize attendance file
-if not os.path.exists(ATTENDANCE_FILE):
-    with open(ATTENDANCE_FILE, 'w') as f:
-        json.dump({'records': [], 'next_id': 1}, f, indent=2)
+def ensure_data_dirs():
+    """Create the data and embeddings directories; call once at startup, not on import"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    os.makedirs(EMBEDDINGS_DIR, exist_ok=True)
 
-def load_embeddings():
-    embeddings = {}
-    if not os.path.exists(EMBEDDINGS_DIR):
-        return embeddings
-    
-    for filename in os.listdir(EMBEDDINGS_DIR):
-        if filename.endswith('_embedding.json'):
-            name = filename.replace('_embedding.json', '')
+def get_attendance_store():
+    return open_attendance_store(ATTENDANCE_DB, legacy_json=ATTENDANCE_FILE)
+
+_writer = None
+_last_seen = None
+_writer_lock = threading.Lock()
+
+def get_last_seen_index():
+    """Process-wide dedup index (ATTENDANCE_DEDUP_SECONDS), seeded once from the store"""
+    global _last_seen
+    with _writer_lock:
+        if _last_seen is None:
+            index = LastSeenIndex()
             try:
-                with open(os.path.join(EMBEDDINGS_DIR, filename), 'r') as f:
-                    data = json.load(f)
-                    embeddings[name] = np.array(data['embedding'], dtype=np.float32)
+                index.seed(get_attendance_store())
             except Exception as e:
-                st.error(f"Error loading embedding for {name}: {e}")
-    return embeddings
+                print(f"Error seeding attendance dedup index: {e}")
+            _last_seen = index
+        return _last_seen
+
+def get_attendance_writer():
+    """Process-wide background writer; flushed when the interpreter exits"""
+    global _writer
+    last_seen = get_last_seen_index()
+    with _writer_lock:
+        if _writer is None:
+            _writer = AttendanceWriter(get_attendance_store(), last_seen=last_seen)
+            atexit.register(_writer.close)
+            register_writer(_writer)
+        return _writer
+
+def get_gallery_store():
+    """Binary gallery in EMBEDDINGS_DIR, migrated from the JSON files on first use"""
+    return open_gallery_store(EMBEDDINGS_DIR, dim=EMBEDDING_DIM)
+
+def load_embeddings():
+    try:
+        return get_gallery_store().load_embeddings()
+    except Exception as e:
+        print(f"Error loading embeddings: {e}")
+        return {}
+
+def watch_gallery(interval=1.0, ann=None, precision=None):
+    """GalleryWatcher over the enrolled faces, loaded and ready to poll for changes
+
+    With `ann` (default: GALLERY_ANN=1 in the environment) faces are matched
+    through the persisted IVF index instead of an exact scan; GALLERY_ANN_NLIST
+    and GALLERY_ANN_NPROBE tune it (see benchmarks/bench_ann.py).
+    `precision` (default: GALLERY_PRECISION, float32) keeps the rows in memory
+    as float16 or int8; candidates are re-ranked against the float32 rows of
+    the memory-mapped gallery file (see benchmarks/bench_quantized_gallery.py).
+    """
+    if ann is None:
+        ann = os.environ.get('GALLERY_ANN', '0') == '1'
+    precision = precision or os.environ.get('GALLERY_PRECISION', 'float32')
+    store = get_gallery_store()
+    options = {'precision': precision}
+    if precision != 'float32':
+        options['exact'] = store.rows
+    if ann:
+        nlist = int(os.environ.get('GALLERY_ANN_NLIST', 0)) or None
+        nprobe = int(os.environ.get('GALLERY_ANN_NPROBE', 0)) or None
+        factory = lambda store: open_ann_index(store, nlist=nlist, nprobe=nprobe, **options)
+    else:
+        factory = lambda store: EmbeddingGallery.from_arrays(*store.load(), **options)
+    watcher = GalleryWatcher(store, interval=interval, factory=factory)
+    try:
+        watcher.sync()
+    except Exception as e:
+        print(f"Error loading embeddings: {e}")
+    return watcher
 
 def save_embedding(name, embedding):
-    filepath = os.path.join(EMBEDDINGS_DIR, f"{name}_embedding.json")
-    data = {
-        "name": name,
-        "embedding": embedding.tolist(),
-        "saved_at": datetime.utcnow().isoformat()
-    }
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=2)
+    store = get_gallery_store()
+    with store.lock():
+        store.upsert(name, embedding)
+        remove_legacy_json(EMBEDDINGS_DIR, name)
+        sync_ann_index(store)
 
 def log_attendance(name, confidence):
-    try:
-        with open(ATTENDANCE_FILE, 'r') as f:
-            data = json.load(f)
-    except:
-        data = {'records': [], 'next_id': 1}
-    
-    now = datetime.now()
-    # Check if already logged recently (e.g., last 1 minute)
-    last_log = None
-    for record in reversed(data['records']):
-        if record['name'] == name:
-            last_log = datetime.fromisoformat(record['timestamp'])
-            break
-            
-    if last_log and (now - last_log).total_seconds() < 60:
+    now = utc_now()
+    # Check if already logged recently (shared window with the video writer)
+    last_seen = get_last_seen_index()
+    if not last_seen.should_log(name, now):
         return False # Already logged recently
 
-    record = {
-        'id': data['next_id'],
-        'name': name,
-        'timestamp': now.isoformat(),
-        'confidence': float(confidence),
-        'created_at': now.isoformat(),
-        'start_time': now.isoformat()
-    }
-    data['records'].append(record)
-    data['next_id'] += 1
-    
-    with open(ATTENDANCE_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+    try:
+        get_attendance_store().add(name, float(confidence), timestamp=now.isoformat())
+    except Exception:
+        # Not written, so it must not hold back the next sighting
+        last_seen.forget(name, now)
+        raise
+    ATTENDANCE_WRITES.inc(source='manual')
     return True
 
 def cosine_similarity(a, b):
@@ -0,0 +1,226 @@
+import os
+import threading
+import time
+
+from .face_mesh import FaceMeshSession
+from .frame_scheduler import FrameScheduler
+from .landmarks import compute_embeddings, results_to_array
+from .timestamps import utc_now
+
+
+class VideoFileSource:
+    """Frames of a video file delivered like a live camera.
+
+    With `realtime` frames come out at the file's frame rate (so a slow
+    consumer misses frames, as with a real camera); `loop` restarts the
+    file at the end. Also used as a stand-in for an RTSP feed in tests and
+    benchmarks.
+    """
+
+    def __init__(self, path, realtime=True, loop=False, fps=None):
+        self.path = str(path)
+        self.realtime = realtime
+        self.loop = loop
+        self.fps = fps
+
+    def __iter__(self):
+        import cv2
+        while True:
+            cap = cv2.VideoCapture(self.path)
+            if not cap.isOpened():
+                raise ValueError(f"Cannot open video {self.path}")
+            interval = 1.0 / (self.fps or cap.get(cv2.CAP_PROP_FPS) or 25.0)
+            due = time.monotonic()
+            try:
+                while True:
+                    ok, frame = cap.read()
+                    if not ok:
+                        break
+                    if self.realtime:
+                        due += interval
+                        time.sleep(max(0.0, due - time.monotonic()))
+                    yield frame
+            finally:
+                cap.release()
+            if not self.loop:
+                return
+
+
+class CaptureSource:
+    """Frames of an RTSP/HTTP stream or a local camera index, read as fast as they arrive"""
+
+    def __init__(self, url):
+        self.url = int(url) if str(url).isdigit() else url
+
+    def __iter__(self):
+        import cv2
+        cap = cv2.VideoCapture(self.url)
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open stream {self.url}")
+        try:
+            while True:
+                ok, frame = cap.read()
+                if not ok:
+                    return
+                yield frame
+        finally:
+            cap.release()
+
+
+def open_source(spec, loop=False):
+    """Frame source for a stream URL, a camera index or a video file"""
+    if '://' in str(spec) or str(spec).isdigit():
+        return CaptureSource(spec)
+    if not os.path.exists(spec):
+        raise ValueError(f"No such video file: {spec}")
+    return VideoFileSource(spec, realtime=True, loop=loop)
+
+
+class FaceMeshLandmarks:
+    """One FaceMesh graph per camera, in tracking mode like a live stream.
+
+    The scheduler never gives two workers the same camera at once, so a
+    camera's graph only ever sees that camera's frames, in order.
+    """
+
+    def __init__(self, max_num_faces=4):
+        self.max_num_faces = max_num_faces
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, camera, frame_bgr):
+        import cv2
+        with self._lock:
+            session = self._sessions.get(camera)
+            if session is None:
+                session = self._sessions[camera] = FaceMeshSession(
+                    static_image_mode=False, max_num_faces=self.max_num_faces, refine_landmarks=True
+                )
+        return results_to_array(session.process(cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)))
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+class IngestServer:
+    """Recognition for many cameras on a fixed pool of worker threads.
+
+    One reader thread per source feeds a FrameScheduler (latest frame
+    wins per camera, cameras served round-robin); `workers` threads take
+    frames from it, find landmarks, and match the faces against the one
+    shared gallery of `gallery_watcher` (a GalleryWatcher, polled for new
+    enrolments). Recognised faces go to `writer`, the common
+    AttendanceWriter, stamped with the frame's capture time.
+
+    `sources` maps camera names to iterables of BGR frames; `landmarks`
+    is a callable (camera, frame) -> (N_faces, 478, 3) points, by default
+    a FaceMesh graph per camera.
+    """
+
+    def __init__(self, sources, gallery_watcher, writer, workers=4, threshold=0.5, landmarks=None):
+        self.sources = dict(sources)
+        self.gallery_watcher = gallery_watcher
+        self.writer = writer
+        self.workers = workers
+        self.threshold = threshold
+        self.landmarks = landmarks or FaceMeshLandmarks()
+        self.scheduler = FrameScheduler(self.sources)
+        self.errors = 0
+        self.recognised = 0
+        self._gallery_lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._readers = []
+        self._pool = []
+
+    def start(self):
+        for camera, source in self.sources.items():
+            thread = threading.Thread(target=self._read, args=(camera, source), name=f'ingest-{camera}', daemon=True)
+            thread.start()
+            self._readers.append(thread)
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'ingest-worker-{i}', daemon=True)
+            thread.start()
+            self._pool.append(thread)
+        return self
+
+    def running(self):
+        """True while any source is still delivering frames"""
+        return any(thread.is_alive() for thread in self._readers)
+
+    def wait_sources(self, timeout=None):
+        """Block until every (finite) source has been read to the end"""
+        for thread in self._readers:
+            thread.join(timeout)
+
+    def stop(self, timeout=5):
+        """Stop reading, let the workers finish their current frames, and close FaceMesh"""
+        self._stop.set()
+        self.scheduler.close()
+        for thread in self._pool:
+            thread.join(timeout)
+        if hasattr(self.landmarks, 'close'):
+            self.landmarks.close()
+
+    def drain(self, timeout=10):
+        """Wait until no frame is pending or in progress; False on timeout"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.scheduler.idle():
+                return True
+            time.sleep(0.01)
+        return False
+
+    def stats(self):
+        """Per-camera counters plus the writer's"""
+        with self._counter_lock:
+            counters = {'recognised': self.recognised, 'errors': self.errors}
+        return {'cameras': self.scheduler.stats(), **counters, 'writer': self.writer.stats()}
+
+    def _read(self, camera, source):
+        try:
+            for frame in source:
+                if self._stop.is_set() or not self.scheduler.put(camera, (frame, utc_now())):
+                    return
+        except Exception as e:
+            print(f"Camera {camera} stopped: {e}")
+
+    def _work(self):
+        while True:
+            item = self.scheduler.get()
+            if item is None:
+                return
+            camera, (frame, captured), captured_at = item
+            try:
+                self._process(camera, frame, captured)
+            except Exception as e:
+                with self._counter_lock:
+                    self.errors += 1
+                print(f"Camera {camera} frame error: {e}")
+            finally:
+                self.scheduler.done(camera, captured_at)
+
+    def _process(self, camera, frame, captured):
+        points = self.landmarks(camera, frame)
+        if not len(points):
+            return
+        embeddings = compute_embeddings(points)
+        # GalleryWatcher syncs in place, so matching waits for a sync to finish
+        with self._gallery_lock:
+            try:
+                self.gallery_watcher.poll()
+            except Exception as e:
+                print(f"Gallery reload error: {e}")
+            gallery = self.gallery_watcher.gallery
+            if not len(gallery):
+                return
+            names, scores = gallery.match(embeddings, k=1)
+        for name, score in zip(names[:, 0], scores[:, 0]):
+            if name is not None and score >= self.threshold:
+                if self.writer.submit(name, float(score), captured.isoformat()):
+                    with self._counter_lock:
+                        self.recognised += 1
+                    print(f"✓ {camera}: {name} (confidence: {score:.3f})")
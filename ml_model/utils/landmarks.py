@@ -0,0 +1,72 @@
+import numpy as np
+
+# FaceMesh with refine_landmarks=True returns 468 mesh points + 10 iris points
+NUM_LANDMARKS = 478
+
+# Keypoints for the derived distance features - must match script.js
+KEYPOINTS = {
+    "leftEye": 33,
+    "rightEye": 263,
+    "nose": 1,
+    "chin": 152,
+    "leftMouth": 61,
+    "rightMouth": 291
+}
+
+KEYPOINT_PAIRS = np.array([
+    (KEYPOINTS["leftEye"], KEYPOINTS["rightEye"]),
+    (KEYPOINTS["leftEye"], KEYPOINTS["nose"]),
+    (KEYPOINTS["rightEye"], KEYPOINTS["nose"]),
+    (KEYPOINTS["nose"], KEYPOINTS["chin"]),
+    (KEYPOINTS["leftMouth"], KEYPOINTS["rightMouth"]),
+    (KEYPOINTS["leftEye"], KEYPOINTS["chin"]),
+    (KEYPOINTS["rightEye"], KEYPOINTS["chin"])
+])
+
+EMBEDDING_DIM = NUM_LANDMARKS * 3 + len(KEYPOINT_PAIRS)
+
+
+def landmarks_to_array(multi_face_landmarks):
+    """Convert MediaPipe face landmark lists to an (N_faces, N_landmarks, 3) float32 array"""
+    if not multi_face_landmarks:
+        return np.zeros((0, NUM_LANDMARKS, 3), dtype=np.float32)
+    # Attribute access on the protobuf landmarks dominates; one flat list
+    # and a single array conversion keeps the per-landmark work minimal
+    flat = []
+    for face in multi_face_landmarks:
+        for lm in face.landmark:
+            flat.extend((lm.x, lm.y, lm.z))
+    return np.array(flat, dtype=np.float32).reshape(len(multi_face_landmarks), -1, 3)
+
+
+def results_to_array(results):
+    """Landmark array for every face in a FaceMesh `process()` result"""
+    return landmarks_to_array(results.multi_face_landmarks)
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def compute_embeddings(points):
+    """Embeddings for a batch of faces.
+
+    `points` is (N_faces, N_landmarks, 3) (a single (N_landmarks, 3) face is
+    also accepted). Each embedding is the flattened xyz coordinates followed
+    by the 7 keypoint distances, each part L2-normalised independently as in
+    script.js. Returns an (N_faces, N_landmarks * 3 + 7) float32 array.
+    """
+    points = np.asarray(points, dtype=np.float32)
+    if points.ndim == 2:
+        points = points[np.newaxis]
+    raw = points.reshape(len(points), points.shape[1] * 3)
+    deltas = points[:, KEYPOINT_PAIRS[:, 0]] - points[:, KEYPOINT_PAIRS[:, 1]]
+    derived = np.sqrt(np.sum(deltas * deltas, axis=2))
+    return np.concatenate((_normalize(raw), _normalize(derived)), axis=1)
+
+
+def embed_results(results):
+    """(N_faces, EMBEDDING_DIM) embeddings for a FaceMesh `process()` result"""
+    return compute_embeddings(results_to_array(results))
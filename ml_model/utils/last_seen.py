@@ -0,0 +1,89 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from .timestamps import to_utc, utc_now
+
+DEFAULT_WINDOW = 60
+
+
+def dedup_window():
+    """Dedup window in seconds, from ATTENDANCE_DEDUP_SECONDS (default 60)"""
+    return float(os.environ.get('ATTENDANCE_DEDUP_SECONDS', DEFAULT_WINDOW))
+
+
+def _as_datetime(value):
+    return utc_now() if value is None else to_utc(value)
+
+
+class LastSeenIndex:
+    """When each name was last logged, for the attendance dedup window.
+
+    should_log() is a dict lookup instead of a query against the log. Names
+    not seen within `window` seconds are evicted (they no longer affect
+    dedup), and at most `max_names` are kept, least recently logged first
+    out, so memory stays bounded.
+    """
+
+    def __init__(self, window=None, max_names=10000):
+        self.window = dedup_window() if window is None else float(window)
+        self.max_names = max_names
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def seed(self, store, now=None):
+        """Load names logged within the window from an AttendanceStore"""
+        now = _as_datetime(now)
+        since = now - timedelta(seconds=self.window)
+        recent = store.last_seen_since(since.isoformat(), until=now.isoformat())
+        with self._lock:
+            for name, timestamp in sorted(recent.items(), key=lambda item: item[1]):
+                self._record(name, to_utc(timestamp))
+            self._evict(now)
+        return len(recent)
+
+    def should_log(self, name, when=None):
+        """True (and `name` is marked as seen) unless it was logged within the window before `when`.
+
+        Sightings can arrive out of order (writer queue, video batches); one
+        earlier than the last logged time is not a duplicate of it.
+        """
+        when = _as_datetime(when)
+        with self._lock:
+            last = self._seen.get(name)
+            if last is not None and 0 <= (when - last).total_seconds() < self.window:
+                return False
+            self._record(name, when)
+            self._evict(when)
+            return True
+
+    def forget(self, name, when):
+        """Undo should_log() for a sighting that was never written (if nothing newer marked it)"""
+        when = _as_datetime(when)
+        with self._lock:
+            if self._seen.get(name) == when:
+                del self._seen[name]
+
+    def get(self, name):
+        """When `name` was last logged, or None if not within the window"""
+        with self._lock:
+            return self._seen.get(name)
+
+    def __len__(self):
+        return len(self._seen)
+
+    def _record(self, name, when):
+        # Keep the later time, so an out-of-order sighting can't reopen the window
+        last = self._seen.get(name)
+        if last is None or when > last:
+            self._seen[name] = when
+            self._seen.move_to_end(name)
+
+    def _evict(self, now):
+        cutoff = now - timedelta(seconds=self.window)
+        while self._seen:
+            name, last = next(iter(self._seen.items()))
+            if last > cutoff and len(self._seen) <= self.max_names:
+                break
+            self._seen.popitem(last=False)
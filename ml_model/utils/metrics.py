@@ -0,0 +1,269 @@
+import bisect
+import math
+import threading
+import time
+
+# Seconds; spans a fast matrix product up to a stalled frame
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{n}="{v}"' for (n, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=(), collect=None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.collect = collect
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labels) or not all(name in labels for name in self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.labels)
+
+    def values(self):
+        """{label values: value}; from `collect()` for metrics read from elsewhere"""
+        if self.collect is not None:
+            collected = self.collect()
+            return collected if isinstance(collected, dict) else {(): collected}
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for key, value in sorted(self.values().items()):
+            lines.append(f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonic count, optionally split by labels"""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self.values().get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down (or is read from `collect` when rendered)"""
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class _Series:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    """Distribution of observations in fixed cumulative buckets (Prometheus style)"""
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = _Series(len(self.buckets) + 1)
+            series.counts[index] += 1
+            series.sum += value
+            series.count += 1
+
+    def time(self, **labels):
+        """Context manager observing the seconds spent in its block"""
+        return _Timer(self, labels)
+
+    def summary(self, **labels):
+        """{'count', 'sum', 'mean', 'p50', 'p95', 'p99'} for one label set (quantiles from the buckets)"""
+        with self._lock:
+            series = self._values.get(self._key(labels))
+            counts = list(series.counts) if series else []
+            total, count = (series.sum, series.count) if series else (0.0, 0)
+        result = {'count': count, 'sum': total, 'mean': total / count if count else 0.0}
+        for q in (0.5, 0.95, 0.99):
+            result[f'p{int(q * 100)}'] = self._quantile(counts, count, q)
+        return result
+
+    def _quantile(self, counts, count, q):
+        # Linear interpolation within the bucket, like histogram_quantile()
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for i, n in enumerate(counts):
+            if seen + n >= rank and n:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((key, list(s.counts), s.sum, s.count) for key, s in self._values.items())
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                labels = _format_labels(self.labels, key, [('le', _format_value(float(bound)))])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labels, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+class StageTimer:
+    """Times consecutive stages of one unit of work (e.g. a video frame).
+
+    mark(stage) records the time since the previous mark (or since the
+    timer was created) under `stage` in `histogram`, which must have a
+    'stage' label; finish() records the total in `total` and returns it.
+    """
+
+    __slots__ = ('histogram', 'started', 'last')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.started = self.last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.histogram.observe(now - self.last, stage=stage)
+        self.last = now
+
+    def finish(self, total=None):
+        elapsed = time.perf_counter() - self.started
+        if total is not None:
+            total.observe(elapsed)
+        return elapsed
+
+
+class Registry:
+    """Named metrics, rendered together in the Prometheus text format.
+
+    counter(), gauge() and histogram() return the existing metric when the
+    name is already registered, so modules can declare the metrics they
+    update at import time.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, help, labels=(), collect=None):
+        return self._get_or_create(Counter, name, help, labels, collect)
+
+    def gauge(self, name, help, labels=(), collect=None):
+        return self._get_or_create(Gauge, name, help, labels, collect)
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help, labels, buckets)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                print(f"Error collecting metric {metric.name}: {e}")
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry used by the video processor and the Flask app
+REGISTRY = Registry()
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Video pipeline (AttendanceVideoProcessor)
+FRAME_STAGE_SECONDS = REGISTRY.histogram(
+    'face_frame_stage_seconds', 'Seconds spent in each stage of a video frame', labels=('stage',))
+FRAME_SECONDS = REGISTRY.histogram('face_frame_seconds', 'Seconds to process one video frame')
+FRAMES = REGISTRY.counter('face_frames_total', 'Video frames processed')
+FRAMES_DROPPED = REGISTRY.counter(
+    'face_frames_dropped_total', 'Video frames returned without recognition because FaceMesh failed')
+MATCHES = REGISTRY.counter('face_matches_total', 'Faces matched against the gallery')
+RECOGNITIONS = REGISTRY.counter('face_recognitions_total', 'Matches at or above the recognition threshold')
+
+# Attendance writes, by where they came from
+ATTENDANCE_WRITES = REGISTRY.counter('attendance_writes_total', 'Attendance records written', labels=('source',))
+
+# Flask routes
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_seconds', 'Seconds to handle an API request', labels=('method', 'route', 'status'))
+
+
+def register_writer(writer, registry=REGISTRY):
+    """Expose an AttendanceWriter's counters and queue depth (replacing a previous writer's)"""
+    outcomes = ('written', 'duplicates', 'dropped', 'errors')
+    registry.counter('attendance_writer_records_total', 'Sightings handled by the background attendance writer',
+                     labels=('outcome',)).collect = lambda: {(o,): writer.stats()[o] for o in outcomes}
+    registry.gauge('attendance_writer_queue_depth',
+                   'Sightings waiting for the attendance writer').collect = lambda: writer.stats()['queue_depth']
+    registry.gauge('attendance_writer_last_commit_seconds', 'Duration of the last attendance commit'
+                   ).collect = lambda: writer.stats()['last_commit_ms'] / 1000
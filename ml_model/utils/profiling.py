@@ -0,0 +1,260 @@
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from .file_lock import atomic_write
+
+PROFILE_MODES = ('cprofile', 'sample')
+# Written by POST /api/admin/profile, watched by every SessionProfiler
+REQUEST_FILE = 'profile_request.json'
+PROFILE_SUFFIXES = {'cprofile': '.pstats', 'sample': '.folded'}
+MAX_SECONDS = 600
+# Profiles kept on disk before the oldest are deleted (FACE_PROFILE_MAX_MB)
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+_sessions = itertools.count(1)
+# cProfile hooks are process-wide, so only one session profiles at a time
+_cprofile_lock = threading.Lock()
+
+
+def max_profile_bytes():
+    return int(float(os.environ.get('FACE_PROFILE_MAX_MB', DEFAULT_MAX_BYTES / 1024 / 1024)) * 1024 * 1024)
+
+
+def parse_profile_spec(spec):
+    """'cprofile:30' / 'sample:10' / '30' (cprofile) -> (mode, seconds), or None for an empty spec"""
+    if not spec:
+        return None
+    mode, _, seconds = spec.rpartition(':')
+    mode = mode or 'cprofile'
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Profile mode must be one of {PROFILE_MODES}")
+    seconds = float(seconds)
+    if not 0 < seconds <= MAX_SECONDS:
+        raise ValueError(f"Profile length must be between 0 and {MAX_SECONDS} seconds")
+    return mode, seconds
+
+
+def request_profile(directory, seconds, mode='cprofile'):
+    """Ask every running session to profile itself for `seconds`; returns the request"""
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Profile mode must be one of {PROFILE_MODES}")
+    if not 0 < seconds <= MAX_SECONDS:
+        raise ValueError(f"Profile length must be between 0 and {MAX_SECONDS} seconds")
+    os.makedirs(directory, exist_ok=True)
+    request = {'id': f'{time.time_ns():x}', 'mode': mode, 'seconds': seconds,
+               'requested_at': datetime.now().isoformat()}
+    atomic_write(os.path.join(directory, REQUEST_FILE), json.dumps(request))
+    return request
+
+
+def read_request(directory):
+    try:
+        with open(os.path.join(directory, REQUEST_FILE), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def list_profiles(directory):
+    """Saved profiles, newest first: [{'name', 'bytes', 'modified'}]"""
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.endswith(tuple(PROFILE_SUFFIXES.values())):
+            stat = entry.stat()
+            profiles.append({'name': entry.name, 'bytes': stat.st_size,
+                             'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()})
+    return sorted(profiles, key=lambda p: p['modified'], reverse=True)
+
+
+def prune_profiles(directory, max_bytes=None):
+    """Delete the oldest profiles until the rest fit in `max_bytes`; returns the names removed"""
+    max_bytes = max_profile_bytes() if max_bytes is None else max_bytes
+    profiles = list_profiles(directory)
+    total = sum(p['bytes'] for p in profiles)
+    removed = []
+    for profile in reversed(profiles):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(directory, profile['name']))
+        except FileNotFoundError:
+            pass
+        total -= profile['bytes']
+        removed.append(profile['name'])
+    return removed
+
+
+class StackSampler:
+    """Samples one thread's Python stack every `interval` seconds while it is inside run().
+
+    Stacks are counted in the folded format (root;...;leaf count) that
+    flamegraph.pl, speedscope and inferno read.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._target = None
+        self._inside = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def run(self, fn, *args):
+        self._target = threading.get_ident()
+        self._inside = True
+        try:
+            return fn(*args)
+        finally:
+            self._inside = False
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not self._inside:
+                continue
+            frame = sys._current_frames().get(self._target)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+                self.samples += 1
+
+
+class SessionProfiler:
+    """Opt-in profiling of one video session's per-frame calls.
+
+    Wrap the frame handler with run(fn, frame). Nothing is profiled until
+    a capture starts, either from the FACE_PROFILE environment variable
+    ('cprofile:30' or 'sample:30', at the first frame) or from a request
+    written to `directory` by POST /api/admin/profile, which is checked
+    at most once per `poll_interval` seconds. A capture lasts the given
+    number of seconds of wall time and writes
+    <directory>/<session>-<time>.pstats (cProfile) or .folded (stack
+    samples); the oldest profiles are then deleted beyond
+    FACE_PROFILE_MAX_MB.
+    """
+
+    def __init__(self, directory, session=None, poll_interval=1.0, max_bytes=None):
+        self.directory = directory
+        self.session = session or f'session{os.getpid()}-{next(_sessions)}'
+        self.poll_interval = poll_interval
+        self.max_bytes = max_bytes
+        self.mode = None
+        self.saved = []
+        self._until = 0.0
+        self._profiler = None
+        self._checked_at = None
+        # A request made before this session started is not for it
+        request = read_request(directory)
+        self._request_id = request and request.get('id')
+        try:
+            self._pending = parse_profile_spec(os.environ.get('FACE_PROFILE', ''))
+        except ValueError as e:
+            print(f"Ignoring FACE_PROFILE: {e}")
+            self._pending = None
+
+    @property
+    def active(self):
+        return self.mode is not None
+
+    def start(self, seconds, mode='cprofile'):
+        """Begin a capture (ends any capture in progress)"""
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Profile mode must be one of {PROFILE_MODES}")
+        if self.active:
+            self.finish()
+        self.mode = mode
+        self._until = time.monotonic() + seconds
+        if mode == 'cprofile':
+            import cProfile
+            self._profiler = cProfile.Profile()
+        else:
+            self._profiler = StackSampler()
+        print(f"[profile] {self.session}: {mode} for {seconds:g}s")
+
+    def run(self, fn, *args):
+        """Call fn(*args), profiled while a capture is running"""
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.poll_interval:
+            self._checked_at = now
+            self._poll()
+        if self.mode is None:
+            return fn(*args)
+        try:
+            if self.mode == 'sample':
+                return self._profiler.run(fn, *args)
+            if not _cprofile_lock.acquire(blocking=False):
+                # Another session holds the profiler hooks for this frame
+                return fn(*args)
+            try:
+                self._profiler.enable()
+                try:
+                    return fn(*args)
+                finally:
+                    self._profiler.disable()
+            finally:
+                _cprofile_lock.release()
+        finally:
+            if time.monotonic() >= self._until:
+                self.finish()
+
+    def finish(self):
+        """End the capture and save it; returns the file path (None if nothing was running)"""
+        mode, profiler = self.mode, self._profiler
+        if mode is None:
+            return None
+        self.mode = self._profiler = None
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+        path = os.path.join(self.directory, f'{self.session}-{stamp}{PROFILE_SUFFIXES[mode]}')
+        try:
+            if mode == 'cprofile':
+                profiler.dump_stats(path)
+            else:
+                profiler.stop()
+                with open(path, 'w') as f:
+                    f.write(profiler.folded())
+            self.saved.append(path)
+            print(f"[profile] {self.session}: saved {path}")
+            prune_profiles(self.directory, self.max_bytes)
+        except (OSError, TypeError) as e:
+            # dump_stats raises TypeError when no frame was profiled
+            print(f"[profile] {self.session}: could not save profile: {e}")
+            return None
+        return path
+
+    def close(self):
+        self.finish()
+
+    def _poll(self):
+        if self._pending is not None:
+            mode, seconds = self._pending
+            self._pending = None
+            self.start(seconds, mode)
+            return
+        try:
+            request = read_request(self.directory)
+        except OSError:
+            return
+        if request and request.get('id') != self._request_id:
+            self._request_id = request.get('id')
+            self.start(float(request['seconds']), request.get('mode', 'cprofile'))
@@ -0,0 +1,106 @@
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+def _rows(result):
+    """Records held by a cached result (a count is one row)"""
+    return len(result) if isinstance(result, list) else 1
+
+
+class AttendanceCache:
+    """Memoised AttendanceStore reads for a long-running process (the Flask API).
+
+    Results are keyed by the query arguments and tagged with SQLite's
+    `PRAGMA data_version` read on a private connection. That value changes
+    whenever any other connection, in this process or another one (the
+    Streamlit app), commits to the database. In WAL mode it is read from the
+    shared-memory index, so an unchanged database is served without touching
+    the files. Writers in this process also call invalidate() so the next
+    read never waits on the version check to notice them.
+
+    Memory is bounded by the total number of cached records (`max_rows`)
+    as well as by entry count: an unpaginated read of a large log is
+    larger than `max_rows` and is never cached, and least recently used
+    results are evicted until the rest fit.
+
+    Cached lists are shared between callers and must not be modified.
+    """
+
+    def __init__(self, store, max_entries=256, max_rows=50000):
+        self.store = store
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._entries = OrderedDict()
+        self._rows = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(store.path, check_same_thread=False)
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def data_version(self):
+        with self._lock:
+            return self._conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def query(self, **filters):
+        """store.query(**filters), cached"""
+        return self._get('query', filters, self.store.query)
+
+    def count(self, **filters):
+        """store.count(**filters), cached"""
+        return self._get('count', filters, self.store.count)
+
+    def invalidate(self):
+        """Drop every cached result (call after writing through the store)"""
+        with self._lock:
+            self._clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'rows': self._rows,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'invalidations': self.invalidations,
+            }
+
+    def _get(self, kind, filters, load):
+        key = (kind, tuple(sorted(filters.items())))
+        # Read the version before querying, so a commit racing the query
+        # leaves the entry tagged as stale rather than fresh
+        version = self.data_version()
+        with self._lock:
+            if version != self._version:
+                if self._version is not None:
+                    self.invalidations += 1
+                self._clear()
+                self._version = version
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        result = load(**filters)
+        rows = _rows(result)
+        with self._lock:
+            if version == self._version and rows <= self.max_rows and key not in self._entries:
+                self._entries[key] = result
+                self._rows += rows
+                while len(self._entries) > self.max_entries or self._rows > self.max_rows:
+                    self._rows -= _rows(self._entries.popitem(last=False)[1])
+        return result
+
+    def _clear(self):
+        self._entries.clear()
+        self._rows = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,121 @@
+import numpy as np
+
+from .face_mesh import FaceMeshSession
+from .landmarks import NUM_LANDMARKS, results_to_array
+
+
+class FaceDetectionSession(FaceMeshSession):
+    """Long-lived MediaPipe FaceDetection graph, with the same lifecycle as FaceMeshSession"""
+
+    def __init__(self, model_selection=0, min_detection_confidence=0.5):
+        super().__init__()
+        self.options = {
+            'model_selection': model_selection,
+            'min_detection_confidence': min_detection_confidence,
+        }
+
+    def _open(self):
+        import mediapipe as mp
+        self.graphs_opened += 1
+        return mp.solutions.face_detection.FaceDetection(**self.options)
+
+
+def detections_to_boxes(detections):
+    """(N, 4) normalised [x_min, y_min, x_max, y_max] boxes from FaceDetection results"""
+    boxes = []
+    for detection in detections or []:
+        box = detection.location_data.relative_bounding_box
+        boxes.append((box.xmin, box.ymin, box.xmin + box.width, box.ymin + box.height))
+    return np.array(boxes, dtype=np.float32).reshape(-1, 4)
+
+
+def roi_boxes(boxes, frame_w, frame_h, padding=0.25):
+    """Square pixel crops around normalised face boxes.
+
+    Each box is grown by `padding` times its longer side on every side
+    (FaceMesh needs the whole head, not just the detector's tight box) and
+    clipped to the frame. Returns an (N, 4) int array of x0, y0, x1, y1.
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    cx = (boxes[:, 0] + boxes[:, 2]) / 2 * frame_w
+    cy = (boxes[:, 1] + boxes[:, 3]) / 2 * frame_h
+    side = np.maximum((boxes[:, 2] - boxes[:, 0]) * frame_w, (boxes[:, 3] - boxes[:, 1]) * frame_h)
+    half = side * (0.5 + padding)
+    rois = np.stack((cx - half, cy - half, cx + half, cy + half), axis=1)
+    rois = np.round(rois).astype(int)
+    rois[:, [0, 2]] = np.clip(rois[:, [0, 2]], 0, frame_w)
+    rois[:, [1, 3]] = np.clip(rois[:, [1, 3]], 0, frame_h)
+    keep = (rois[:, 2] > rois[:, 0]) & (rois[:, 3] > rois[:, 1])
+    return rois[keep]
+
+
+def crop_landmarks_to_frame(points, roi, frame_w, frame_h):
+    """Map landmarks normalised to a crop back to full-frame normalised coordinates.
+
+    x and y are shifted by the crop origin; z is scaled like x, since
+    MediaPipe expresses depth in units of the image width.
+    """
+    x0, y0, x1, y1 = roi
+    crop_w, crop_h = x1 - x0, y1 - y0
+    points = np.array(points, dtype=np.float32)
+    points[..., 0] = (points[..., 0] * crop_w + x0) / frame_w
+    points[..., 1] = (points[..., 1] * crop_h + y0) / frame_h
+    points[..., 2] = points[..., 2] * crop_w / frame_w
+    return points
+
+
+class RoiFaceMesh:
+    """Two-stage landmark extraction for high-resolution frames.
+
+    Faces are detected on a copy of the frame downscaled to `detect_width`,
+    then FaceMesh runs only on padded full-resolution crops around each
+    face. Landmarks come back in full-frame normalised coordinates, so
+    embeddings and overlays are computed exactly as for a full-frame pass.
+    Only the small copy and the crops are converted to RGB.
+    """
+
+    def __init__(self, detect_width=640, padding=0.25, max_num_faces=4,
+                 min_detection_confidence=0.5, detector=None, mesh=None):
+        self.detect_width = detect_width
+        self.padding = padding
+        self.max_num_faces = max_num_faces
+        self.detector = detector or FaceDetectionSession(
+            model_selection=0, min_detection_confidence=min_detection_confidence
+        )
+        # Each crop is a new image with one face in it
+        self.mesh = mesh or FaceMeshSession(
+            static_image_mode=True, max_num_faces=1, refine_landmarks=True,
+            min_detection_confidence=min_detection_confidence
+        )
+
+    def detect(self, img_bgr):
+        """Pixel ROIs of the faces in a BGR frame, found at detection resolution"""
+        # OpenCV loads on first use, so importing this module needs only NumPy
+        import cv2
+        h, w = img_bgr.shape[:2]
+        scale = min(1.0, self.detect_width / w)
+        small = img_bgr
+        if scale < 1.0:
+            small = cv2.resize(img_bgr, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_LINEAR)
+        results = self.detector.process(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+        boxes = detections_to_boxes(results.detections)[:self.max_num_faces]
+        return roi_boxes(boxes, w, h, self.padding)
+
+    def process(self, img_bgr):
+        """(N_faces, NUM_LANDMARKS, 3) full-frame landmarks for a BGR frame"""
+        import cv2
+        h, w = img_bgr.shape[:2]
+        faces = []
+        for roi in self.detect(img_bgr):
+            x0, y0, x1, y1 = roi
+            crop = cv2.cvtColor(img_bgr[y0:y1, x0:x1], cv2.COLOR_BGR2RGB)
+            points = results_to_array(self.mesh.process(crop))
+            if len(points):
+                faces.append(crop_landmarks_to_frame(points[:1], roi, w, h))
+        if not faces:
+            return np.zeros((0, NUM_LANDMARKS, 3), dtype=np.float32)
+        return np.concatenate(faces)
+
+    def close(self):
+        self.detector.close()
+        self.mesh.close()
@@ -0,0 +1,19 @@
+from datetime import datetime, timezone
+
+
+def utc_now():
+    """Current time as a naive UTC datetime: the one clock every attendance writer uses.
+
+    Records are stored as naive UTC ISO strings (as the API and the old
+    attendance.json always did), so they sort and compare as text.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def to_utc(value):
+    """Naive UTC datetime for `value` (a datetime or ISO string); naive input is taken as UTC already"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
@@ -0,0 +1,108 @@
+import itertools
+import time
+
+import numpy as np
+
+
+def box_iou(a, b):
+    """IoU of every box in `a` (N, 4) against every box in `b` (M, 4), as (N, M)"""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+class Track:
+    """One face followed across frames, with the identity it was last matched to"""
+
+    def __init__(self, track_id, box):
+        self.id = track_id
+        self.box = np.asarray(box, dtype=np.float32)
+        self.missed = 0
+        self.identity = None
+        self.score = None
+        self.matched_box = None
+        self.matched_at = None
+
+    def needs_match(self, now, refresh_interval, drift_iou):
+        """True if the cached identity can't be reused for the current box"""
+        if self.identity is None:
+            return True
+        if now - self.matched_at >= refresh_interval:
+            return True
+        return box_iou(self.box, self.matched_box)[0, 0] < drift_iou
+
+
+class FaceTracker:
+    """Assigns stable track ids to faces by IoU of their landmark bounding boxes.
+
+    Each track caches the identity and score from its last gallery match.
+    Callers re-match only the tracks returned by pending(): new faces,
+    faces that moved away from where they were matched (IoU with the
+    matched box below `drift_iou`), and identities older than
+    `refresh_interval` seconds. Tracks not seen for `max_missed` frames
+    are dropped.
+    """
+
+    def __init__(self, iou_threshold=0.3, drift_iou=0.5, refresh_interval=5.0, max_missed=5):
+        self.iou_threshold = iou_threshold
+        self.drift_iou = drift_iou
+        self.refresh_interval = refresh_interval
+        self.max_missed = max_missed
+        self.tracks = []
+        self._ids = itertools.count(1)
+
+    def update(self, boxes):
+        """Associate this frame's boxes with tracks; returns one Track per box"""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        assigned = [None] * len(boxes)
+        unmatched = set(range(len(self.tracks)))
+
+        if self.tracks and len(boxes):
+            ious = box_iou([t.box for t in self.tracks], boxes)
+            # Greedy: best overlapping pairs first
+            for flat in np.argsort(-ious, axis=None):
+                t, b = divmod(int(flat), len(boxes))
+                if ious[t, b] < self.iou_threshold:
+                    break
+                if t in unmatched and assigned[b] is None:
+                    unmatched.discard(t)
+                    assigned[b] = self.tracks[t]
+
+        for t in unmatched:
+            self.tracks[t].missed += 1
+        for b, track in enumerate(assigned):
+            if track is None:
+                track = Track(next(self._ids), boxes[b])
+                self.tracks.append(track)
+                assigned[b] = track
+            track.box = boxes[b]
+            track.missed = 0
+
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+        return assigned
+
+    def pending(self, tracks, now=None):
+        """Indices of `tracks` whose identity has to be (re)computed"""
+        now = time.monotonic() if now is None else now
+        return [i for i, track in enumerate(tracks)
+                if track.needs_match(now, self.refresh_interval, self.drift_iou)]
+
+    def assign(self, track, identity, score, now=None):
+        """Cache a match result on `track`"""
+        track.identity = identity
+        track.score = score
+        track.matched_box = track.box.copy()
+        track.matched_at = time.monotonic() if now is None else now
+
+    def forget_identities(self):
+        """Force every track to be re-matched (e.g. after the gallery changed)"""
+        for track in self.tracks:
+            track.identity = None
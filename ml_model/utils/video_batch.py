@@ -0,0 +1,162 @@
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from .enrollment import IMAGE_EXTENSIONS
+from .face_mesh import FaceMeshSession
+from .gallery import EmbeddingGallery
+from .gallery_store import GalleryStore
+from .landmarks import compute_embeddings, results_to_array
+from .last_seen import LastSeenIndex
+from .timestamps import to_utc
+
+# Frame rate assumed for a directory of frames unless given
+DEFAULT_FPS = 25.0
+
+# Per-process state, set up once by _init_worker
+_worker = {}
+
+
+def list_frames(directory):
+    """Image files of a frame directory, in name order"""
+    return sorted(p for p in Path(directory).iterdir()
+                  if p.is_file() and p.suffix.lower() in IMAGE_EXTENSIONS)
+
+
+def probe_source(source, fps=None):
+    """(frame count, frames per second) of a video file or frame directory"""
+    if os.path.isdir(source):
+        return len(list_frames(source)), fps or DEFAULT_FPS
+    import cv2
+    cap = cv2.VideoCapture(str(source))
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video {source}")
+    count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    rate = fps or cap.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+    cap.release()
+    return count, rate
+
+
+def plan_segments(sources, stride=5, segment_seconds=60, fps=None):
+    """Split sources into (source, first frame, end frame, fps) jobs of about `segment_seconds`.
+
+    Segment boundaries are multiples of `stride`, so the sampled frames
+    are the same however the work is split.
+    """
+    segments = []
+    for source in sources:
+        count, rate = probe_source(source, fps)
+        length = max(stride, int(round(segment_seconds * rate / stride)) * stride)
+        segments.extend((str(source), start, min(start + length, count), rate)
+                        for start in range(0, count, length))
+    return segments
+
+
+def read_frames(source, start, stop, stride=1):
+    """Yield (frame index, BGR frame) for every `stride`-th frame in [start, stop)"""
+    import cv2
+    if os.path.isdir(source):
+        frames = list_frames(source)
+        for index in range(start, stop, stride):
+            frame = cv2.imread(str(frames[index]))
+            if frame is not None:
+                yield index, frame
+        return
+    cap = cv2.VideoCapture(str(source))
+    try:
+        if start:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        for index in range(start, stop):
+            if (index - start) % stride:
+                # Skipped frames are only demuxed, not converted
+                if not cap.grab():
+                    break
+                continue
+            ok, frame = cap.read()
+            if not ok:
+                break
+            yield index, frame
+    finally:
+        cap.release()
+
+
+def face_mesh_landmarks(frame_bgr):
+    """(N_faces, 478, 3) landmarks of a BGR frame with this process's FaceMesh graph"""
+    import cv2
+    session = _worker.get('mesh')
+    if session is None:
+        # Sampled frames are far apart, so every frame is a fresh detection
+        session = _worker['mesh'] = FaceMeshSession(
+            static_image_mode=True, max_num_faces=4, refine_landmarks=True, min_detection_confidence=0.5
+        )
+    return results_to_array(session.process(cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)))
+
+
+def _init_worker(embeddings_dir, precision='float32', landmarks=None):
+    store = GalleryStore(embeddings_dir)
+    options = {'precision': precision}
+    if precision != 'float32':
+        options['exact'] = store.rows
+    _worker['gallery'] = EmbeddingGallery.from_arrays(*store.load(), **options)
+    _worker['landmarks'] = landmarks or face_mesh_landmarks
+
+
+def process_segment(segment, stride, threshold):
+    """Recognised faces in one segment: [(source, media seconds, name, score)]"""
+    source, start, stop, fps = segment
+    gallery, landmarks = _worker['gallery'], _worker['landmarks']
+    sightings = []
+    for index, frame in read_frames(source, start, stop, stride):
+        points = landmarks(frame)
+        if not len(points) or not len(gallery):
+            continue
+        names, scores = gallery.match(compute_embeddings(points), k=1)
+        for name, score in zip(names[:, 0], scores[:, 0]):
+            if name is not None and score >= threshold:
+                sightings.append((source, index / fps, name, float(score)))
+    return sightings
+
+
+def scan_segments(segments, embeddings_dir, workers=1, stride=5, threshold=0.5,
+                  precision='float32', landmarks=None):
+    """Yield (segment, sightings) for every planned segment, in completion order.
+
+    Segments are spread over `workers` processes; each loads the gallery
+    and its FaceMesh graph once. `landmarks` (a module-level function from
+    a BGR frame to (N_faces, 478, 3) points) replaces FaceMesh.
+    """
+    if workers <= 1:
+        _init_worker(embeddings_dir, precision, landmarks)
+        for segment in segments:
+            yield segment, process_segment(segment, stride, threshold)
+        return
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(embeddings_dir, precision, landmarks)) as pool:
+        futures = {pool.submit(process_segment, segment, stride, threshold): segment for segment in segments}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def sightings_to_records(sightings, recording_start, window=None):
+    """Attendance records for one recording's sightings, deduplicated in media time.
+
+    `recording_start` (a datetime) is the wall-clock time of frame 0; each
+    record's timestamp is that plus the sighting's media offset, in UTC. A name is
+    logged again only after `window` seconds (default ATTENDANCE_DEDUP_SECONDS)
+    of media time, as for a live stream.
+    """
+    recording_start = to_utc(recording_start)
+    last_seen = LastSeenIndex(window)
+    records = []
+    for _, seconds, name, score in sorted(sightings, key=lambda s: (s[1], s[2])):
+        when = recording_start + timedelta(seconds=seconds)
+        if last_seen.should_log(name, when):
+            records.append({'name': name, 'confidence': round(score, 4), 'timestamp': when.isoformat()})
+    return records
+
+
+def recording_start(source, frame_count, fps):
+    """Best guess at when a recording began: its modification time minus its duration"""
+    modified = datetime.fromtimestamp(os.path.getmtime(source), timezone.utc)
+    return modified - timedelta(seconds=frame_count / fps)
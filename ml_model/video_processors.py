@@ -1,118 +1,154 @@
+import os
 import cv2
 import numpy as np
-import mediapipe as mp
 import av
-from datetime import datetime
 from streamlit_webrtc import VideoTransformerBase
-from .utils.helpers import load_embeddings, log_attendance, cosine_similarity
-
-# Mediapipe Setup
-mp_mesh = mp.solutions.face_mesh
-mp_drawing = mp.solutions.drawing_utils
-mp_drawing_styles = mp.solutions.drawing_styles
+from .utils.helpers import PROFILE_DIR, watch_gallery, get_attendance_writer
+from .utils.face_mesh import FaceMeshSession
+from .utils.landmarks import compute_embeddings, results_to_array
+from .utils.metrics import (
+    FRAME_SECONDS, FRAME_STAGE_SECONDS, FRAMES, FRAMES_DROPPED, MATCHES, RECOGNITIONS, StageTimer
+)
+from .utils.profiling import SessionProfiler
+from .utils.roi import RoiFaceMesh
+from .utils.tracker import FaceTracker
 
 class AttendanceVideoProcessor(VideoTransformerBase):
-    def __init__(self):
-        self.embeddings = load_embeddings()
+    def __init__(self, roi_detection=None):
+        # Enrolments made while the stream is open are picked up by polling
+        self.gallery_watcher = watch_gallery(interval=1.0)
         self.threshold = 0.5 # Adjusted threshold
-        self.last_log_time = {}
+        # Records are deduplicated and committed by a background writer, off the frame path
+        self.attendance_writer = get_attendance_writer()
+        # Faces keep their identity between frames and are only re-matched
+        # when new, moved, or not matched for a few seconds
+        self.tracker = FaceTracker(iou_threshold=0.3, drift_iou=0.5, refresh_interval=5.0)
+        # One FaceMesh graph for the lifetime of the stream, so tracking mode
+        # can carry landmarks from frame to frame
+        self.face_mesh = FaceMeshSession(
+            static_image_mode=False,
+            refine_landmarks=True,
+            max_num_faces=4,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+        # Opt-in for high-resolution cameras: detect on a downscaled copy and
+        # run FaceMesh only on full-resolution crops around each face
+        if roi_detection is None:
+            roi_detection = os.environ.get('FACE_ROI_DETECTION', '0') == '1'
+        self.roi_mesh = RoiFaceMesh(detect_width=640, padding=0.25, max_num_faces=4) if roi_detection else None
+        # Off unless FACE_PROFILE is set or POST /api/admin/profile asks for a capture
+        self.profiler = SessionProfiler(PROFILE_DIR)
         
         # Debug: Print loaded embeddings
-        print(f"[DEBUG] Loaded {len(self.embeddings)} embeddings: {list(self.embeddings.keys())}")
+        print(f"[DEBUG] Loaded {len(self.gallery)} embeddings: {list(self.gallery.names)}")
+
+    @property
+    def gallery(self):
+        return self.gallery_watcher.gallery
 
     def transform(self, frame):
+        return self.profiler.run(self._transform, frame)
+
+    def _transform(self, frame):
+        # Per-stage timings go to the /metrics registry (a few microseconds per frame)
+        timer = StageTimer(FRAME_STAGE_SECONDS)
         img = frame.to_ndarray(format="bgr24")
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        timer.mark('decode')
         
-        with mp_mesh.FaceMesh(
-            static_image_mode=False,
-            refine_landmarks=True,
-            max_num_faces=4,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        ) as face_mesh:
-            results = face_mesh.process(img_rgb)
+        try:
+            if self.roi_mesh is not None:
+                points = self.roi_mesh.process(img)
+            else:
+                img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+                timer.mark('cvtColor')
+                points = results_to_array(self.face_mesh.process(img_rgb))
+            timer.mark('facemesh')
+        except Exception as e:
+            # The session rebuilds its graph on the next frame
+            print(f"FaceMesh error: {e}")
+            FRAMES_DROPPED.inc()
+            return av.VideoFrame.from_ndarray(img, format="bgr24")
+        
+        try:
+            if self.gallery_watcher.poll():
+                print(f"[DEBUG] Gallery updated: {len(self.gallery)} embeddings")
+                # New or removed enrolments can change who every face is
+                self.tracker.forget_identities()
+        except Exception as e:
+            print(f"Gallery reload error: {e}")
+        timer.mark('gallery_poll')
+        
+        # Bounding boxes of all faces in pixels
+        h, w, c = img.shape
+        xs = (points[:, :, 0] * w).astype(int)
+        ys = (points[:, :, 1] * h).astype(int)
+        boxes = np.stack((xs.min(axis=1), ys.min(axis=1), xs.max(axis=1), ys.max(axis=1)), axis=1)
+        
+        tracks = self.tracker.update(boxes)
+        pending = self.tracker.pending(tracks)
+        timer.mark('track')
+        if pending:
+            # Only new, moved or stale tracks are embedded and matched,
+            # in one matrix product
+            face_embs = compute_embeddings(points[pending])
+            timer.mark('embed')
+            names, sims = self.gallery.match(face_embs, k=1)
+            MATCHES.inc(len(pending))
+            timer.mark('match')
+            
+            for j, i in enumerate(pending):
+                best_name = "Person"  # Default to "Person" for any detected face
+                best_sim = -1
+                # An ANN index leaves the slot empty if no probed list had anyone
+                if sims.shape[1] and names[j, 0] is not None:
+                    best_name = names[j, 0]
+                    best_sim = float(sims[j, 0])
+                self.tracker.assign(tracks[i], best_name, best_sim)
+                
+                if best_sim >= self.threshold:
+                    RECOGNITIONS.inc()
+                    # Log attendance (False while within the dedup window)
+                    if self.attendance_writer.submit(best_name, best_sim):
+                        print(f"✓ RECOGNIZED: {best_name} (confidence: {best_sim:.3f})")
+                else:
+                    print(f"ℹ DETECTED: Face detected (best match: {best_sim:.3f}, threshold: {self.threshold})")
+            timer.mark('log_attendance')
+        
+        for i, track in enumerate(tracks):
+            best_name, best_sim = track.identity, track.score
+            
+            # Determine if recognized
+            is_recognized = best_sim >= self.threshold
+            
+            if is_recognized:
+                color = (0, 255, 0)  # Green for recognized
+            else:
+                color = (0, 165, 255)  # Orange for unrecognized
+                best_name = "Person"  # Show "Person" for unrecognized faces
+
+            # Draw bounding box
+            x_min, y_min, x_max, y_max = (int(v) for v in boxes[i])
+            cv2.rectangle(img, (x_min, y_min), (x_max, y_max), color, 2)
+            
+            # Display label with confidence
+            if is_recognized:
+                label = f"{best_name} ({best_sim:.2f})"
+            else:
+                label = "Person"
             
-            if results.multi_face_landmarks:
-                for landmarks in results.multi_face_landmarks:
-                    # Extract embedding logic
-                    raw = []
-                    for lm in landmarks.landmark:
-                        raw.extend([lm.x, lm.y, lm.z])
-                    raw = np.array(raw, dtype=np.float32)
-                    
-                    lm_list = landmarks.landmark
-                    def dist(i1, i2):
-                        p1 = lm_list[i1]
-                        p2 = lm_list[i2]
-                        return np.sqrt((p1.x - p2.x)**2 + (p1.y - p2.y)**2 + (p1.z - p2.z)**2)
-                    
-                    KP = { "leftEye": 33, "rightEye": 263, "nose": 1, "chin": 152, "leftMouth": 61, "rightMouth": 291 }
-                    derived = [
-                        dist(KP["leftEye"], KP["rightEye"]), dist(KP["leftEye"], KP["nose"]),
-                        dist(KP["rightEye"], KP["nose"]), dist(KP["nose"], KP["chin"]),
-                        dist(KP["leftMouth"], KP["rightMouth"]), dist(KP["leftEye"], KP["chin"]),
-                        dist(KP["rightEye"], KP["chin"])
-                    ]
-                    derived = np.array(derived, dtype=np.float32)
-                    
-                    raw_norm = np.linalg.norm(raw)
-                    if raw_norm > 0: raw = raw / raw_norm
-                    der_norm = np.linalg.norm(derived)
-                    if der_norm > 0: derived = derived / der_norm
-                    
-                    emb = np.concatenate((raw, derived))
-                    
-                    # Identify
-                    best_name = "Person"  # Default to "Person" for any detected face
-                    best_sim = -1
-                    
-                    if self.embeddings:
-                        for name, known_emb in self.embeddings.items():
-                            sim = cosine_similarity(emb, known_emb)
-                            if sim > best_sim:
-                                best_sim = sim
-                                best_name = name
-                    
-                    # Determine if recognized
-                    is_recognized = best_sim >= self.threshold
-                    
-                    if is_recognized:
-                        color = (0, 255, 0)  # Green for recognized
-                        # Log attendance
-                        now = datetime.now()
-                        last_time = self.last_log_time.get(best_name)
-                        if not last_time or (now - last_time).total_seconds() > 30:
-                            self.last_log_time[best_name] = now
-                            print(f"✓ RECOGNIZED: {best_name} (confidence: {best_sim:.3f})")
-                            try:
-                                log_attendance(best_name, best_sim)
-                            except Exception as e:
-                                print(f"Logging error: {e}")
-                    else:
-                        color = (0, 165, 255)  # Orange for unrecognized
-                        best_name = "Person"  # Show "Person" for unrecognized faces
-                        print(f"ℹ DETECTED: Face detected (best match: {best_sim:.3f}, threshold: {self.threshold})")
+            cv2.putText(img, label, (x_min, y_min - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+        timer.mark('draw')
 
-                    # Draw bounding box
-                    h, w, c = img.shape
-                    x_min, x_max = w, 0
-                    y_min, y_max = h, 0
-                    for lm in landmarks.landmark:
-                        x, y = int(lm.x * w), int(lm.y * h)
-                        if x < x_min: x_min = x
-                        if x > x_max: x_max = x
-                        if y < y_min: y_min = y
-                        if y > y_max: y_max = y
-                    
-                    cv2.rectangle(img, (x_min, y_min), (x_max, y_max), color, 2)
-                    
-                    # Display label with confidence
-                    if is_recognized:
-                        label = f"{best_name} ({best_sim:.2f})"
-                    else:
-                        label = "Person"
-                    
-                    cv2.putText(img, label, (x_min, y_min - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+        output = av.VideoFrame.from_ndarray(img, format="bgr24")
+        timer.mark('encode')
+        timer.finish(FRAME_SECONDS)
+        FRAMES.inc()
+        return output
 
-        return av.VideoFrame.from_ndarray(img, format="bgr24")
+    def on_ended(self):
+        """Called by streamlit-webrtc when the stream closes"""
+        self.face_mesh.close()
+        self.profiler.close()
+        if self.roi_mesh is not None:
+            self.roi_mesh.close()
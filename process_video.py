@@ -0,0 +1,97 @@
+"""
+Offline Attendance from Recorded Video
+
+Runs recognition over video files (or directories of frames) instead of a
+live camera: every --stride-th frame is decoded, its faces are embedded
+and matched against the enrolled gallery, and each recognised person is
+logged into the normal attendance store at the wall-clock time of the
+frame. Videos are cut into --segment-seconds pieces that are processed by
+a pool of --workers processes.
+
+Timestamps are the recording start plus the frame's media time. The
+start defaults to the file's modification time minus its duration, or can
+be given with --start when processing a single source. Repeat sightings
+within ATTENDANCE_DEDUP_SECONDS of media time are logged once, as live.
+
+Usage:
+    .venv311\Scripts\python.exe process_video.py lecture.mp4 [more.mp4 frames_dir/] [--workers N] [--stride 5]
+        [--start 2024-11-04T09:00:00] [--fps 25] [--dry-run]
+"""
+
+import argparse
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from ml_model.utils.attendance_store import db_path_for, open_attendance_store
+from ml_model.utils.gallery_store import open_gallery_store
+from ml_model.utils.landmarks import EMBEDDING_DIM
+from ml_model.utils.video_batch import plan_segments, probe_source, recording_start, scan_segments, sightings_to_records
+
+BASE_DIR = Path(__file__).parent
+ATTENDANCE_FILE = BASE_DIR / 'data' / 'attendance.json'
+EMBEDDINGS_DIR = BASE_DIR / 'web_app' / 'embeddings'
+
+def main():
+    parser = argparse.ArgumentParser(description="Log attendance from recorded video files or frame directories")
+    parser.add_argument('sources', nargs='+', help="video files or directories of frames")
+    parser.add_argument('--workers', type=int, default=1,
+                        help=f"worker processes (this machine has {os.cpu_count()} cores)")
+    parser.add_argument('--stride', type=int, default=5, help="process every Nth frame")
+    parser.add_argument('--segment-seconds', type=float, default=60, help="video length handed to a worker at a time")
+    parser.add_argument('--threshold', type=float, default=0.5, help="minimum similarity to count as recognised")
+    parser.add_argument('--fps', type=float, default=None, help="frame rate (frame directories; overrides video metadata)")
+    parser.add_argument('--start', default=None, help="ISO time of the first frame, local unless it has an offset (single source only)")
+    parser.add_argument('--precision', default='float32', choices=['float32', 'float16', 'int8'],
+                        help="in-memory gallery precision")
+    parser.add_argument('--dry-run', action='store_true', help="print the records instead of saving them")
+    args = parser.parse_args()
+
+    if args.start and len(args.sources) > 1:
+        parser.error("--start can only be used with a single source")
+    start_time = datetime.fromisoformat(args.start).astimezone() if args.start else None
+
+    # Make sure the binary gallery exists before the workers open it
+    gallery = open_gallery_store(str(EMBEDDINGS_DIR), dim=EMBEDDING_DIM)
+    enrolled = len(gallery.read_index()['names'])
+    if not enrolled:
+        print(f"ERROR: No enrolled faces in {EMBEDDINGS_DIR}")
+        return
+
+    segments = plan_segments(args.sources, args.stride, args.segment_seconds, args.fps)
+    frames = sum(stop - first for _, first, stop, _ in segments)
+    duration = sum((stop - first) / fps for _, first, stop, fps in segments)
+    print(f"{len(args.sources)} source(s), {duration / 60:.1f} min of video, {frames} frames "
+          f"({frames // args.stride} sampled); {enrolled} enrolled people; {args.workers} worker(s)")
+
+    begin = time.perf_counter()
+    sightings = defaultdict(list)
+    for done, (segment, found) in enumerate(scan_segments(
+            segments, str(EMBEDDINGS_DIR), workers=args.workers, stride=args.stride,
+            threshold=args.threshold, precision=args.precision), 1):
+        sightings[segment[0]].extend(found)
+        print(f"  [{done}/{len(segments)}] {Path(segment[0]).name} "
+              f"{segment[1] / segment[3]:.0f}s-{segment[2] / segment[3]:.0f}s: {len(found)} sightings")
+    elapsed = time.perf_counter() - begin
+
+    records = []
+    for source in args.sources:
+        count, fps = probe_source(source, args.fps)
+        started = start_time or recording_start(source, count, fps)
+        records.extend(sightings_to_records(sightings[str(source)], started))
+
+    print()
+    if args.dry_run:
+        for record in records:
+            print(f"  {record['timestamp']}  {record['name']}  ({record['confidence']:.3f})")
+    else:
+        store = open_attendance_store(db_path_for(str(ATTENDANCE_FILE)), legacy_json=str(ATTENDANCE_FILE))
+        store.add_many(records)
+    names = sorted({record['name'] for record in records})
+    print(f"{'Would log' if args.dry_run else 'Logged'} {len(records)} records for {len(names)} people: {', '.join(names)}")
+    print(f"Processed {duration / 60:.1f} min of video in {elapsed:.1f}s ({duration / max(elapsed, 1e-9):.1f}x real time)")
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ import os
 import json
 import pandas as pd
 import sys
+import time
 
 # Try to import critical dependencies
 try:
@@ -40,7 +41,8 @@ try:
     from ml_model.utils.helpers import (
         load_embeddings, 
         save_embedding, 
-        ATTENDANCE_FILE, 
+        get_attendance_store,
+        ensure_data_dirs,
         EMBEDDINGS_DIR
     )
     # We don't import extract_embedding here to avoid double import error if it fails inside
@@ -49,6 +51,8 @@ try:
     # We can't import extract_embedding_from_file easily because it has a top-level import of mediapipe
     # which might fail if we didn't catch it above. But since we caught it above, it should be safe now.
     from ml_model.utils.extract_embedding import get_embedding as extract_embedding_from_file
+    from ml_model.utils.landmarks import embed_results
+    from ml_model.utils import metrics
 
 except ImportError as e:
     st.error(f"Failed to import local modules: {e}")
@@ -66,41 +70,54 @@ def extract_embedding_registration(image):
         if not results.multi_face_landmarks:
             return None
         
-        landmarks = results.multi_face_landmarks[0].landmark
-        
-        # 1. Raw
-        raw = []
-        for lm in landmarks:
-            raw.extend([lm.x, lm.y, lm.z])
-        raw = np.array(raw, dtype=np.float32)
-        
-        # 2. Derived
-        def dist(i1, i2):
-            p1 = landmarks[i1]
-            p2 = landmarks[i2]
-            return np.sqrt((p1.x - p2.x)**2 + (p1.y - p2.y)**2 + (p1.z - p2.z)**2)
-            
-        KP = { "leftEye": 33, "rightEye": 263, "nose": 1, "chin": 152, "leftMouth": 61, "rightMouth": 291 }
-        derived = [
-            dist(KP["leftEye"], KP["rightEye"]), dist(KP["leftEye"], KP["nose"]),
-            dist(KP["rightEye"], KP["nose"]), dist(KP["nose"], KP["chin"]),
-            dist(KP["leftMouth"], KP["rightMouth"]), dist(KP["leftEye"], KP["chin"]),
-            dist(KP["rightEye"], KP["chin"])
-        ]
-        derived = np.array(derived, dtype=np.float32)
-        
-        # 3. Norm
-        raw_norm = np.linalg.norm(raw)
-        if raw_norm > 0: raw = raw / raw_norm
-        der_norm = np.linalg.norm(derived)
-        if der_norm > 0: derived = derived / der_norm
-        
-        return np.concatenate((raw, derived))
+        return embed_results(results)[0]
+
+
+def show_metrics_panel():
+    """Debug view of the video pipeline timings (the same numbers the Flask /metrics route exports)"""
+    now = time.monotonic()
+    matches = metrics.MATCHES.get()
+    frames = metrics.FRAMES.get()
+    previous = st.session_state.get('metrics_sample')
+    st.session_state['metrics_sample'] = (now, matches, frames)
+
+    frame = metrics.FRAME_SECONDS.summary()
+    cols = st.columns(4)
+    cols[0].metric("Frames", frames, help="Frames processed since the app started")
+    cols[1].metric("Dropped", metrics.FRAMES_DROPPED.get(), help="Frames returned without recognition after a FaceMesh error")
+    cols[2].metric("Frame p95", f"{frame['p95'] * 1000:.1f} ms")
+    if previous and now > previous[0]:
+        cols[3].metric("Matches/s", f"{(matches - previous[1]) / (now - previous[0]):.1f}",
+                       help="Since the previous refresh")
+    else:
+        cols[3].metric("Matches", matches)
+
+    rows = []
+    for (stage,) in sorted(metrics.FRAME_STAGE_SECONDS.values()):
+        summary = metrics.FRAME_STAGE_SECONDS.summary(stage=stage)
+        rows.append({
+            'stage': stage,
+            'frames': summary['count'],
+            'mean ms': round(summary['mean'] * 1000, 2),
+            'p50 ms': round(summary['p50'] * 1000, 2),
+            'p95 ms': round(summary['p95'] * 1000, 2),
+            'share of frame time': f"{summary['sum'] / frame['sum']:.0%}" if frame['sum'] else '-',
+        })
+    if rows:
+        st.dataframe(pd.DataFrame(rows), hide_index=True)
+    else:
+        st.info("No frames processed yet. Start the camera above.")
+    if st.checkbox("Show Prometheus text"):
+        st.code(metrics.REGISTRY.render(), language=None)
+    st.button("Refresh metrics")
 
 
 # Set page config
 st.set_page_config(page_title="Face Attendance System", layout="wide", page_icon="📸")
 
+# Data directories are created here, at startup, rather than when helpers is imported
+ensure_data_dirs()
+
 # --- UI Layout ---
 
 st.sidebar.title("Navigation")
@@ -116,6 +133,9 @@ if page == "Home (Attendance)":
         video_processor_factory=AttendanceVideoProcessor, 
         rtc_configuration={"iceServers": [{"urls": ["stun:stun.l.google.com:19302"]}]}
     )
+    
+    with st.expander("Performance metrics (debug)"):
+        show_metrics_panel()
 
 elif page == "Register Face":
     st.title("👤 Register New Face")
@@ -141,26 +161,21 @@ elif page == "Register Face":
 elif page == "View Logs":
     st.title("📊 Attendance Logs")
     
-    if os.path.exists(ATTENDANCE_FILE):
-        with open(ATTENDANCE_FILE, 'r') as f:
-            data = json.load(f)
+    records = get_attendance_store().query()
+    
+    if records:
+        df = pd.DataFrame(records)
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df = df.sort_values('timestamp', ascending=False)
         
-        if data['records']:
-            df = pd.DataFrame(data['records'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            df = df.sort_values('timestamp', ascending=False)
-            
-            st.dataframe(df)
+        st.dataframe(df)
+        
+        if st.button("Refresh Logs"):
+            st.rerun()
             
-            if st.button("Refresh Logs"):
-                st.rerun()
-                
-            if st.button("Clear Logs"):
-                with open(ATTENDANCE_FILE, 'w') as f:
-                    json.dump({'records': [], 'next_id': 1}, f, indent=2)
-                st.success("Logs cleared!")
-                st.rerun()
-        else:
-            st.info("No attendance records found.")
+        if st.button("Clear Logs"):
+            get_attendance_store().clear()
+            st.success("Logs cleared!")
+            st.rerun()
     else:
-        st.info("Attendance file not found.")
+        st.info("No attendance records found.")
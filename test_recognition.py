@@ -20,7 +20,8 @@ from pathlib import Path
 # Add ml_model to path for imports
 sys.path.insert(0, str(Path(__file__).parent / 'ml_model'))
 
-from utils.helpers import load_embeddings, cosine_similarity
+from utils.helpers import load_embeddings
+from utils.gallery import EmbeddingGallery
 from utils.extract_embedding import get_embedding
 
 def test_recognition():
@@ -40,6 +41,7 @@ def test_recognition():
     print(f"   ✓ Loaded {len(embeddings)} embeddings:")
     for name in embeddings.keys():
         print(f"     - {name}")
+    gallery = EmbeddingGallery.from_embeddings(embeddings)
     
     # Test with sample images
     print("\n2. Testing with sample images...")
@@ -75,14 +77,9 @@ def test_recognition():
             continue
         
         # Compare with all embeddings
-        best_match = None
-        best_sim = -1
-        
-        for name, known_emb in embeddings.items():
-            sim = cosine_similarity(test_emb, known_emb)
-            if sim > best_sim:
-                best_sim = sim
-                best_match = name
+        names, sims = gallery.match(test_emb, k=1)
+        best_match = names[0, 0]
+        best_sim = float(sims[0, 0])
         
         # Check result
         is_correct = best_match == person_name
@@ -1,164 +1,129 @@
-"""
+r"""
 Train Face Recognition Embeddings
 
 This script processes all images in ml_model/data/ and generates embeddings
 for face recognition. It saves the embeddings to web_app/embeddings/.
 
+Re-runs are incremental: web_app/embeddings/enrollment_manifest.json records
+every image already processed, so only new or changed images are extracted
+and only the people they belong to are re-averaged. --full ignores it.
+
 Usage:
-    .venv311\Scripts\python.exe train_embeddings.py
+    .venv311\Scripts\python.exe train_embeddings.py [--workers N] [--chunksize 8] [--full]
 """
 
+import argparse
 import os
-import cv2
-import numpy as np
-import json
-import mediapipe as mp
-from datetime import datetime
+import time
 from pathlib import Path
 
+import numpy as np
+
+from ml_model.utils.ann import sync_ann_index
+from ml_model.utils.enrollment import list_person_images, train_people
+from ml_model.utils.enrollment_manifest import EnrollmentManifest
+from ml_model.utils.gallery_store import open_gallery_store, remove_legacy_json
+from ml_model.utils.landmarks import EMBEDDING_DIM
+from ml_model.utils.timestamps import utc_now
+
 # Setup paths
 BASE_DIR = Path(__file__).parent
 DATA_DIR = BASE_DIR / 'ml_model' / 'data'
 EMBEDDINGS_DIR = BASE_DIR / 'web_app' / 'embeddings'
 
-# Ensure output directory exists
-EMBEDDINGS_DIR.mkdir(parents=True, exist_ok=True)
-
-# MediaPipe setup
-mp_mesh = mp.solutions.face_mesh
-
-def extract_embedding(image_path):
-    """Extract face embedding from an image file."""
-    img = cv2.imread(str(image_path))
-    if img is None:
-        return None
-    
-    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    
-    with mp_mesh.FaceMesh(
-        static_image_mode=True,
-        refine_landmarks=True,
-        max_num_faces=1,
-        min_detection_confidence=0.5
-    ) as face_mesh:
-        results = face_mesh.process(img_rgb)
-        
-        if not results.multi_face_landmarks:
-            return None
-        
-        landmarks = results.multi_face_landmarks[0].landmark
-        
-        # 1. Raw landmarks
-        raw = []
-        for lm in landmarks:
-            raw.extend([lm.x, lm.y, lm.z])
-        raw = np.array(raw, dtype=np.float32)
-        
-        # 2. Derived features (distances between key points)
-        def dist(i1, i2):
-            p1 = landmarks[i1]
-            p2 = landmarks[i2]
-            return np.sqrt((p1.x - p2.x)**2 + (p1.y - p2.y)**2 + (p1.z - p2.z)**2)
-        
-        KP = {"leftEye": 33, "rightEye": 263, "nose": 1, "chin": 152, "leftMouth": 61, "rightMouth": 291}
-        derived = [
-            dist(KP["leftEye"], KP["rightEye"]), dist(KP["leftEye"], KP["nose"]),
-            dist(KP["rightEye"], KP["nose"]), dist(KP["nose"], KP["chin"]),
-            dist(KP["leftMouth"], KP["rightMouth"]), dist(KP["leftEye"], KP["chin"]),
-            dist(KP["rightEye"], KP["chin"])
-        ]
-        derived = np.array(derived, dtype=np.float32)
-        
-        # 3. Normalize
-        raw_norm = np.linalg.norm(raw)
-        if raw_norm > 0:
-            raw = raw / raw_norm
-        der_norm = np.linalg.norm(derived)
-        if der_norm > 0:
-            derived = derived / der_norm
-        
-        return np.concatenate((raw, derived))
-
-def train_person(person_name, person_dir):
-    """Train embeddings for a single person from their image directory."""
-    image_files = []
-    for ext in ['*.jpg', '*.jpeg', '*.png', '*.JPG', '*.JPEG', '*.PNG']:
-        image_files.extend(person_dir.glob(ext))
-    
-    if not image_files:
-        print(f"  ⚠ No images found for {person_name}")
-        return None
-    
-    print(f"  Processing {len(image_files)} images...")
-    
-    embeddings = []
-    for img_path in image_files:
-        emb = extract_embedding(img_path)
-        if emb is not None:
-            embeddings.append(emb)
-            print(f"    ✓ {img_path.name}")
-        else:
-            print(f"    ✗ {img_path.name} (no face detected)")
-    
-    if not embeddings:
-        print(f"  ⚠ No valid faces found for {person_name}")
-        return None
-    
-    # Average all embeddings
-    avg_embedding = np.mean(embeddings, axis=0)
-    
-    # Save to JSON
-    output_file = EMBEDDINGS_DIR / f"{person_name}_embedding.json"
-    data = {
-        "name": person_name,
-        "embedding": avg_embedding.tolist(),
-        "saved_at": datetime.utcnow().isoformat(),
-        "num_images": len(embeddings)
-    }
-    
-    with open(output_file, 'w') as f:
-        json.dump(data, f, indent=2)
-    
-    print(f"  ✓ Saved embedding from {len(embeddings)} images to {output_file.name}")
-    return avg_embedding
+def save_people(store, trained, removed):
+    """Apply a run to the binary gallery: {name: (average, images used)} and names to drop.
+
+    Everyone trained goes in with one merge (one rewrite of the matrix and
+    names index, not one per person), all under one gallery lock, so the
+    recognisers see the whole run at once.
+    """
+    with store.lock():
+        if trained:
+            names = list(trained)
+            saved_at = utc_now().isoformat()
+            store.merge(names, np.stack([trained[name][0] for name in names]),
+                        {name: {'saved_at': saved_at, 'num_images': trained[name][1]} for name in names})
+        for name in removed:
+            store.remove(name)
+            print(f"  ✗ {name}: no usable images left, removed")
+        for name in list(trained) + list(removed):
+            remove_legacy_json(store.directory, name)
+        # One update of the saved ANN index for the whole run
+        sync_ann_index(store)
 
 def main():
+    parser = argparse.ArgumentParser(description="Train face embeddings from ml_model/data/<person>/ images")
+    parser.add_argument('--workers', type=int, default=1,
+                        help=f"worker processes for face extraction (this machine has {os.cpu_count()} cores)")
+    parser.add_argument('--chunksize', type=int, default=8, help="images handed to a worker at a time")
+    parser.add_argument('--full', action='store_true', help="ignore the manifest and re-extract every image")
+    args = parser.parse_args()
+
     print("="*60)
     print("Face Recognition Training Script")
     print("="*60)
     print(f"Data directory: {DATA_DIR}")
     print(f"Output directory: {EMBEDDINGS_DIR}")
     print()
-    
+
     if not DATA_DIR.exists():
         print(f"ERROR: Data directory not found: {DATA_DIR}")
         return
-    
+
+    # Ensure output directory exists
+    EMBEDDINGS_DIR.mkdir(parents=True, exist_ok=True)
+
     # Find all person directories
-    person_dirs = [d for d in DATA_DIR.iterdir() if d.is_dir()]
-    
+    person_dirs = sorted(d for d in DATA_DIR.iterdir() if d.is_dir())
+
     if not person_dirs:
         print(f"ERROR: No person directories found in {DATA_DIR}")
         return
-    
-    print(f"Found {len(person_dirs)} people to train:")
-    for d in person_dirs:
-        print(f"  - {d.name}")
+
+    people = {d.name: list_person_images(d) for d in person_dirs}
+    total_images = sum(len(paths) for paths in people.values())
+    print(f"Found {len(person_dirs)} people ({total_images} images)")
+
+    # Work out which images and people actually changed since the last run
+    start = time.perf_counter()
+    manifest = EnrollmentManifest(EMBEDDINGS_DIR, DATA_DIR)
+    if args.full:
+        manifest.reset()
+    entries, todo, affected = manifest.scan(people)
+    store = open_gallery_store(str(EMBEDDINGS_DIR), dim=EMBEDDING_DIM)
+    trained = set(store.read_index()['names'])
+    affected |= {name for name in people if name not in trained}
+    to_train = {name: people[name] for name in sorted(affected) if name in people}
+    removed = sorted(name for name in affected if name not in people)
+    print(f"{len(todo)} new or changed images; {len(to_train)} people to update, {len(removed)} to remove")
+    print()
+
+    # Unchanged images of the affected people come from the cache
+    cache = manifest.load_embeddings(entries, [p for paths in to_train.values() for p in paths])
+    if todo:
+        print(f"Extracting faces with {args.workers} worker(s)...")
+
+    # Results are collected and written to the gallery in one go at the end
+    results = {}
+    for person_name, avg_embedding, num_images in train_people(to_train, args.workers, args.chunksize, cache=cache):
+        if avg_embedding is None:
+            print(f"  ⚠ No valid faces found for {person_name}")
+            # Their old embedding would otherwise keep matching
+            if person_name in trained:
+                removed.append(person_name)
+            continue
+        results[person_name] = (avg_embedding, num_images)
+        print(f"  ✓ {person_name}: averaged {num_images} images")
+    trained_count = len(results)
+
+    save_people(store, results, removed)
+    manifest.save(entries, {path: cache[path] for path in todo if path in cache})
+    elapsed = time.perf_counter() - start
     print()
-    
-    # Train each person
-    trained_count = 0
-    for person_dir in person_dirs:
-        person_name = person_dir.name
-        print(f"Training: {person_name}")
-        
-        result = train_person(person_name, person_dir)
-        if result is not None:
-            trained_count += 1
-        print()
-    
     print("="*60)
-    print(f"Training complete! Successfully trained {trained_count}/{len(person_dirs)} people.")
+    print(f"Training complete! Successfully trained {trained_count}/{len(to_train)} updated people.")
+    print(f"Extracted {len(todo)} of {total_images} images in {elapsed:.1f}s")
     print("="*60)
 
 if __name__ == "__main__":
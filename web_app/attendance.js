@@ -1,5 +1,8 @@
 const API_BASE = 'http://localhost:5000';
+const PAGE_SIZE = 100;
 let allRecords = [];
+let nextCursor = null;
+let totalRecords = 0;
 
 // DOM Elements
 const tableBody = document.getElementById('tableBody');
@@ -8,6 +11,7 @@ const filterDateInput = document.getElementById('filterDate');
 const filterBtn = document.getElementById('filterBtn');
 const resetBtn = document.getElementById('resetBtn');
 const exportBtn = document.getElementById('exportBtn');
+const loadMoreBtn = document.getElementById('loadMoreBtn');
 const statusMessage = document.getElementById('statusMessage');
 const recordCount = document.getElementById('recordCount');
 
@@ -20,18 +24,38 @@ document.addEventListener('DOMContentLoaded', () => {
 filterBtn.addEventListener('click', applyFilters);
 resetBtn.addEventListener('click', resetFilters);
 exportBtn.addEventListener('click', exportToCSV);
+loadMoreBtn.addEventListener('click', loadMoreRecords);
+
+// Query string for the current filters; the server does the filtering
+function filterParams() {
+    const params = new URLSearchParams();
+    const name = filterNameInput.value.trim();
+    const date = filterDateInput.value;
+    if (name) params.set('name', name);
+    if (date) params.set('date', date);
+    return params;
+}
+
+async function fetchPage(cursor) {
+    const params = filterParams();
+    params.set('limit', PAGE_SIZE);
+    if (cursor) params.set('cursor', cursor);
+    
+    const response = await fetch(`${API_BASE}/api/attendance?${params}`);
+    if (!response.ok) {
+        throw new Error('Failed to fetch attendance records');
+    }
+    return response.json();
+}
 
 async function loadAttendanceRecords() {
     try {
-        const response = await fetch(`${API_BASE}/api/attendance`);
-        
-        if (!response.ok) {
-            throw new Error('Failed to fetch attendance records');
-        }
-        
-        allRecords = await response.json();
+        const page = await fetchPage(null);
+        allRecords = page.records;
+        nextCursor = page.next_cursor;
+        totalRecords = page.total;
         displayRecords(allRecords);
-        updateRecordCount(allRecords.length);
+        updateRecordCount(totalRecords);
     } catch (error) {
         console.error('Error loading records:', error);
         showStatus('Error loading attendance records: ' + error.message, 'error');
@@ -45,6 +69,23 @@ async function loadAttendanceRecords() {
     }
 }
 
+async function loadMoreRecords() {
+    if (!nextCursor) {
+        return;
+    }
+    try {
+        const page = await fetchPage(nextCursor);
+        allRecords = allRecords.concat(page.records);
+        nextCursor = page.next_cursor;
+        totalRecords = page.total;
+        displayRecords(allRecords);
+        updateRecordCount(totalRecords);
+    } catch (error) {
+        console.error('Error loading records:', error);
+        showStatus('Error loading attendance records: ' + error.message, 'error');
+    }
+}
+
 function displayRecords(records) {
     if (records.length === 0) {
         tableBody.innerHTML = `
@@ -92,35 +133,15 @@ function calculateDuration(startTime, endTime) {
     }
 }
 
-function applyFilters() {
-    const name = filterNameInput.value.trim();
-    const date = filterDateInput.value;
-    
-    let filtered = allRecords;
-    
-    if (name) {
-        filtered = filtered.filter(record => 
-            record.name.toLowerCase().includes(name.toLowerCase())
-        );
-    }
-    
-    if (date) {
-        filtered = filtered.filter(record => {
-            const recordDate = record.timestamp.split('T')[0];
-            return recordDate === date;
-        });
-    }
-    
-    displayRecords(filtered);
-    updateRecordCount(filtered.length);
-    showStatus(`Showing ${filtered.length} record(s)`, 'success');
+async function applyFilters() {
+    await loadAttendanceRecords();
+    showStatus(`Showing ${totalRecords} record(s)`, 'success');
 }
 
-function resetFilters() {
+async function resetFilters() {
     filterNameInput.value = '';
     filterDateInput.value = '';
-    displayRecords(allRecords);
-    updateRecordCount(allRecords.length);
+    await loadAttendanceRecords();
     showStatus('Filters reset', 'success');
 }
 
@@ -146,14 +167,29 @@ async function deleteRecord(recordId) {
     }
 }
 
-function exportToCSV() {
-    if (allRecords.length === 0) {
+async function exportToCSV() {
+    // Export every matching record, not just the pages loaded so far
+    let records = [];
+    try {
+        let cursor = null;
+        do {
+            const page = await fetchPage(cursor);
+            records = records.concat(page.records);
+            cursor = page.next_cursor;
+        } while (cursor);
+    } catch (error) {
+        console.error('Error exporting records:', error);
+        showStatus('Error exporting records: ' + error.message, 'error');
+        return;
+    }
+    
+    if (records.length === 0) {
         showStatus('No records to export', 'error');
         return;
     }
     
     const headers = ['Person Name', 'Timestamp', 'Confidence (%)'];
-    const rows = allRecords.map(record => [
+    const rows = records.map(record => [
         record.name,
         formatDateTime(record.timestamp),
         (record.confidence * 100).toFixed(2)
@@ -191,6 +227,7 @@ function formatDateTime(isoString) {
 
 function updateRecordCount(count) {
     recordCount.textContent = count;
+    loadMoreBtn.style.display = nextCursor ? 'inline-block' : 'none';
 }
 
 function showStatus(message, type) {
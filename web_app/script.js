@@ -28,42 +28,37 @@ function resizeCanvas() {
 window.addEventListener('resize', resizeCanvas);
 resizeCanvas();
 
+// Unpack GET /api/gallery: uint32 header length, JSON header, float32 rows
+function parseGallery(buffer) {
+  const headerLength = new DataView(buffer).getUint32(0, true);
+  const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)));
+  const rows = new Float32Array(buffer, 4 + headerLength, header.names.length * header.dim);
+  const gallery = {};
+  header.names.forEach((name, i) => {
+    gallery[name] = rows.subarray(i * header.dim, (i + 1) * header.dim);
+  });
+  return { gallery, generation: header.generation };
+}
+
+let galleryGeneration = null;
+
 // Load embeddings from API
 async function loadEmbeddings() {
   try {
-    const res = await fetch(`${API_BASE}/api/embeddings`);
+    // One request for the whole gallery; the browser revalidates its cached
+    // copy with the ETag, so an unchanged gallery costs a 304
+    const res = await fetch(`${API_BASE}/api/gallery`, { cache: 'no-cache' });
     if (res.ok) {
-      const embeddingsList = await res.json();
-
-      for (let item of embeddingsList) {
-        try {
-          const embRes = await fetch(`embeddings/${item.path.split('/')[1]}`);
-          if (embRes.ok) {
-            const data = await embRes.json();
-            embeddings[item.name] = new Float32Array(data.embedding);
-            console.log(`Loaded embedding for ${item.name}`);
-          }
-        } catch (e) {
-          console.warn(`Could not load embedding for ${item.name}`);
-        }
+      const { gallery, generation } = parseGallery(await res.arrayBuffer());
+      if (generation !== galleryGeneration) {
+        embeddings = gallery;
+        galleryGeneration = generation;
+        console.log(`Loaded ${Object.keys(gallery).length} embeddings`);
       }
     }
   } catch (e) {
-    console.warn('Could not load embeddings from API, trying fallback...');
-    // Fallback to local embeddings
-    const persons = ["Aditya"];
-    for (let p of persons) {
-      try {
-        const res = await fetch(`embeddings/${p}_embedding.json`);
-        if (res.ok) {
-          const data = await res.json();
-          embeddings[p] = new Float32Array(data.embedding);
-          console.log(`Loaded embedding for ${p}`);
-        }
-      } catch (e) {
-        console.warn(`Could not load ${p} embedding`);
-      }
-    }
+    // The gallery API is the only source of embeddings; the last loaded copy stays in use
+    console.warn('Could not load embeddings from API', e);
   }
 }
 loadEmbeddings();